@@ -8,6 +8,10 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # orjson-backed jsonify(); falls back to the stdlib encoder without orjson
+    from app.utils.serialization import OrjsonProvider
+    app.json = OrjsonProvider(app)
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -35,12 +39,63 @@ def create_app(config_class=Config):
     from app.routes.parcel_routes import parcel_bp
     from app.routes.admin_routes import admin_bp
     from app.routes.email_routes import email_bp
+    from app.routes.quote_routes import quote_bp
+    from app.routes.debug_routes import debug_bp
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(user_bp, url_prefix="/users")
     app.register_blueprint(parcel_bp, url_prefix="/parcels")
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(email_bp, url_prefix="/email")  
+    app.register_blueprint(quote_bp, url_prefix="/quotes")
+    app.register_blueprint(debug_bp, url_prefix="/debug")
+
+    # Revoked tokens and soft-deleted users' tokens are refused by jwt_required;
+    # `flask purge-token-revocations` deletes revocations past their tokens' expiry
+    from app.utils.revocation import init_revocations
+    init_revocations(app)
+
+    # Streams take ?jwt= only as a short-lived stream token, which opens nothing else
+    from app.utils.sse import init_stream_tokens
+    init_stream_tokens(app)
+
+    # Behind PROXY_FIX_X_FOR reverse proxies, take the client address from X-Forwarded-For;
+    # otherwise every client would share the proxy's address and its "ip" rate-limit bucket
+    if app.config.get("PROXY_FIX_X_FOR"):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+
+    # Token-bucket rate limits and in-flight caps per blueprint (429/503 with Retry-After)
+    from app.utils.rate_limit import init_rate_limits
+    init_rate_limits(app)
+
+    # Per-request SQL statement counts, timings and N+1 warnings (SQL_PROFILER_ENABLED)
+    from app.utils.sql_profiler import init_sql_profiler
+    init_sql_profiler(app)
+
+    # Warm the status/location cache used by Parcel.to_dict()
+    from app.utils.reference_cache import init_reference_cache
+    init_reference_cache(app)
+
+    # `flask email-worker` drains the email outbox
+    from app.utils.email_outbox import register_outbox_commands
+    register_outbox_commands(app)
+
+    # `flask distance-matrix` rebuilds the location distance matrix
+    from app.utils.map_utils import register_map_commands
+    register_map_commands(app)
+
+    # `flask reconcile-parcel-counters` corrects drift in the /admin/stats counters
+    from app.utils.parcel_counters import register_counter_commands
+    register_counter_commands(app)
+
+    # `flask purge-idempotency-keys` deletes expired Idempotency-Key records
+    from app.utils.idempotency import register_idempotency_commands
+    register_idempotency_commands(app)
+
+    # `flask purge-soft-deleted` hard-deletes parcels and users soft-deleted long ago
+    from app.utils.soft_delete import register_soft_delete_commands
+    register_soft_delete_commands(app)
 
     return app
 
@@ -14,3 +14,64 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')  # Optional if you're using JWT
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))  # Default: 1 hour
+    DISTANCE_MATRIX_DIR = os.getenv('DISTANCE_MATRIX_DIR')  # Default: <instance path>/distance_matrix
+    DISTANCE_MATRIX_CHECK_INTERVAL = int(os.getenv('DISTANCE_MATRIX_CHECK_INTERVAL', 5))  # Seconds between index.json checks
+    DISTANCE_MATRIX_SPEED_KMH = float(os.getenv('DISTANCE_MATRIX_SPEED_KMH', 40))  # Assumed average speed for estimated travel times over great-circle distance
+    EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'sendgrid')  # 'sendgrid', 'console' or 'file'
+    EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', 'sent_emails.jsonl')
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+    EMAIL_WORKER_THREADS = int(os.getenv('EMAIL_WORKER_THREADS', 4))
+    EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 5))
+    EMAIL_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_RETRY_BASE_SECONDS', 30))
+    EMAIL_POLL_INTERVAL = int(os.getenv('EMAIL_POLL_INTERVAL', 2))
+    EMAIL_LEASE_SECONDS = int(os.getenv('EMAIL_LEASE_SECONDS', 300))  # How long a claimed batch stays reserved
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))  # How long a stored response is replayed
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', 30))  # Claims not renewed for this long may be taken over
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 5))  # Duplicates wait this long for the first's result
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))  # Completed keys kept in each worker
+    PARCEL_COUNTER_SHARDS = int(os.getenv('PARCEL_COUNTER_SHARDS', 8))  # Rows each /admin/stats counter is spread over
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # werkzeug method string incl. cost params
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 hashes on the request thread
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 0.5))
+    PUBSUB_BACKEND = os.getenv('PUBSUB_BACKEND', 'memory')  # 'memory' (one process) or 'postgres' (LISTEN/NOTIFY)
+    SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 5000))  # Open live streams per process
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))  # Undelivered messages kept per stream
+    SSE_TOKEN_EXPIRES = int(os.getenv('SSE_TOKEN_EXPIRES', 60))  # Seconds a ?jwt= stream token can open streams for
+    PARCEL_IMPORT_CHUNK_SIZE = int(os.getenv('PARCEL_IMPORT_CHUNK_SIZE', 5000))  # Rows validated and inserted per transaction
+    PARCEL_IMPORT_MAX_ERRORS = int(os.getenv('PARCEL_IMPORT_MAX_ERRORS', 1000))  # Row errors listed in an import report
+    QUOTE_MAX_ROWS = int(os.getenv('QUOTE_MAX_ROWS', 10000))  # Rows accepted by one POST /quotes
+    ROUTING_WORKERS = int(os.getenv('ROUTING_WORKERS', os.cpu_count() or 1))  # 0 plans routes on the request thread
+    ROUTING_MAX_PENDING = int(os.getenv('ROUTING_MAX_PENDING', 2))  # Route plans running at once per API process
+    ROUTING_QUEUE_TIMEOUT = float(os.getenv('ROUTING_QUEUE_TIMEOUT', 1))
+    ROUTING_TIME_BUDGET = float(os.getenv('ROUTING_TIME_BUDGET', 2))  # Seconds of 2-opt per plan
+    ROUTING_MAX_TIME_BUDGET = float(os.getenv('ROUTING_MAX_TIME_BUDGET', 10))
+    ROUTE_MAX_PARCELS = int(os.getenv('ROUTE_MAX_PARCELS', 60))  # Parcels one courier carries per trip
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))  # Trusted proxies setting X-Forwarded-For; 0 when clients connect directly
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', 'memory')  # 'memory' (one worker) or 'redis' (shared)
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))  # Buckets kept by the memory store
+    # Token buckets per blueprint for write requests: "<ip|account> <count>/<second|minute|hour|day>"
+    RATE_LIMITS = {
+        'auth_bp': ['ip 20/minute', 'account 5/minute'],
+        'parcel_bp': ['account 120/minute'],
+        'admin_bp': ['account 120/minute'],
+        'quote_bp': ['ip 60/minute'],
+    }
+    # Requests per blueprint allowed to run at once in one worker; the rest get 503
+    LOAD_SHED_MAX_INFLIGHT = {'auth_bp': int(os.getenv('AUTH_MAX_INFLIGHT', 32))}
+    REFERENCE_CACHE_CHECK_INTERVAL = int(os.getenv('REFERENCE_CACHE_CHECK_INTERVAL', 5))  # Seconds between status/location version checks
+    SQL_PROFILER_ENABLED = os.getenv('SQL_PROFILER_ENABLED', 'false').lower() == 'true'  # X-DB-* headers and /debug/queries
+    SQL_PROFILER_REPEAT_THRESHOLD = int(os.getenv('SQL_PROFILER_REPEAT_THRESHOLD', 5))  # Runs of one statement shape flagged as N+1
+    SQL_PROFILER_HISTORY = int(os.getenv('SQL_PROFILER_HISTORY', 50))  # Request profiles kept for /debug/queries
+    SEARCH_MIN_SIMILARITY = float(os.getenv('SEARCH_MIN_SIMILARITY', 0.3))  # Postgres trigram word similarity a search hit needs
+    SOFT_DELETE_RETENTION_DAYS = int(os.getenv('SOFT_DELETE_RETENTION_DAYS', 90))  # Soft-deleted rows older than this are purged
+    SOFT_DELETE_PURGE_BATCH_SIZE = int(os.getenv('SOFT_DELETE_PURGE_BATCH_SIZE', 1000))  # Rows hard-deleted per transaction
+    REVOCATION_CHECK_INTERVAL = int(os.getenv('REVOCATION_CHECK_INTERVAL', 2))  # Seconds between pulls of new revocations
+    REVOCATION_REBUILD_INTERVAL = int(os.getenv('REVOCATION_REBUILD_INTERVAL', 600))  # Seconds between full filter rebuilds
+    REVOCATION_SYNC_OVERLAP = int(os.getenv('REVOCATION_SYNC_OVERLAP', 60))  # Seconds re-read on each pull, for late commits
+    REVOCATION_FILTER_CAPACITY = int(os.getenv('REVOCATION_FILTER_CAPACITY', 100000))  # Revocations the filter is sized for
+    REVOCATION_FILTER_ERROR_RATE = float(os.getenv('REVOCATION_FILTER_ERROR_RATE', 0.001))  # Share of live tokens checked in the DB
+    ROLE_CACHE_TTL = int(os.getenv('ROLE_CACHE_TTL', 30))  # Seconds an admin's verified role is reused
@@ -5,6 +5,8 @@ from app.presenters.admin_presenter import (
     demote_user,
     delete_user
 )
+from app.presenters.search_presenter import SEARCH_SCOPES, admin_search
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 def get_all_users_controller():
     return get_all_users()
@@ -17,3 +19,11 @@ def demote_user_controller(user_id):
 
 def delete_user_controller(user_id):
     return delete_user(user_id)
+
+# GET /admin/search?q=&type=parcels,users,locations&page=&limit=
+def search_controller():
+    requested = request.args.get("type")
+    scopes = [scope.strip() for scope in requested.split(",") if scope.strip()] if requested else list(SEARCH_SCOPES)
+    page = max(request.args.get("page", 1, type=int), 1)
+    limit = min(max(request.args.get("limit", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return admin_search(request.args.get("q"), scopes, page, limit)
@@ -1,26 +1,37 @@
 from flask import request
-from flask_jwt_extended import get_jwt_identity
+from app.utils.jwt import get_current_user_id
 from app.presenters.admin_parcel_presenter import (
     update_parcel_status,
     update_parcel_location,
-    bulk_update_parcels
+    bulk_update_parcels,
+    get_parcel_stats
 )
+from app.presenters.route_presenter import plan_courier_routes
 
 # PATCH /admin/parcels/<parcel_id>/status
 def update_parcel_status_controller(parcel_id):
     data = request.get_json()
-    admin_id = get_jwt_identity().get("id")
+    admin_id = get_current_user_id()
     return update_parcel_status(admin_id, parcel_id, data)
 
 # PATCH /admin/parcels/<parcel_id>/location
 def update_parcel_location_controller(parcel_id):
     data = request.get_json()
-    admin_id = get_jwt_identity().get("id")
+    admin_id = get_current_user_id()
     return update_parcel_location(admin_id, parcel_id, data)
 
 # PATCH /admin/parcels/bulk-update
 def bulk_update_parcels_controller():
     data = request.get_json()
-    admin_id = get_jwt_identity().get("id")
+    admin_id = get_current_user_id()
     return bulk_update_parcels(admin_id, data)
 
+# POST /admin/routes
+def plan_routes_controller():
+    data = request.get_json(silent=True)
+    return plan_courier_routes(data)
+
+# GET /admin/stats
+def parcel_stats_controller():
+    days = min(max(request.args.get("days", 30, type=int), 1), 366)
+    return get_parcel_stats(days)
@@ -2,3 +2,10 @@ from .user import User
 from .parcel import Parcel
 from .status import Status 
 from .location import Location 
+from .cache_version import CacheVersion
+from .email_outbox import EmailOutbox
+from .parcel_event import ParcelEvent
+from .parcel_counter import ParcelCounter
+from .idempotency_key import IdempotencyKey
+from .token_revocation import TokenRevocation
+from . import search_index  # noqa: F401  attaches the /admin/search index DDL to the tables
@@ -0,0 +1,31 @@
+from app.extensions import db
+
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    """
+    One Idempotency-Key a client sent, scoped to the user, with the request it
+    was first used for and the response that request got.
+
+    A row with no status_code is still being handled by the request that wrote
+    claim_token, which keeps pushing locked_until forward while its handler
+    runs; once locked_until passes, the claim may be taken over. Rows are kept until expires_at so retries within
+    IDEMPOTENCY_TTL_SECONDS replay the stored response.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 for anonymous requests
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+
+    status_code = db.Column(db.Integer)
+    content_type = db.Column(db.String(100))
+    response_body = db.Column(db.LargeBinary)
+
+    claim_token = db.Column(db.String(32))  # uuid4 hex of the request holding the claim
+    locked_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.user_id}:{self.key} {self.status_code or 'in progress'}>"
@@ -0,0 +1,34 @@
+from sqlalchemy import false
+from app.extensions import db
+
+
+def live_rows_index(name, *columns):
+    """
+    Index restricted to rows that are not soft-deleted.
+
+    Queries only use it when they filter with `Model.is_deleted == false()`,
+    which renders the same literal predicate on Postgres and SQLite.
+    """
+    return db.Index(
+        name,
+        *columns,
+        postgresql_where=db.text("is_deleted = false"),
+        sqlite_where=db.text("is_deleted = 0"),
+    )
+
+
+def is_live(model):
+    return model.is_deleted == false()
+
+
+def dead_rows_index(name, *columns):
+    """
+    Index restricted to soft-deleted rows, so finding rows to purge costs
+    an index in proportion to dead rows only.
+    """
+    return db.Index(
+        name,
+        *columns,
+        postgresql_where=db.text("is_deleted = true"),
+        sqlite_where=db.text("is_deleted = 1"),
+    )
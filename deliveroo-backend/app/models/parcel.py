@@ -1,8 +1,14 @@
+from sqlalchemy.orm import column_property
 from app.extensions import db
+from app.models.indexes import dead_rows_index, live_rows_index
+from app.models.soft_delete import SoftDeleteMixin
+from app.utils import soft_delete  # noqa: F401  registers the listeners that hide and stamp deleted rows
+from app.utils.reference_cache import reference_cache
+from app.utils.serialization import Projection, isoformat
 
 from datetime import datetime
 
-class Parcel(db.Model):
+class Parcel(SoftDeleteMixin, db.Model):
     __tablename__ = 'parcels'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -10,29 +16,80 @@ class Parcel(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     origin_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
     destination_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
-    present_location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
-    status_id = db.Column(db.Integer, db.ForeignKey('statuses.id'), nullable=False)
+    # active_history keeps the previous value on change, which the parcel counters need
+    present_location_id = column_property(
+        db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False), active_history=True
+    )
+    status_id = column_property(
+        db.Column(db.Integer, db.ForeignKey('statuses.id'), nullable=False), active_history=True
+    )
+    courier_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_parcels_courier_id_users'))
     
-    is_deleted = db.Column(db.Boolean, default=False)
+    # Overrides SoftDeleteMixin.is_deleted so the counters see its previous value too
+    is_deleted = column_property(db.Column(db.Boolean, default=False), active_history=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Live-row indexes for the listing (keyset), status and hub access paths
+        live_rows_index('ix_parcels_live_user_id_created_at', 'user_id', 'created_at', 'id'),
+        live_rows_index('ix_parcels_live_created_at', 'created_at', 'id'),
+        live_rows_index('ix_parcels_live_status_id_created_at', 'status_id', 'created_at'),
+        live_rows_index('ix_parcels_live_present_location_id_status_id', 'present_location_id', 'status_id'),
+        # Soft-deleted rows only, oldest first for the purge job
+        dead_rows_index('ix_parcels_dead_deleted_at', 'deleted_at'),
+    )
+
     origin = db.relationship('Location', foreign_keys=[origin_id], back_populates='parcels')
     destination = db.relationship('Location', foreign_keys=[destination_id], back_populates='destination_parcels')
     present_location = db.relationship('Location', foreign_keys=[present_location_id], back_populates='parcels')
     status = db.relationship('Status', back_populates='parcels')
 
+    def _reference_value(self, cached, relationship, attribute):
+        # Reference cache first; the relationship is only loaded on a cache miss
+        if cached is not None:
+            return cached[attribute]
+        related = getattr(self, relationship)
+        return getattr(related, attribute) if related else None
+
     def to_dict(self):
         return {
             "id": self.id,
             "user_id": self.user_id,
-            "origin": self.origin.city if self.origin else None,
-            "destination": self.destination.city if self.destination else None,
-            "present_location": self.present_location.city if self.present_location else None,
-            "status": self.status.name if self.status else None,
+            "origin": self._reference_value(reference_cache.location(self.origin_id), "origin", "city"),
+            "destination": self._reference_value(reference_cache.location(self.destination_id), "destination", "city"),
+            "present_location": self._reference_value(reference_cache.location(self.present_location_id), "present_location", "city"),
+            "status": self._reference_value(reference_cache.status(self.status_id), "status", "name"),
+            "courier_id": self.courier_id,
             "is_deleted": self.is_deleted,
+            "deleted_at": self.deleted_at.isoformat() if self.deleted_at else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
 
+
+def _city(location_id):
+    cached = reference_cache.location(location_id)
+    return cached["city"] if cached else None
+
+
+def _status_name(status_id):
+    cached = reference_cache.status(status_id)
+    return cached["name"] if cached else None
+
+
+# Same keys and values as Parcel.to_dict(), built from plain columns for listings
+parcel_projection = Projection(
+    id=Parcel.id,
+    user_id=Parcel.user_id,
+    origin=(Parcel.origin_id, _city),
+    destination=(Parcel.destination_id, _city),
+    present_location=(Parcel.present_location_id, _city),
+    status=(Parcel.status_id, _status_name),
+    courier_id=Parcel.courier_id,
+    is_deleted=Parcel.is_deleted,
+    deleted_at=(Parcel.deleted_at, isoformat),
+    created_at=(Parcel.created_at, isoformat),
+    updated_at=(Parcel.updated_at, isoformat),
+)
@@ -0,0 +1,20 @@
+from app.extensions import db
+from app.utils import parcel_counters  # noqa: F401  registers the listeners that maintain these rows
+
+class ParcelCounter(db.Model):
+    """
+    Live parcel counts per status, present location and creation day.
+
+    Each count is split over PARCEL_COUNTER_SHARDS rows, and a writer adds its
+    delta to one shard picked at random. Concurrent parcel updates then rarely
+    wait on the same counter row. Readers sum the shards.
+    """
+    __tablename__ = 'parcel_counters'
+
+    dimension = db.Column(db.String(20), primary_key=True)  # 'status', 'location' or 'day'
+    bucket = db.Column(db.String(32), primary_key=True)  # status id, location id or ISO date
+    shard = db.Column(db.Integer, primary_key=True, default=0, autoincrement=False)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ParcelCounter {self.dimension}:{self.bucket}[{self.shard}]={self.count}>"
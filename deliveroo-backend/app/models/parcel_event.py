@@ -0,0 +1,45 @@
+from app.extensions import db
+from app.utils.reference_cache import reference_cache
+from app.utils import parcel_events  # noqa: F401  registers the listener that writes these rows
+
+from datetime import datetime
+
+class ParcelEvent(db.Model):
+    """
+    One status and/or location change of a parcel. Rows are only ever inserted;
+    the parcel's own status_id/present_location_id stay the current state.
+    """
+    __tablename__ = 'parcel_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    parcel_id = db.Column(db.Integer, db.ForeignKey('parcels.id', ondelete='CASCADE'), nullable=False)
+    # New values; None when that part of the state did not change
+    status_id = db.Column(db.Integer, db.ForeignKey('statuses.id'))
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'))
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Timeline of one parcel, oldest first
+        db.Index('ix_parcel_events_parcel_id_created_at', 'parcel_id', 'created_at', 'id'),
+    )
+
+    parcel = db.relationship('Parcel')
+
+    def to_dict(self):
+        status = reference_cache.status(self.status_id) if self.status_id else None
+        location = reference_cache.location(self.location_id) if self.location_id else None
+        return {
+            "id": self.id,
+            "parcel_id": self.parcel_id,
+            "status_id": self.status_id,
+            "status": status["name"] if status else None,
+            "location_id": self.location_id,
+            "location": location["city"] if location else None,
+            "actor_id": self.actor_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f"<ParcelEvent parcel={self.parcel_id} status={self.status_id} location={self.location_id}>"
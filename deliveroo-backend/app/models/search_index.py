@@ -0,0 +1,70 @@
+"""
+Text search indexes behind GET /admin/search.
+
+On Postgres each searchable table gets a trigram GiST index over one text
+expression (SEARCH_DOCUMENTS), which serves both the `<%` match and the
+`<<->` ordering, so a ranked page is an index scan. SQLite (tests) gets an
+FTS5 table with the trigram tokenizer per searchable table, kept in step
+with the base table by triggers.
+
+Both are created with the tables by `db.create_all()`; migration 0010
+creates them on existing databases.
+"""
+from sqlalchemy import DDL, event
+
+from app.models.location import Location
+from app.models.parcel import Parcel
+from app.models.user import User
+
+# Table -> the text searched, as one SQL expression (Postgres) and as FTS5 columns (SQLite)
+SEARCH_DOCUMENTS = {
+    "parcels": "description",
+    "users": "name || ' ' || email",
+    "locations": "city || ' ' || address",
+}
+SEARCH_COLUMNS = {
+    "parcels": ["description"],
+    "users": ["name", "email"],
+    "locations": ["city", "address"],
+}
+# Soft-deleted rows are searched by neither backend
+LIVE_ONLY = {"parcels", "users"}
+
+
+def trigram_index_ddl(table):
+    where = " WHERE is_deleted = false" if table in LIVE_ONLY else ""
+    return (
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_trgm ON {table} "
+        f"USING gist (({SEARCH_DOCUMENTS[table]}) gist_trgm_ops){where}"
+    )
+
+
+def fts_ddl(table):
+    """
+    Statements creating `<table>_fts` and the triggers that keep it current.
+    """
+    columns = SEARCH_COLUMNS[table]
+    listed = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    remove = f"INSERT INTO {table}_fts({table}_fts, rowid, {listed}) VALUES ('delete', old.id, {old});"
+    add = f"INSERT INTO {table}_fts(rowid, {listed}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+        f"{listed}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {listed} ON {table} "
+        f"BEGIN {remove} {add} END",
+    ]
+
+
+for model in (Parcel, User, Location):
+    table = model.__tablename__
+    event.listen(model.__table__, "after_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                 .execute_if(dialect="postgresql"))
+    event.listen(model.__table__, "after_create", DDL(trigram_index_ddl(table)).execute_if(dialect="postgresql"))
+    for statement in fts_ddl(table):
+        event.listen(model.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(model.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {table}_fts")
+                 .execute_if(dialect="sqlite"))
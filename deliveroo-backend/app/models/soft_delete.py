@@ -0,0 +1,13 @@
+from app.extensions import db
+
+
+class SoftDeleteMixin:
+    """
+    Model whose rows are soft-deleted by setting `is_deleted`.
+
+    ORM selects leave these rows out unless run with the `include_deleted`
+    execution option (see app.utils.soft_delete). `deleted_at` is stamped when
+    `is_deleted` turns true, and the purge job hard-deletes rows dead for long enough.
+    """
+    is_deleted = db.Column(db.Boolean, default=False)
+    deleted_at = db.Column(db.DateTime)
@@ -0,0 +1,27 @@
+from app.extensions import db
+from app.utils import revocation  # noqa: F401  registers the listener that revokes soft-deleted users' tokens
+
+from datetime import datetime
+
+class TokenRevocation(db.Model):
+    """
+    A revoked access token (kind 'jti', subject = the token's jti) or every
+    token a user was issued up to revoked_at (kind 'user', subject = user id).
+
+    Rows can be purged after expires_at, when the tokens they cover have
+    expired anyway.
+    """
+    __tablename__ = 'token_revocations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    subject = db.Column(db.String(64), nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index('ix_token_revocations_kind_subject', 'kind', 'subject'),
+    )
+
+    def __repr__(self):
+        return f"<TokenRevocation {self.kind}:{self.subject}>"
@@ -1,9 +1,13 @@
 from app.extensions import db
+from app.models.indexes import dead_rows_index, live_rows_index
+from app.models.soft_delete import SoftDeleteMixin
+from app.utils import soft_delete  # noqa: F401  registers the listeners that hide and stamp deleted rows
 
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.password_hashing import hash_password, verify_password, needs_rehash
+from app.utils.serialization import Projection, isoformat
 
-class User(db.Model):
+class User(SoftDeleteMixin, db.Model):
     __tablename__ = 'users'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -11,18 +15,36 @@ class User(db.Model):
     password_hash = db.Column(db.Text, nullable=False)
     name = db.Column(db.String(100),nullable=False)
     role = db.Column(db.String(20), default='user')
-    is_deleted = db.Column(db.Boolean, default=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
-    parcels = db.relationship('Parcel', backref='user', lazy=True)
+    __table_args__ = (
+        # Live-row indexes for the user listing (keyset) and role filter
+        live_rows_index('ix_users_live_created_at', 'created_at', 'id'),
+        live_rows_index('ix_users_live_role_created_at', 'role', 'created_at', 'id'),
+        # Soft-deleted rows only, oldest first for the purge job
+        dead_rows_index('ix_users_dead_deleted_at', 'deleted_at'),
+    )
+
+    parcels = db.relationship('Parcel', backref='user', lazy=True, foreign_keys='Parcel.user_id')
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @is_admin.setter
+    def is_admin(self, value):
+        self.role = 'admin' if value else 'user'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
     def to_dict(self):
         return {
@@ -32,7 +54,21 @@ class User(db.Model):
             "role": self.role,
             "is_admin": self.role == 'admin',
             "is_deleted": self.is_deleted,
+            "deleted_at": self.deleted_at.isoformat() if self.deleted_at else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
 
+
+# Same keys and values as User.to_dict(), built from plain columns for listings
+user_projection = Projection(
+    id=User.id,
+    name=User.name,
+    email=User.email,
+    role=User.role,
+    is_admin=(User.role, lambda role: role == 'admin'),
+    is_deleted=User.is_deleted,
+    deleted_at=(User.deleted_at, isoformat),
+    created_at=(User.created_at, isoformat),
+    updated_at=(User.updated_at, isoformat),
+)
@@ -1,8 +1,14 @@
 import logging
+from collections import Counter
+from datetime import datetime
 from flask import jsonify
+from sqlalchemy import select, update
 from app.models.parcel import Parcel
 from app.models.user import User
 from app.extensions import db
+from app.utils.reference_cache import reference_cache
+from app.utils.parcel_events import record_parcel_events
+from app.utils.parcel_counters import apply_counter_deltas, counter_deltas, parcel_counts
 
 from marshmallow import Schema, fields, ValidationError
 
@@ -12,6 +18,9 @@ logging.basicConfig(level=logging.INFO)
 
 VALID_STATUSES = ["Pending", "In Transit", "Delivered", "Cancelled"]
 
+# Max ids bound into a single IN (...) clause by the bulk update
+BULK_CHUNK_SIZE = 1000
+
 # Marshmallow Schemas
 class StatusUpdateSchema(Schema):
     status = fields.String(required=True)
@@ -29,6 +38,30 @@ def is_admin(user_id):
     user = User.query.get(user_id)
     return user and user.is_admin
 
+def chunked(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def current_parcel_states(parcel_ids):
+    # parcel_id -> row of the columns the bulk update's events and counters need,
+    # locked so the counters see the same "before" state the UPDATE replaces
+    found = {}
+    columns = (Parcel.id, Parcel.user_id, Parcel.status_id, Parcel.present_location_id,
+               Parcel.is_deleted, Parcel.created_at)
+    for chunk in chunked(parcel_ids):
+        rows = db.session.execute(select(*columns).where(Parcel.id.in_(chunk)).with_for_update())
+        found.update((row.id, row) for row in rows)
+    return found
+
+def status_ids_by_name(names):
+    statuses = {name: reference_cache.status_by_name(name) for name in names}
+    return {name: status["id"] for name, status in statuses.items() if status}
+
+def location_ids_by_city(cities):
+    # The oldest location wins when a city has several
+    locations = {city: reference_cache.locations_by_city(city) for city in cities}
+    return {city: matches[0]["id"] for city, matches in locations.items() if matches}
+
 
 # ============================
 # Single Parcel Status Update
@@ -105,31 +138,84 @@ def bulk_update_parcels(admin_id, parcels_data):
         logger.error(f"Bulk validation error: {err.messages}")
         return jsonify({"status": "error", "message": err.messages}), 400
 
+    parcel_ids = list({entry["parcel_id"] for entry in validated_data})
+    found_ids = current_parcel_states(parcel_ids)
+    status_ids = status_ids_by_name({e["status"] for e in validated_data if "status" in e})
+    location_ids = location_ids_by_city({e["current_location"] for e in validated_data if "current_location" in e})
+
     results = []
+    # parcel_id -> column values; a later entry for the same parcel overrides an earlier one
+    changes = {}
 
     for entry in validated_data:
-        parcel = Parcel.query.get(entry["parcel_id"])
-        if not parcel:
-            logger.warning(f"Parcel ID {entry['parcel_id']} not found in bulk update.")
+        parcel_id = entry["parcel_id"]
+        if parcel_id not in found_ids:
+            logger.warning(f"Parcel ID {parcel_id} not found in bulk update.")
             results.append({
-                "parcel_id": entry["parcel_id"],
+                "parcel_id": parcel_id,
                 "status": "failed",
                 "message": "Parcel not found."
             })
             continue
 
+        values = {}
         if "status" in entry:
-            parcel.status = entry["status"]
+            if entry["status"] not in status_ids:
+                results.append({"parcel_id": parcel_id, "status": "failed", "message": "Unknown status."})
+                continue
+            values["status_id"] = status_ids[entry["status"]]
         if "current_location" in entry:
-            parcel.current_location = entry["current_location"]
+            if entry["current_location"] not in location_ids:
+                results.append({"parcel_id": parcel_id, "status": "failed", "message": "Unknown location."})
+                continue
+            values["present_location_id"] = location_ids[entry["current_location"]]
 
+        changes.setdefault(parcel_id, {}).update(values)
         results.append({
-            "parcel_id": parcel.id,
+            "parcel_id": parcel_id,
             "status": "success",
-            "new_status": parcel.status,
-            "current_location": parcel.current_location
+            "new_status": entry.get("status"),
+            "current_location": entry.get("current_location")
         })
 
+    # One UPDATE ... WHERE id IN (...) per distinct set of new values
+    groups = {}
+    for parcel_id, values in changes.items():
+        if values:
+            groups.setdefault(tuple(sorted(values.items())), []).append(parcel_id)
+
+    now = datetime.utcnow()
+    for values, ids in groups.items():
+        for chunk in chunked(ids):
+            db.session.execute(
+                update(Parcel)
+                .where(Parcel.id.in_(chunk))
+                .values(**dict(values), updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+    # The UPDATEs bypass the ORM listener, so their history is written here in the same transaction
+    record_parcel_events(
+        [
+            {"parcel_id": parcel_id, "status_id": values.get("status_id"),
+             "location_id": values.get("present_location_id"), "user_id": found_ids[parcel_id].user_id}
+            for parcel_id, values in changes.items() if values
+        ],
+        actor_id=admin_id,
+        created_at=now,
+    )
+
+    deltas = Counter()
+    for parcel_id, values in changes.items():
+        row = found_ids[parcel_id]
+        if values and not row.is_deleted:
+            deltas.update(counter_deltas(
+                (row.status_id, row.present_location_id, row.created_at),
+                (values.get("status_id", row.status_id),
+                 values.get("present_location_id", row.present_location_id), row.created_at),
+            ))
+    apply_counter_deltas(db.session.connection(), deltas)
+
     db.session.commit()
     logger.info(f"Bulk update performed on {len(results)} parcels.")
 
@@ -138,3 +224,32 @@ def bulk_update_parcels(admin_id, parcels_data):
         "message": f"{len(results)} parcels updated.",
         "results": results
     }), 200
+
+
+# ==========================
+# Dashboard Stats
+# ==========================
+def get_parcel_stats(days=30):
+    """
+    Live parcel counts by status, present location and creation day, read from
+    the parcel_counters table rather than by scanning parcels.
+    """
+    counts = parcel_counts(days)
+
+    def named(bucket_id, lookup, attribute):
+        cached = lookup(bucket_id)
+        return cached[attribute] if cached else None
+
+    return jsonify({
+        "total": sum(counts["status"].values()),
+        "by_status": [
+            {"status_id": status_id, "status": named(status_id, reference_cache.status, "name"), "count": count}
+            for status_id, count in sorted(counts["status"].items())
+        ],
+        "by_location": [
+            {"location_id": location_id, "location": named(location_id, reference_cache.location, "city"),
+             "count": count}
+            for location_id, count in sorted(counts["location"].items())
+        ],
+        "by_day": [{"day": day, "count": count} for day, count in sorted(counts["day"].items())],
+    }), 200
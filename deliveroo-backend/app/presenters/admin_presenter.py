@@ -2,6 +2,7 @@ from flask import jsonify
 from flask_jwt_extended import get_jwt_identity
 from app.models.user import User
 from app.extensions import db
+from app.utils.role_cache import role_cache
 
 
 def get_all_users():
@@ -35,6 +36,7 @@ def promote_user(user_id):
 
     user.is_admin = True
     db.session.commit()
+    role_cache.invalidate(user.id)
 
     return jsonify({
         "status": "success",
@@ -58,6 +60,7 @@ def demote_user(user_id):
 
     user.is_admin = False
     db.session.commit()
+    role_cache.invalidate(user.id)
 
     return jsonify({
         "status": "success",
@@ -78,6 +81,7 @@ def delete_user(user_id):
 
     user.is_deleted = True
     db.session.commit()
+    role_cache.invalidate(user.id)
 
     return jsonify({
         "status": "success",
@@ -1,8 +1,20 @@
 from flask import jsonify
 from app.extensions import db
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, get_jwt
 from sqlalchemy.exc import IntegrityError
 from email_validator import validate_email, EmailNotValidError
+from app.utils.jwt import user_claims
+from app.utils.password_hashing import HashingOverloaded
+from app.utils.revocation import revoke_token
+
+
+def overloaded_response():
+    response = jsonify({
+        "status": "error",
+        "message": "Too many authentication requests, try again shortly."
+    })
+    response.headers["Retry-After"] = "1"
+    return response, 503
 
 def register_user(data: dict):
     """
@@ -28,7 +40,10 @@ def register_user(data: dict):
         }), 400
 
     user = User(name=name, email=email)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashingOverloaded:
+        return overloaded_response()
 
     try:
         db.session.add(user)
@@ -66,13 +81,22 @@ def login_user(data: dict):
         }), 400
 
     user = User.query.filter_by(email=email).first()
-    if user and user.check_password(password):
+    try:
+        authenticated = user is not None and user.check_password(password)
+        if authenticated and user.password_needs_rehash():
+            # Hash made with older cost parameters: upgrade it while we have the plaintext
+            user.set_password(password)
+            db.session.commit()
+    except HashingOverloaded:
+        return overloaded_response()
+
+    if authenticated:
         token = create_access_token(identity={
             "id": user.id,
             "name": user.name,
             "email": user.email,
             "is_admin": user.role == 'admin'
-        })
+        }, additional_claims=user_claims(user))
 
         return jsonify({
             "status": "success",
@@ -86,3 +110,13 @@ def login_user(data: dict):
     }), 401
 
 
+def logout_user():
+    """
+    Revoke the access token the request was made with.
+    """
+    revoke_token(get_jwt())
+    db.session.commit()
+    return jsonify({
+        "status": "success",
+        "message": "Logged out."
+    }), 200
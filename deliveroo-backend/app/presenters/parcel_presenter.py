@@ -1,17 +1,32 @@
-from flask import jsonify
+from collections import Counter
+from flask import current_app, jsonify
+from sqlalchemy import insert
 from app.models.parcel import Parcel
 from app.models.user import User
 from app.extensions import db
-
-from marshmallow import Schema, fields, ValidationError
+from app.queries.parcel_queries import parcel_listing_query
+from app.utils.import_utils import iter_chunks
+from app.utils.pagination import keyset_page, InvalidCursor
+from app.utils.parcel_counters import apply_counter_deltas, parcel_buckets
+from app.utils.parcel_events import record_parcel_events
+from app.utils.reference_cache import reference_cache
+
+from marshmallow import EXCLUDE, Schema, fields, validate, ValidationError
 from datetime import datetime
 
+DEFAULT_STATUS = "Pending"
+
 # ----------------- Schemas ----------------- #
 
 class ParcelCreateSchema(Schema):
-    pickup_location = fields.Str(required=True)
-    destination = fields.Str(required=True)
-    weight = fields.Float(required=True)
+    description = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    # Locations by id or by city, the status by id or by name (Pending when absent)
+    origin_id = fields.Int()
+    origin = fields.Str()
+    destination_id = fields.Int()
+    destination = fields.Str()
+    status_id = fields.Int()
+    status = fields.Str()
 
 class ParcelUpdateDestinationSchema(Schema):
     destination = fields.Str(required=True)
@@ -23,44 +38,146 @@ class ParcelLocationUpdateSchema(Schema):
     current_location = fields.Str(required=True)
 
 create_schema = ParcelCreateSchema()
+import_schema = ParcelCreateSchema(many=True, unknown=EXCLUDE)
 destination_schema = ParcelUpdateDestinationSchema()
 status_schema = ParcelStatusUpdateSchema()
 location_schema = ParcelLocationUpdateSchema()
 
 # ----------------- User Actions ----------------- #
 
+def resolve_parcel_references(entry):
+    """
+    Column values for a validated create entry, with its locations and status
+    looked up in the reference cache. Returns (values, errors).
+    """
+    values, errors = {}, {}
+    for name, column in (("origin", "origin_id"), ("destination", "destination_id")):
+        if column in entry:
+            location = reference_cache.location(entry[column])
+        elif name in entry:
+            matches = reference_cache.locations_by_city(entry[name])
+            location = matches[0] if matches else None
+        else:
+            errors[column] = ["Missing data for required field."]
+            continue
+        if location is None:
+            errors[column] = ["Unknown location."]
+        else:
+            values[column] = location["id"]
+
+    if "status_id" in entry:
+        status = reference_cache.status(entry["status_id"])
+    else:
+        status = reference_cache.status_by_name(entry.get("status", DEFAULT_STATUS))
+    if status is None:
+        errors["status_id"] = ["Unknown status."]
+    else:
+        values["status_id"] = status["id"]
+
+    if not errors:
+        values["description"] = entry["description"]
+        values["present_location_id"] = values["origin_id"]
+    return values, errors
+
 def create_parcel(user_id, data):
     try:
         validated = create_schema.load(data)
     except ValidationError as err:
         return jsonify({"errors": err.messages}), 400
 
-    parcel = Parcel(
-        user_id=user_id,
-        pickup_location=validated['pickup_location'],
-        destination=validated['destination'],
-        weight=validated['weight'],
-        status="Pending",
-        current_location=validated['pickup_location'],
-        created_at=datetime.utcnow()
-    )
+    values, errors = resolve_parcel_references(validated)
+    if errors:
+        return jsonify({"errors": errors}), 400
 
+    parcel = Parcel(user_id=user_id, **values)
     db.session.add(parcel)
     db.session.commit()
 
-    return jsonify({"message": "Parcel created successfully", "parcel_id": parcel.id}), 201
+    return jsonify(parcel.to_dict()), 201
+
+def import_parcels(user_id, rows):
+    """
+    Create parcels for `user_id` from (line, data, error) records, such as
+    import_utils.iter_csv_rows yields.
+
+    Records are validated and inserted PARCEL_IMPORT_CHUNK_SIZE at a time: one
+    multi-row INSERT per chunk, with its events and counter deltas written
+    alongside, then a commit. Only one chunk is held in memory at a time, and
+    at most PARCEL_IMPORT_MAX_ERRORS row errors are reported. A chunk that
+    commits stays, even if a later part of the file is bad.
+    """
+    chunk_size = current_app.config.get("PARCEL_IMPORT_CHUNK_SIZE", 5000)
+    max_errors = current_app.config.get("PARCEL_IMPORT_MAX_ERRORS", 1000)
+    report = {"imported": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def fail(line, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"line": line, "errors": errors})
+        else:
+            report["errors_truncated"] = True
+
+    for chunk in iter_chunks(rows, chunk_size):
+        lines, entries = [], []
+        for line, data, error in chunk:
+            if error:
+                fail(line, {"_row": [error]})
+            else:
+                lines.append(line)
+                entries.append(data)
+
+        try:
+            loaded, invalid = import_schema.load(entries), {}
+        except ValidationError as err:
+            loaded, invalid = err.valid_data, err.messages
+
+        now = datetime.utcnow()
+        values = []
+        for index, (line, entry) in enumerate(zip(lines, loaded)):
+            if index in invalid:
+                fail(line, invalid[index])
+                continue
+            row, errors = resolve_parcel_references(entry)
+            if errors:
+                fail(line, errors)
+                continue
+            values.append({**row, "user_id": user_id, "is_deleted": False, "created_at": now})
+        if not values:
+            continue
+
+        # Multi-row INSERTs (insertmanyvalues); RETURNING carries what the events need,
+        # so nothing depends on the order rows come back in
+        inserted = db.session.execute(
+            insert(Parcel.__table__).returning(Parcel.id, Parcel.status_id, Parcel.present_location_id), values
+        ).all()
+
+        # The INSERT bypasses the ORM listeners, so events and counters are written here
+        record_parcel_events(
+            [
+                {"parcel_id": parcel_id, "status_id": status_id, "location_id": location_id, "user_id": user_id}
+                for parcel_id, status_id, location_id in inserted
+            ],
+            actor_id=user_id,
+            created_at=now,
+        )
+        deltas = Counter()
+        for (status_id, location_id), count in Counter(
+            (row["status_id"], row["present_location_id"]) for row in values
+        ).items():
+            for bucket in parcel_buckets(status_id, location_id, now):
+                deltas[bucket] += count
+        apply_counter_deltas(db.session.connection(), deltas)
+
+        db.session.commit()
+        report["imported"] += len(values)
+
+    return jsonify(report), 200
 
 def get_all_user_parcels(user_id):
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 10, type=int)
-
-    paginated = Parcel.query.filter_by(user_id=user_id).paginate(page=page, per_page=per_page)
-    return jsonify({
-        "parcels": [p.to_dict() for p in paginated.items],
-        "total": paginated.total,
-        "pages": paginated.pages,
-        "page": page
-    }), 200
+    try:
+        return jsonify(keyset_page(parcel_listing_query(user_id=user_id), Parcel, "parcels")), 200
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
 
 def get_parcel_by_id(user_id, parcel_id):
@@ -0,0 +1,83 @@
+import numpy as np
+from flask import jsonify, current_app
+from marshmallow import Schema, fields, validate, ValidationError
+
+from app.utils.map_utils import distance_matrix
+from app.utils.pricing import (
+    URGENCY_LEVELS, WEIGHT_CATEGORIES, DELIVERY_TIMES, price_quotes
+)
+
+# ----------------- Schemas ----------------- #
+
+class QuoteRowSchema(Schema):
+    weight = fields.Float(required=True, validate=validate.Range(min=0, min_inclusive=False))
+    origin_id = fields.Int(required=True)
+    destination_id = fields.Int(required=True)
+    urgency = fields.Str(load_default="standard", validate=validate.OneOf(URGENCY_LEVELS))
+    distance_km = fields.Float(validate=validate.Range(min=0))
+
+quote_row_schema = QuoteRowSchema()
+
+# ----------------- Quotes ----------------- #
+
+def quote_parcels(data):
+    """
+    Price a batch of parcels. Accepts a list of rows or {"quotes": [...]}.
+    """
+    rows = data.get("quotes") if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"errors": {"quotes": ["A non-empty list of quote rows is required."]}}), 400
+
+    max_rows = current_app.config.get("QUOTE_MAX_ROWS", 10000)
+    if len(rows) > max_rows:
+        return jsonify({"errors": {"quotes": [f"At most {max_rows} rows per request."]}}), 413
+
+    indexes, origins, destinations, weights, urgencies, client_distances = [], [], [], [], [], []
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            validated = quote_row_schema.load(row)
+        except ValidationError as err:
+            errors.append({"index": index, "errors": err.messages})
+            continue
+
+        indexes.append(index)
+        origins.append(validated["origin_id"])
+        destinations.append(validated["destination_id"])
+        weights.append(validated["weight"])
+        urgencies.append(URGENCY_LEVELS.index(validated["urgency"]))
+        client_distances.append(validated.get("distance_km", np.nan))
+
+    # Routes between located locations are priced on the server's distance;
+    # a client-supplied distance_km is only used for routes the matrix can't answer
+    distances = distance_matrix.distances_km(origins, destinations)
+    distances = np.round(np.where(np.isnan(distances), client_distances, distances), 2)
+    known = ~np.isnan(distances)
+    if not known.all():
+        errors.extend(
+            {"index": indexes[position], "errors": {"distance_km": ["Distance is required for this route."]}}
+            for position in np.flatnonzero(~known)
+        )
+        errors.sort(key=lambda error: error["index"])
+
+    indexes = np.asarray(indexes, dtype=np.int64)[known]
+    origins = np.asarray(origins, dtype=np.int64)[known]
+    destinations = np.asarray(destinations, dtype=np.int64)[known]
+    weights = np.asarray(weights, dtype=float)[known]
+    urgencies = np.asarray(urgencies, dtype=np.int64)[known]
+    distances = distances[known]
+    prices, buckets = price_quotes(origins, destinations, weights, urgencies, distances)
+
+    quotes = [
+        {
+            "index": index,
+            "price": price,
+            "weight_category": WEIGHT_CATEGORIES[bucket],
+            "delivery_time": DELIVERY_TIMES[urgency],
+            "distance_km": distance,
+        }
+        for index, price, bucket, urgency, distance
+        in zip(indexes.tolist(), prices.tolist(), buckets.tolist(), urgencies.tolist(), distances.tolist())
+    ]
+
+    return jsonify({"quotes": quotes, "errors": errors}), 200
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import numpy as np
+from flask import jsonify, current_app
+from marshmallow import Schema, fields, validate, ValidationError
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models.indexes import is_live
+from app.models.parcel import Parcel
+from app.models.user import User
+from app.presenters.admin_parcel_presenter import chunked
+from app.utils.reference_cache import reference_cache
+from app.utils.routing import route_planner, RoutingOverloaded
+
+# ----------------- Schemas ----------------- #
+
+class RoutePlanSchema(Schema):
+    location_id = fields.Int(required=True)
+    courier_ids = fields.List(fields.Int(), validate=validate.Length(min=1))
+    max_parcels = fields.Int(validate=validate.Range(min=1))
+    time_budget = fields.Float(validate=validate.Range(min=0))
+    assign = fields.Bool(load_default=False)
+
+route_plan_schema = RoutePlanSchema()
+
+# ----------------- Route planning ----------------- #
+
+def plan_courier_routes(data):
+    """
+    Plan delivery routes for the pending, unassigned parcels waiting at a location.
+
+    Parcels going to the same destination are one stop. With "assign": true,
+    each parcel's courier_id is set to the courier of its route.
+    """
+    try:
+        validated = route_plan_schema.load(data or {})
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+
+    config = current_app.config
+    hub = reference_cache.location(validated["location_id"])
+    if not hub:
+        return jsonify({"error": "Location not found"}), 404
+    if hub["latitude"] is None or hub["longitude"] is None:
+        return jsonify({"error": "Location has no coordinates"}), 400
+
+    couriers = select(User.id).where(is_live(User), User.role == "courier").order_by(User.id)
+    if "courier_ids" in validated:
+        couriers = couriers.where(User.id.in_(validated["courier_ids"]))
+    courier_ids = db.session.execute(couriers).scalars().all()
+    if not courier_ids:
+        return jsonify({"error": "No couriers available"}), 400
+
+    pending = reference_cache.status_by_name("Pending")
+    rows = db.session.execute(
+        select(Parcel.id, Parcel.destination_id).where(
+            is_live(Parcel),
+            Parcel.present_location_id == hub["id"],
+            Parcel.status_id == (pending["id"] if pending else None),
+            Parcel.courier_id.is_(None),
+        )
+    ).all()
+
+    parcel_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    destination_ids, stop_of_parcel, demands = np.unique(
+        np.array([row[1] for row in rows], dtype=np.int64), return_inverse=True, return_counts=True
+    )
+    destinations = [reference_cache.location(location_id) for location_id in destination_ids.tolist()]
+    routable = np.array(
+        [bool(location) and location["latitude"] is not None and location["longitude"] is not None
+         for location in destinations],
+        dtype=bool,
+    )
+    unroutable = parcel_ids[~routable[stop_of_parcel]] if len(parcel_ids) else parcel_ids
+
+    stops = np.flatnonzero(routable)
+    points = [[destinations[stop]["latitude"], destinations[stop]["longitude"]] for stop in stops]
+    time_budget = min(validated.get("time_budget", config.get("ROUTING_TIME_BUDGET", 2)),
+                      config.get("ROUTING_MAX_TIME_BUDGET", 10))
+    try:
+        planned = route_planner.plan(
+            (hub["latitude"], hub["longitude"]),
+            points,
+            demands[stops],
+            len(courier_ids),
+            validated.get("max_parcels", config.get("ROUTE_MAX_PARCELS", 60)),
+            time_budget,
+            location_ids=[hub["id"], *destination_ids[stops].tolist()],
+        )
+    except RoutingOverloaded:
+        return jsonify({"error": "Route planner is busy, please retry shortly"}), 503
+
+    parcels_by_stop = {}
+    for parcel_id, stop in zip(parcel_ids.tolist(), stop_of_parcel.tolist()):
+        parcels_by_stop.setdefault(stop, []).append(parcel_id)
+
+    routes = []
+    for number, (order, length) in enumerate(planned):
+        route_stops = [
+            {
+                "location_id": destinations[stop]["id"],
+                "city": destinations[stop]["city"],
+                "parcel_ids": parcels_by_stop[stop],
+            }
+            for stop in stops[order].tolist()
+        ]
+        routes.append({
+            "courier_id": courier_ids[number % len(courier_ids)],
+            "trip": number // len(courier_ids) + 1,
+            "distance_km": round(length, 2),
+            "parcel_count": sum(len(stop["parcel_ids"]) for stop in route_stops),
+            "stops": route_stops,
+        })
+
+    if validated["assign"] and routes:
+        assign_routes(routes)
+
+    return jsonify({
+        "location_id": hub["id"],
+        "routes": routes,
+        "total_distance_km": round(sum(route["distance_km"] for route in routes), 2),
+        "unroutable_parcel_ids": unroutable.tolist(),
+        "assigned": validated["assign"] and bool(routes),
+    }), 200
+
+
+def assign_routes(routes):
+    # One UPDATE per courier and id chunk, not one per parcel
+    now = datetime.utcnow()
+    parcels_by_courier = {}
+    for route in routes:
+        for stop in route["stops"]:
+            parcels_by_courier.setdefault(route["courier_id"], []).extend(stop["parcel_ids"])
+
+    for courier_id, parcel_ids in parcels_by_courier.items():
+        for chunk in chunked(parcel_ids):
+            db.session.execute(
+                update(Parcel)
+                .where(Parcel.id.in_(chunk), Parcel.courier_id.is_(None))
+                .values(courier_id=courier_id, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+    db.session.commit()
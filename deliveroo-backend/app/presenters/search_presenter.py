@@ -0,0 +1,59 @@
+from flask import current_app, jsonify
+from sqlalchemy import select
+from app.extensions import db
+from app.models.location import Location
+from app.models.parcel import Parcel, parcel_projection
+from app.models.user import User, user_projection
+from app.queries.search_queries import search_ids
+from app.utils.serialization import Projection
+
+SEARCH_SCOPES = ("parcels", "users", "locations")
+# Trigrams need at least three characters to match anything
+MIN_TERM_LENGTH = 3
+
+# Listing fields plus the text the parcel matched on
+parcel_search_projection = parcel_projection.extend(description=Parcel.description)
+location_projection = Projection(id=Location.id, city=Location.city, address=Location.address)
+
+# scope -> (model, projection) the matched ids are loaded with
+SEARCH_RESULTS = {
+    "parcels": (Parcel, parcel_search_projection),
+    "users": (User, user_projection),
+    "locations": (Location, location_projection),
+}
+
+
+def _scope_page(scope, term, page, limit):
+    model, projection = SEARCH_RESULTS[scope]
+    hits = search_ids(scope, term, limit + 1, (page - 1) * limit,
+                      current_app.config.get("SEARCH_MIN_SIMILARITY", 0.3))
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    by_id = {}
+    if hits:
+        rows = db.session.execute(select(*projection.columns).where(model.id.in_([row_id for row_id, _ in hits])))
+        by_id = {item["id"]: item for item in projection.to_dicts(rows)}
+    return {
+        "items": [{**by_id[row_id], "score": round(score, 4)} for row_id, score in hits if row_id in by_id],
+        "has_more": has_more,
+    }
+
+
+def admin_search(term, scopes, page, limit):
+    """
+    Ranked matches for `term` among parcel descriptions, user names and
+    emails, and location cities and addresses, one page per scope.
+    """
+    term = (term or "").strip()
+    if len(term) < MIN_TERM_LENGTH:
+        return jsonify({"error": f"q must be at least {MIN_TERM_LENGTH} characters"}), 400
+    unknown = [scope for scope in scopes if scope not in SEARCH_SCOPES]
+    if unknown:
+        return jsonify({"error": f"Unknown search type(s): {', '.join(unknown)}"}), 400
+
+    return jsonify({
+        "query": term,
+        "page": page,
+        "limit": limit,
+        "results": {scope: _scope_page(scope, term, page, limit) for scope in scopes},
+    }), 200
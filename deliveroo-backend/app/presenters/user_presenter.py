@@ -3,13 +3,14 @@ from flask_jwt_extended import get_jwt_identity
 from app.models.parcel import Parcel
 from app.models.user import User
 from app.extensions import db
+from app.queries.parcel_queries import parcel_listing_query
 from sqlalchemy.exc import SQLAlchemyError
 from app.schemas.parcel_schema import DestinationUpdateSchema
 from app.schemas.user_schema import UserDeleteSchema
 
 def get_user_parcels():
     user_id = get_jwt_identity()["id"]
-    parcels = Parcel.query.filter_by(user_id=user_id).all()
+    parcels = parcel_listing_query(user_id=user_id).all()
     return jsonify([parcel.to_dict() for parcel in parcels]), 200
 
 def get_user_parcel(parcel_id):
@@ -0,0 +1,73 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from app.models.location import Location
+from app.models.parcel import Parcel
+from app.models.status import Status
+from app.utils import soft_delete
+
+EXPORT_COLUMNS = [
+    "id", "description", "user_id", "origin", "destination",
+    "present_location", "status", "is_deleted", "created_at", "updated_at",
+]
+
+
+def parcel_listing_query(user_id=None, include_deleted=False):
+    """
+    Parcel query for listings serialised with Parcel.to_dict().
+
+    Location cities and status names come from the reference cache rather
+    than the origin/destination/present_location/status relationships, so
+    only the parcels table is read and no per-row lazy loads are triggered.
+    Soft-deleted parcels are left out unless `include_deleted` is set.
+    """
+    query = Parcel.query
+    if include_deleted:
+        query = soft_delete.include_deleted(query)
+    if user_id is not None:
+        query = query.filter(Parcel.user_id == user_id)
+    return query
+
+
+def parcel_export_query(status=None, location=None, created_from=None, created_to=None, include_deleted=False):
+    """
+    Flat SELECT of the EXPORT_COLUMNS for every parcel matching the filters.
+
+    Rows come back as plain tuples with location cities and status name already
+    joined in, so no ORM objects are built while exporting. Soft-deleted
+    parcels are left out unless `include_deleted` is set.
+    """
+    origin = aliased(Location)
+    destination = aliased(Location)
+    present = aliased(Location)
+
+    stmt = (
+        select(
+            Parcel.id,
+            Parcel.description,
+            Parcel.user_id,
+            origin.city.label("origin"),
+            destination.city.label("destination"),
+            present.city.label("present_location"),
+            Status.name.label("status"),
+            Parcel.is_deleted,
+            Parcel.created_at,
+            Parcel.updated_at,
+        )
+        .outerjoin(origin, Parcel.origin_id == origin.id)
+        .outerjoin(destination, Parcel.destination_id == destination.id)
+        .outerjoin(present, Parcel.present_location_id == present.id)
+        .outerjoin(Status, Parcel.status_id == Status.id)
+        .order_by(Parcel.id)
+    )
+    # Case-insensitive equality, not ilike: "%" or "_" in a value must not act as wildcards
+    if status:
+        stmt = stmt.where(func.lower(Status.name) == status.lower())
+    if location:
+        stmt = stmt.where(func.lower(present.city) == location.lower())
+    if created_from:
+        stmt = stmt.where(Parcel.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Parcel.created_at < created_to)
+    if include_deleted:
+        stmt = soft_delete.include_deleted(stmt)
+    return stmt
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from app.extensions import db
+from app.models.search_index import LIVE_ONLY, SEARCH_DOCUMENTS
+
+
+def _fts_phrase(term):
+    # One quoted FTS5 phrase, so the term is matched as a substring rather than parsed as a query
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_ids(table, term, limit, offset=0, min_similarity=0.3):
+    """
+    (id, score) pairs of the `table` rows best matching `term`, best first.
+
+    Postgres ranks by trigram word similarity (0..1) through the table's GiST
+    index; SQLite ranks by FTS5 bm25, negated so higher is better there too.
+    Scores only compare within one table and backend.
+    """
+    if db.engine.dialect.name == "postgresql":
+        document = SEARCH_DOCUMENTS[table]
+        live = " AND is_deleted = false" if table in LIVE_ONLY else ""
+        # `<%` matches above the threshold, set for this transaction only
+        db.session.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(min_similarity)},
+        )
+        statement = text(
+            f"SELECT id, word_similarity(:term, {document}) AS score FROM {table} "
+            f"WHERE :term <% ({document}){live} "
+            f"ORDER BY :term <<-> ({document}) LIMIT :limit OFFSET :offset"
+        )
+        params = {"term": term}
+    else:
+        live = " AND t.is_deleted = 0" if table in LIVE_ONLY else ""
+        statement = text(
+            f"SELECT t.id, -bm25({table}_fts) AS score FROM {table}_fts "
+            f"JOIN {table} t ON t.id = {table}_fts.rowid "
+            f"WHERE {table}_fts MATCH :term{live} "
+            f"ORDER BY bm25({table}_fts) LIMIT :limit OFFSET :offset"
+        )
+        params = {"term": _fts_phrase(term)}
+    rows = db.session.execute(statement, {**params, "limit": limit, "offset": offset})
+    return [(row.id, float(row.score)) for row in rows]
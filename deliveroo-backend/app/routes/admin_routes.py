@@ -1,14 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime
 from app.models.parcel import Parcel
 from app.models.user import User
 from app.extensions import db
+from app.queries.parcel_queries import parcel_listing_query, parcel_export_query, EXPORT_COLUMNS
+from app.utils.export_utils import iter_ndjson, iter_csv
+from app.utils.pagination import keyset_page, InvalidCursor
 
 from app.utils.decorators import admin_required
+from app.utils.idempotency import idempotent
+from app.controllers.admin_controller import search_controller
+from app.controllers.admin_parcel_controller import (
+    bulk_update_parcels_controller, plan_routes_controller, parcel_stats_controller
+)
+from app.utils.role_cache import role_cache
+from app.utils.soft_delete import include_deleted
 
 admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
 
+def wants_deleted_rows():
+    return request.args.get("include_deleted", "false").lower() == "true"
+
 @admin_bp.route('/parcels/<int:id>', methods=['PATCH'])
 @admin_required
+@idempotent
 def admin_update_parcel(id):
     data = request.get_json()
     parcel = Parcel.query.get_or_404(id)
@@ -16,15 +31,33 @@ def admin_update_parcel(id):
     if 'status_id' in data:
         parcel.status_id = data['status_id']
     if 'destination' in data:
-        parcel.destination = data['destination']
+        parcel.destination_id = data['destination']
     if 'present_location' in data:
-        parcel.present_location = data['present_location']
+        parcel.present_location_id = data['present_location']
 
     db.session.commit()
     return jsonify(parcel.to_dict()), 200
 
+@admin_bp.route('/parcels/bulk-update', methods=['PATCH'])
+@admin_required
+@idempotent
+def bulk_update_parcels():
+    return bulk_update_parcels_controller()
+
+@admin_bp.route('/routes', methods=['POST'])
+@admin_required
+@idempotent
+def plan_routes():
+    return plan_routes_controller()
+
+@admin_bp.route('/stats', methods=['GET'])
+@admin_required
+def parcel_stats():
+    return parcel_stats_controller()
+
 @admin_bp.route('/assign-role', methods=['POST'])
 @admin_required
+@idempotent
 def assign_role():
     data = request.get_json()
     user_id = data.get('user_id')
@@ -42,22 +75,66 @@ def assign_role():
 
     user.role = role.lower()
     db.session.commit()
+    role_cache.invalidate(user.id)
     return jsonify(user.to_dict()), 200
 
 @admin_bp.route('/parcels', methods=['GET'])
 @admin_required
 def get_all_parcels():
-    parcels = Parcel.query.all()
-    return jsonify([parcel.to_dict() for parcel in parcels]), 200
+    try:
+        query = parcel_listing_query(include_deleted=wants_deleted_rows())
+        return jsonify(keyset_page(query, Parcel, "parcels")), 200
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+@admin_bp.route('/parcels/export', methods=['GET'])
+@admin_required
+def export_parcels():
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ['ndjson', 'csv']:
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+
+    try:
+        created_from = request.args.get('created_from')
+        created_to = request.args.get('created_to')
+        created_from = datetime.fromisoformat(created_from) if created_from else None
+        created_to = datetime.fromisoformat(created_to) if created_to else None
+    except ValueError:
+        return jsonify({"error": "created_from and created_to must be ISO 8601 dates"}), 400
+
+    stmt = parcel_export_query(
+        status=request.args.get('status'),
+        location=request.args.get('location'),
+        created_from=created_from,
+        created_to=created_to,
+        include_deleted=wants_deleted_rows(),
+    )
+
+    if export_format == 'csv':
+        body, mimetype = iter_csv(stmt, EXPORT_COLUMNS), 'text/csv'
+    else:
+        body, mimetype = iter_ndjson(stmt, EXPORT_COLUMNS), 'application/x-ndjson'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=parcels.{export_format}"},
+    )
+
+@admin_bp.route('/search', methods=['GET'])
+@admin_required
+def search():
+    return search_controller()
 
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_all_users():
     role = request.args.get('role')
+    query = include_deleted(User.query) if wants_deleted_rows() else User.query
     if role:
-        users = User.query.filter(User.role.ilike(role)).all()
+        users = query.filter(User.role.ilike(role)).all()
     else:
-        users = User.query.all()
+        users = query.all()
     return jsonify([user.to_dict() for user in users]), 200
 
 
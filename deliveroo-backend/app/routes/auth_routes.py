@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.presenters.auth_presenter import register_user, login_user
+from app.presenters.auth_presenter import register_user, login_user, logout_user
 
 auth_bp = Blueprint('auth_bp', __name__, url_prefix='/auth')
 
@@ -14,6 +14,11 @@ def login():
     data = request.get_json()
     return login_user(data)
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    return logout_user()
+
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def profile():
@@ -0,0 +1,12 @@
+from flask import Blueprint, current_app, jsonify
+from app.utils.decorators import admin_required
+from app.utils.sql_profiler import request_profiles
+
+debug_bp = Blueprint('debug_bp', __name__, url_prefix='/debug')
+
+@debug_bp.route('/queries', methods=['GET'])
+@admin_required
+def recent_queries():
+    if not current_app.config.get("SQL_PROFILER_ENABLED"):
+        return jsonify({"error": "SQL profiling is disabled"}), 404
+    return jsonify({"requests": request_profiles.recent()}), 200
@@ -1,6 +1,6 @@
 # app/routes/email_routes.py
 from flask import Blueprint, request, jsonify
-from app.utils.email_utils import send_email
+from app.utils.email_utils import queue_email
 
 email_bp = Blueprint('email', __name__)
 
@@ -11,5 +11,8 @@ def send_email_route():
     subject = data.get('subject')
     content = data.get('content')
 
-    result, status_code = send_email(to_email, subject, content)
-    return jsonify(result), status_code
+    if not to_email or not subject or not content:
+        return jsonify({"error": "to_email, subject and content are required"}), 400
+
+    email = queue_email(to_email, subject, content)
+    return jsonify({"status": "Email queued", "id": email.id}), 202
@@ -1,43 +1,108 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.parcel import Parcel
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from app.models.parcel import Parcel, parcel_projection
+from app.models.parcel_event import ParcelEvent
 from app.models.user import User
 from app.extensions import db
-
+from app.queries.parcel_queries import parcel_listing_query
+from app.utils.pagination import InvalidCursor
+from app.presenters.parcel_presenter import (
+    create_parcel as create_parcel_for_user, import_parcels as import_parcels_for_user
+)
+from app.utils.idempotency import idempotent
+from app.utils.import_utils import detect_format, iter_csv_rows, iter_ndjson_rows
+from app.utils.conditional import conditional_page, conditional_response, make_etag
+from app.utils.reference_cache import reference_cache
+from app.utils.jwt import get_current_user_id, get_current_access
+from app.utils.parcel_events import parcel_channel, user_channel
+from app.utils.sse import create_stream_token, sse_response, stream_jwt_required
 
 parcel_bp = Blueprint('parcel_bp', __name__, url_prefix='/parcels')
 
 @parcel_bp.route('', methods=['GET'])
 @jwt_required()
 def get_parcels():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if user.role == 'admin':
-        parcels = Parcel.query.all()
+    current_user_id = get_current_user_id()
+    role, _ = get_current_access()
+    if role == 'admin':
+        query = parcel_listing_query()
     else:
-        parcels = Parcel.query.filter_by(user_id=current_user_id).all()
-    return jsonify([parcel.to_dict() for parcel in parcels]), 200
+        query = parcel_listing_query(user_id=current_user_id)
+    try:
+        return conditional_page(
+            query, Parcel, "parcels", reference_cache.current_version(), projection=parcel_projection
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
 @parcel_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_parcel():
-    data = request.get_json()
-    current_user_id = get_jwt_identity()
-    parcel = Parcel(
-        weight=data['weight'],
-        pickup_location=data['pickup_location'],
-        destination=data['destination'],
-        user_id=current_user_id
+    data = request.get_json(silent=True) or {}
+    return create_parcel_for_user(get_current_user_id(), data)
+
+@parcel_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_parcels():
+    # A multipart upload in "file", or the raw request body
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    import_format = detect_format(
+        request.args.get('format'),
+        upload.filename if upload else None,
+        upload.mimetype if upload else request.mimetype,
     )
-    db.session.add(parcel)
-    db.session.commit()
-    return jsonify(parcel.to_dict()), 201
+    if import_format is None:
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+
+    rows = iter_csv_rows(stream) if import_format == 'csv' else iter_ndjson_rows(stream)
+    return import_parcels_for_user(get_current_user_id(), rows)
 
 @parcel_bp.route('/<int:parcel_id>', methods=['GET'])
 @jwt_required()
 def get_parcel(parcel_id):
     parcel = Parcel.query.get_or_404(parcel_id)
-    return jsonify(parcel.to_dict()), 200
+    # Status/location names come from reference data, so its version is part of the ETag
+    etag = make_etag("parcel", parcel.id, parcel.created_at, parcel.updated_at, reference_cache.current_version())
+    return conditional_response(etag, parcel.updated_at or parcel.created_at, lambda: (parcel.to_dict(), 200))
+
+@parcel_bp.route('/<int:parcel_id>/events', methods=['GET'])
+@jwt_required()
+def get_parcel_events(parcel_id):
+    parcel = Parcel.query.get_or_404(parcel_id)
+    role, _ = get_current_access()
+    if role != 'admin' and parcel.user_id != get_current_user_id():
+        return jsonify({"error": "Unauthorized"}), 403
+    events = (
+        ParcelEvent.query.filter_by(parcel_id=parcel_id)
+        .order_by(ParcelEvent.created_at, ParcelEvent.id)
+        .all()
+    )
+    return jsonify({"parcel": parcel.to_dict(), "events": [event.to_dict() for event in events]}), 200
+
+# EventSource can't set headers, so the live streams also accept ?jwt=<stream token>
+@parcel_bp.route('/stream-token', methods=['POST'])
+@jwt_required()
+def issue_stream_token():
+    return jsonify({
+        "stream_token": create_stream_token(get_jwt_identity(), get_jwt()),
+        "expires_in": current_app.config.get("SSE_TOKEN_EXPIRES", 60),
+    }), 200
+
+@parcel_bp.route('/stream', methods=['GET'])
+@stream_jwt_required
+def stream_user_parcels():
+    return sse_response([user_channel(get_current_user_id())])
+
+@parcel_bp.route('/<int:parcel_id>/stream', methods=['GET'])
+@stream_jwt_required
+def stream_parcel(parcel_id):
+    parcel = Parcel.query.get_or_404(parcel_id)
+    role, _ = get_current_access()
+    if role != 'admin' and parcel.user_id != get_current_user_id():
+        return jsonify({"error": "Unauthorized"}), 403
+    return sse_response([parcel_channel(parcel_id)], initial=[("snapshot", parcel.to_dict())])
 
 @parcel_bp.route('/<int:parcel_id>', methods=['PATCH'])
 @jwt_required()
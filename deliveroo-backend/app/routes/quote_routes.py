@@ -0,0 +1,9 @@
+from flask import Blueprint, request
+from app.presenters.quote_presenter import quote_parcels
+
+quote_bp = Blueprint('quote_bp', __name__, url_prefix='/quotes')
+
+@quote_bp.route('', methods=['POST'])
+def create_quotes():
+    data = request.get_json(silent=True) or {}
+    return quote_parcels(data)
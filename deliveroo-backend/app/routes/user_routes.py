@@ -1,7 +1,11 @@
 from flask import Blueprint, jsonify, request
-from app.models.user import User
+from app.models.user import User, user_projection
 from app.utils.decorators import admin_required
+from app.utils.role_cache import role_cache
+from app.utils.soft_delete import include_deleted
 from app.extensions import db
+from app.utils.pagination import InvalidCursor
+from app.utils.conditional import conditional_page
 
 from sqlalchemy.sql import func
 
@@ -11,26 +15,17 @@ user_bp = Blueprint('user_bp', __name__, url_prefix='/users')
 @admin_required
 def get_users():
     role = request.args.get("role")
-    include_deleted = request.args.get("include_deleted", "false").lower() == "true"
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 10, type=int)
-
     query = User.query
-    if not include_deleted:
-        query = query.filter_by(is_deleted=False)
+    if request.args.get("include_deleted", "false").lower() == "true":
+        query = include_deleted(query)
     if role:
-        query = query.filter(User.role.ilike(role))
-        
-    pagination = query.paginate(page, per_page, error_out=False)
-    users = [user.to_dict() for user in pagination.items]
+        # Roles are stored lowercase; plain equality keeps the role index usable
+        query = query.filter(User.role == role.lower())
 
-    return jsonify({
-        "users": users,
-        "total": pagination.total,
-        "page": pagination.page,
-        "per_page": pagination.per_page,
-        "pages": pagination.pages
-    }), 200
+    try:
+        return conditional_page(query, User, "users", projection=user_projection)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
 
 # POST /users/assign-role
@@ -48,30 +43,33 @@ def assign_role():
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    user.role = role
+    user.role = role.lower()
     db.session.commit()
+    role_cache.invalidate(user.id)
     return jsonify(user.to_dict()), 200
 
 # Soft DELETE /users/<int:user_id>
 @user_bp.route('/<int:user_id>', methods=['DELETE'])
 @admin_required
 def delete_user(user_id):
-    user = User.query.get_or_404(user_id)
+    user = include_deleted(User.query).get_or_404(user_id)
     if user.is_deleted:
         return jsonify({"error": "User already deleted"}), 400
     user.is_deleted = True
     db.session.commit()
+    role_cache.invalidate(user.id)
     return jsonify({"message": f"User {user.email} soft-deleted successfully"}), 200
 
 # PATCH /users/<int:user_id>/restore
 @user_bp.route('/<int:user_id>/restore', methods=['PATCH'])
 @admin_required
 def restore_user(user_id):
-    user = User.query.get_or_404(user_id)
+    user = include_deleted(User.query).get_or_404(user_id)
     if not user.is_deleted:
         return jsonify({"error": "User is not deleted"}), 400
     user.is_deleted = False
     db.session.commit()
+    role_cache.invalidate(user.id)
     return jsonify({"message": f"User {user.email} restored successfully"}), 200
 
     
@@ -0,0 +1,105 @@
+import hashlib
+import json
+from datetime import timezone
+
+from flask import jsonify, request, Response
+
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, approximate_count, encode_cursor, keyset_query
+)
+
+
+def make_etag(*parts):
+    """
+    Opaque validator for a representation built from `parts` (ids, timestamps, versions).
+    """
+    digest = hashlib.sha1(json.dumps(parts, default=str, separators=(",", ":")).encode())
+    return digest.hexdigest()[:32]
+
+
+def _http_time(moment):
+    # HTTP dates have second precision and our columns hold naive UTC
+    if moment is None:
+        return None
+    return moment.replace(microsecond=0, tzinfo=moment.tzinfo or timezone.utc)
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    True when the request's validators show the client already has this version.
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return bool(since and last_modified and _http_time(last_modified) <= since)
+
+
+def conditional_response(etag, last_modified, build):
+    """
+    304 with no body when the client's copy is current; otherwise `build()`'s
+    (body, status) as JSON. Either way it carries ETag/Last-Modified, and
+    clients are told to revalidate before reusing their copy.
+    """
+    last_modified = _http_time(last_modified)
+    if is_not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        body, status = build()
+        response = jsonify(body)
+        response.status_code = status
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_page(query, model, key, *version, projection=None):
+    """
+    Keyset page of `query` (see pagination.keyset_page) behind a collection ETag.
+
+    The ETag covers the page's (id, created_at, updated_at) triples, the paging
+    args and `version` (e.g. the reference data version), so any insert, update
+    or delete that changes the page changes it. Those triples come from a narrow
+    projection over the listing index; the full rows are only loaded and
+    serialised when the client's copy is stale, through `projection` when
+    given (plain column rows, no ORM objects) or each item's to_dict().
+    """
+    limit = min(max(request.args.get("limit", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get("cursor")
+    include_total = request.args.get("include_total", "false").lower() == "true"
+
+    stamps = keyset_query(
+        query.with_entities(model.id, model.created_at, model.updated_at), model, cursor=cursor, limit=limit
+    ).all()
+    total = approximate_count(query) if include_total else None
+    etag = make_etag(key, limit, cursor, total, version, [tuple(row) for row in stamps])
+    last_modified = max((row.updated_at or row.created_at for row in stamps if row.created_at), default=None)
+
+    def build():
+        page_ids = [row.id for row in stamps[:limit]]
+        if not page_ids:
+            items = []
+        elif projection is not None:
+            rows = query.with_entities(*projection.columns).filter(model.id.in_(page_ids))
+            by_id = {item["id"]: item for item in projection.to_dicts(rows)}
+            items = [by_id[row_id] for row_id in page_ids if row_id in by_id]
+        else:
+            by_id = {item.id: item.to_dict() for item in query.filter(model.id.in_(page_ids))}
+            items = [by_id[row_id] for row_id in page_ids if row_id in by_id]
+        next_cursor = None
+        if len(stamps) > limit:
+            last = stamps[limit - 1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+        body = {
+            key: items,
+            "next_cursor": next_cursor,
+            "limit": limit,
+        }
+        if include_total:
+            body["total_estimate"] = total
+        return body, 200
+
+    return conditional_response(etag, last_modified, build)
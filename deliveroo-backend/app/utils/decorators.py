@@ -1,15 +1,14 @@
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from functools import wraps
 from flask import jsonify
-from app.models.user import User
+from app.utils.jwt import get_current_access
 
 def admin_required(fn):
     @wraps(fn)
     @jwt_required()
     def wrapper(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user or user.role != 'admin':
+        role, is_deleted = get_current_access()
+        if role != 'admin' or is_deleted:
             return jsonify({"error": "Admin access required"}), 403
         return fn(*args, **kwargs)
     return wrapper
@@ -0,0 +1,163 @@
+import logging
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_, select, update
+
+from app.extensions import db
+from app.models.email_outbox import EmailOutbox
+from app.utils.email_utils import get_email_backend
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts, base_seconds):
+    """
+    Exponential backoff with jitter: base * 2^(attempts - 1), +/- 10%.
+    """
+    delay = base_seconds * (2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def claim_batch(batch_size, lease_seconds, max_attempts):
+    """
+    Mark up to `batch_size` due messages as 'sending' and return
+    (claim token, plain snapshots of them).
+
+    Rows are locked with SKIP LOCKED on Postgres, so several workers never claim
+    the same message. A worker that dies mid-batch leaves its rows in 'sending';
+    they become due again once the lease has passed. Claiming counts as an
+    attempt, so a message that keeps crashing or hanging its worker still runs
+    out of attempts: one claimed again with none left is marked failed instead.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    rows = db.session.execute(
+        select(EmailOutbox)
+        .where(
+            or_(EmailOutbox.status == EmailOutbox.PENDING, EmailOutbox.status == EmailOutbox.SENDING),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    batch = []
+    for email in rows:
+        if email.attempts >= max_attempts:
+            email.status = EmailOutbox.FAILED
+            email.claim_token = None
+            email.last_error = email.last_error or "Lease expired on the last attempt"
+            logger.error(f"Email {email.id} to {email.to_email} failed permanently: {email.last_error}")
+            continue
+        email.status = EmailOutbox.SENDING
+        email.attempts += 1
+        email.claim_token = token
+        email.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        batch.append({
+            "id": email.id,
+            "to_email": email.to_email,
+            "subject": email.subject,
+            "content": email.content,
+            "attempts": email.attempts,
+        })
+    db.session.commit()
+    return token, batch
+
+
+def process_outbox_batch(backend=None, executor=None):
+    """
+    Claim one batch, send it through `backend` on the worker pool and record
+    each outcome. Returns the number of messages claimed.
+
+    Outcomes are only written to rows still holding this batch's claim token;
+    a row whose lease ran out and was claimed by another worker is left to it.
+    """
+    config = current_app.config
+    backend = backend or get_email_backend()
+    max_attempts = config.get("EMAIL_MAX_ATTEMPTS", 5)
+    base_delay = config.get("EMAIL_RETRY_BASE_SECONDS", 30)
+
+    token, batch = claim_batch(config.get("EMAIL_BATCH_SIZE", 50), config.get("EMAIL_LEASE_SECONDS", 300),
+                               max_attempts)
+    if not batch:
+        return 0
+
+    def deliver(email):
+        try:
+            backend.send(email["to_email"], email["subject"], email["content"])
+            return None
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+
+    if executor is not None:
+        errors = list(executor.map(deliver, batch))
+    else:
+        errors = [deliver(email) for email in batch]
+
+    now = datetime.utcnow()
+    held = (EmailOutbox.claim_token == token, EmailOutbox.status == EmailOutbox.SENDING)
+    sent_ids = [email["id"] for email, error in zip(batch, errors) if error is None]
+    if sent_ids:
+        recorded = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(sent_ids), *held)
+            .values(status=EmailOutbox.SENT, sent_at=now, last_error=None, claim_token=None)
+        ).rowcount
+        if recorded < len(sent_ids):
+            logger.warning(f"{len(sent_ids) - recorded} sent emails had lost their lease; sent more than once")
+
+    for email, error in zip(batch, errors):
+        if error is None:
+            continue
+        attempts = email["attempts"]
+        values = {"last_error": error, "claim_token": None}
+        if attempts >= max_attempts:
+            values["status"] = EmailOutbox.FAILED
+            logger.error(f"Email {email['id']} to {email['to_email']} failed permanently: {error}")
+        else:
+            values["status"] = EmailOutbox.PENDING
+            values["next_attempt_at"] = now + retry_delay(attempts, base_delay)
+            logger.warning(f"Email {email['id']} attempt {attempts} failed, retrying: {error}")
+        db.session.execute(update(EmailOutbox).where(EmailOutbox.id == email["id"], *held).values(**values))
+
+    db.session.commit()
+    return len(batch)
+
+
+def run_outbox_worker(app, stop_event=None):
+    """
+    Drain the outbox until `stop_event` is set, sleeping EMAIL_POLL_INTERVAL
+    seconds whenever there is nothing due.
+    """
+    stop_event = stop_event or threading.Event()
+    with app.app_context():
+        backend = get_email_backend()
+        poll_interval = app.config.get("EMAIL_POLL_INTERVAL", 2)
+        with ThreadPoolExecutor(max_workers=app.config.get("EMAIL_WORKER_THREADS", 4)) as executor:
+            while not stop_event.is_set():
+                try:
+                    claimed = process_outbox_batch(backend=backend, executor=executor)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Email outbox batch failed")
+                    claimed = 0
+                finally:
+                    db.session.remove()
+                if not claimed:
+                    stop_event.wait(poll_interval)
+
+
+def register_outbox_commands(app):
+    @app.cli.command("email-worker")
+    def email_worker():
+        """Send queued emails until interrupted."""
+        try:
+            run_outbox_worker(app)
+        except KeyboardInterrupt:
+            pass
@@ -1,26 +1,99 @@
+import json
+import logging
 import os
+from datetime import datetime
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from dotenv import load_dotenv
+from flask import current_app
+
+from app.extensions import db
 
 load_dotenv()
 
-def send_email(to_email, subject, content):
-    message = Mail(
-        from_email=os.getenv('SENDER_EMAIL'),
-        to_emails=to_email,
-        subject=subject,
-        plain_text_content=content,
-    )
+logger = logging.getLogger(__name__)
+
+
+# ----------------- Backends ----------------- #
+
+class SendGridBackend:
+    """Delivers through the SendGrid API; raises on any non-2xx response."""
+
+    def __init__(self, api_key=None, sender=None):
+        self.client = SendGridAPIClient(api_key or os.getenv('SENDGRID_API_KEY'))
+        self.sender = sender or os.getenv('SENDER_EMAIL')
+
+    def send(self, to_email, subject, content):
+        message = Mail(
+            from_email=self.sender,
+            to_emails=to_email,
+            subject=subject,
+            plain_text_content=content,
+        )
+        response = self.client.send(message)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid responded {response.status_code}: {response.body}")
+        return response
+
+
+class ConsoleBackend:
+    """Logs messages instead of sending them. Meant for local development."""
+
+    def send(self, to_email, subject, content):
+        logger.info(f"Email to {to_email}: {subject}\n{content}")
+
 
+class FileBackend:
+    """Appends each message as a JSON line to a file. Meant for tests and local runs."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, to_email, subject, content):
+        with open(self.path, "a") as handle:
+            handle.write(json.dumps({
+                "to_email": to_email,
+                "subject": subject,
+                "content": content,
+                "sent_at": datetime.utcnow().isoformat(),
+            }) + "\n")
+
+
+def get_email_backend():
+    """
+    Build the backend named by the EMAIL_BACKEND setting ('sendgrid', 'console' or 'file').
+    """
+    name = current_app.config.get("EMAIL_BACKEND", "sendgrid")
+    if name == "console":
+        return ConsoleBackend()
+    if name == "file":
+        return FileBackend(current_app.config.get("EMAIL_FILE_PATH", "sent_emails.jsonl"))
+    if name == "sendgrid":
+        return SendGridBackend()
+    raise ValueError(f"Unknown EMAIL_BACKEND '{name}'")
+
+
+# ----------------- Sending ----------------- #
+
+def queue_email(to_email, subject, content):
+    """
+    Add a message to the outbox. The outbox worker does the actual delivery,
+    so the caller's only cost is one INSERT.
+    """
+    from app.models.email_outbox import EmailOutbox
+
+    email = EmailOutbox(to_email=to_email, subject=subject, content=content)
+    db.session.add(email)
+    db.session.commit()
+    return email
+
+
+def send_email(to_email, subject, content):
+    """
+    Send a message right away with the configured backend, bypassing the outbox.
+    """
     try:
-        sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        response = sg.send(message)
-        return {
-            "status": "Email sent",
-            "status_code": response.status_code,
-            "body": response.body,
-            "headers": dict(response.headers)
-        }
+        get_email_backend().send(to_email, subject, content)
+        return {"status": "Email sent"}, 200
     except Exception as e:
-        return {"error": str(e)}
+        return {"error": str(e)}, 502
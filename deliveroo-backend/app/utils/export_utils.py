@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.extensions import db
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _stream_rows(stmt):
+    """
+    Execute `stmt` on a server-side cursor and yield its rows EXPORT_CHUNK_SIZE at a time.
+    """
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    try:
+        for chunk in result.partitions():
+            yield chunk
+    finally:
+        result.close()
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_ndjson(stmt, columns):
+    """
+    Yield the rows of `stmt` as newline-delimited JSON, one chunk of lines per yield.
+    """
+    for chunk in _stream_rows(stmt):
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row)))) + "\n" for row in chunk
+        )
+
+
+def iter_csv(stmt, columns):
+    """
+    Yield the rows of `stmt` as CSV, header first, one chunk of lines per yield.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for chunk in _stream_rows(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
@@ -0,0 +1,342 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+import click
+from flask import Response, current_app, jsonify, make_response, request
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+from app.utils.jwt import get_current_user_id
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+StoredResponse = namedtuple("StoredResponse", "fingerprint status_code content_type body expires_at")
+
+
+class ResponseCache:
+    """
+    Per-process front cache of completed keys, so most retries are answered
+    without a database round trip. Holds at most IDEMPOTENCY_CACHE_SIZE
+    entries (least recently used go first), each until the key expires.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope):
+        with self._lock:
+            stored = self._entries.get(scope)
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.utcnow():
+                del self._entries[scope]
+                return None
+            self._entries.move_to_end(scope)
+            return stored
+
+    def set(self, scope, stored):
+        size = current_app.config.get("IDEMPOTENCY_CACHE_SIZE", 10000)
+        with self._lock:
+            self._entries[scope] = stored
+            self._entries.move_to_end(scope)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class KeyLocks:
+    """
+    Per-key locks, so duplicates arriving at this process queue behind the
+    first instead of polling the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}  # scope -> [lock, holders and waiters]
+
+    @contextmanager
+    def hold(self, scope, timeout):
+        with self._lock:
+            entry = self._locks.setdefault(scope, [threading.Lock(), 0])
+            entry[1] += 1
+        acquired = entry[0].acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[scope]
+
+
+response_cache = ResponseCache()
+key_locks = KeyLocks()
+
+
+def request_fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+# ----------------- Key rows ----------------- #
+# Claims and results are written on their own connection and committed at
+# once, so other processes see them while the handler's transaction is open.
+
+def _stored(row):
+    return StoredResponse(row.fingerprint, row.status_code, row.content_type, row.response_body, row.expires_at)
+
+
+def claim_key(user_id, key, fingerprint):
+    """
+    Try to take the key for this request. Returns (claim_token, None) when the
+    caller now holds it, or (None, row) with the row as another request left it.
+    Expired keys and claims whose holder stopped renewing them (locked_until
+    passed) are taken over.
+    """
+    from app.models.idempotency_key import IdempotencyKey
+
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    values = {
+        "fingerprint": fingerprint,
+        "claim_token": token,
+        "status_code": None,
+        "content_type": None,
+        "response_body": None,
+        "locked_until": now + timedelta(seconds=current_app.config.get("IDEMPOTENCY_LOCK_SECONDS", 30)),
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=current_app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400)),
+    }
+    with db.engine.begin() as connection:
+        dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+        inserted = connection.execute(
+            dialect.insert(IdempotencyKey)
+            .values(user_id=user_id, key=key, **values)
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+        )
+        if inserted.rowcount == 1:
+            return token, None
+
+        taken_over = connection.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                or_(
+                    IdempotencyKey.expires_at <= now,
+                    and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until <= now),
+                ),
+            )
+            .values(**values)
+        )
+        if taken_over.rowcount == 1:
+            return token, None
+
+        return None, connection.execute(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).first()
+
+
+def complete_key(user_id, key, token, response):
+    """
+    Store the response for replays and release the claim. Returns the stored
+    row, or None when the claim was lost to another request meanwhile.
+    """
+    from app.models.idempotency_key import IdempotencyKey
+
+    with db.engine.begin() as connection:
+        completed = connection.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key,
+                   IdempotencyKey.claim_token == token)
+            .values(status_code=response.status_code, content_type=response.content_type,
+                    response_body=response.get_data(), claim_token=None, locked_until=None)
+        )
+        if completed.rowcount != 1:
+            return None
+        row = connection.execute(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).first()
+    return _stored(row)
+
+
+def release_key(user_id, key, token):
+    """
+    Drop this request's unfinished claim so the client's retry runs the handler again.
+    """
+    from app.models.idempotency_key import IdempotencyKey
+
+    with db.engine.begin() as connection:
+        connection.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.key == key,
+                IdempotencyKey.claim_token == token, IdempotencyKey.status_code.is_(None)
+            )
+        )
+
+
+@contextmanager
+def renewing_claim(user_id, key, token):
+    """
+    Keep pushing the claim's locked_until forward while the block runs, so a
+    handler slower than IDEMPOTENCY_LOCK_SECONDS is not taken over mid-run.
+    """
+    from app.models.idempotency_key import IdempotencyKey
+
+    engine = db.engine
+    lock_seconds = current_app.config.get("IDEMPOTENCY_LOCK_SECONDS", 30)
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lock_seconds / 3):
+            with engine.begin() as connection:
+                connection.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key,
+                           IdempotencyKey.claim_token == token)
+                    .values(locked_until=datetime.utcnow() + timedelta(seconds=lock_seconds))
+                )
+
+    renewer = threading.Thread(target=renew, name=f"idempotency-claim-{token[:8]}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        renewer.join()
+
+
+def wait_for_key(user_id, key, deadline):
+    """
+    Poll a key another process is handling until it completes or `deadline`
+    (monotonic) passes. Returns the completed row, or None.
+    """
+    from app.models.idempotency_key import IdempotencyKey
+
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            ).first()
+        if row is None or row.status_code is not None:
+            return row
+    return None
+
+
+def purge_expired_keys():
+    from app.models.idempotency_key import IdempotencyKey
+
+    with db.engine.begin() as connection:
+        return connection.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        ).rowcount
+
+
+# ----------------- Decorator ----------------- #
+
+def _key_reused():
+    return jsonify({"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"}), 422
+
+
+def _replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        return _key_reused()
+    response = Response(stored.body, status=stored.status_code, content_type=stored.content_type)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _in_progress():
+    response = jsonify({"error": f"A request with this {IDEMPOTENCY_HEADER} is still being processed"})
+    response.status_code = 409
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+def idempotent(fn):
+    """
+    Honour an Idempotency-Key header on a mutating route (after the JWT check).
+
+    The first request with a key runs the view and its response (unless 5xx)
+    is stored for IDEMPOTENCY_TTL_SECONDS; retries with the same key and body
+    get that response back with Idempotent-Replayed: true, and the same key
+    with a different request gets 422. While the first is still running,
+    duplicates wait up to IDEMPOTENCY_WAIT_SECONDS for its result, then get
+    409 with Retry-After. Requests without the header are not affected.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return fn(*args, **kwargs)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+
+        user_id = get_current_user_id() or 0
+        scope = (user_id, key)
+        fingerprint = request_fingerprint()
+        stored = response_cache.get(scope)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        wait = current_app.config.get("IDEMPOTENCY_WAIT_SECONDS", 5)
+        deadline = time.monotonic() + wait
+        with key_locks.hold(scope, wait) as acquired:
+            if not acquired:
+                return _in_progress()
+            # A duplicate in this process may have finished while we queued
+            stored = response_cache.get(scope)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            token, row = claim_key(user_id, key, fingerprint)
+            if token is None:
+                if row.status_code is None:
+                    if row.fingerprint != fingerprint:
+                        return _key_reused()
+                    row = wait_for_key(user_id, key, deadline)
+                    if row is None or row.status_code is None:
+                        return _in_progress()
+                stored = _stored(row)
+                response_cache.set(scope, stored)
+                return _replay(stored, fingerprint)
+
+            try:
+                with renewing_claim(user_id, key, token):
+                    response = make_response(fn(*args, **kwargs))
+            except BaseException:
+                release_key(user_id, key, token)
+                raise
+            if response.status_code >= 500 or response.is_streamed:
+                release_key(user_id, key, token)
+                return response
+            stored = complete_key(user_id, key, token, response)
+            if stored is not None:
+                response_cache.set(scope, stored)
+            return response
+    return wrapper
+
+
+def register_idempotency_commands(app):
+    @app.cli.command("purge-idempotency-keys")
+    def purge():
+        """Delete idempotency keys past their TTL."""
+        click.echo(f"Purged {purge_expired_keys()} expired idempotency keys")
@@ -0,0 +1,79 @@
+import csv
+import io
+from itertools import islice
+
+from flask import current_app
+
+IMPORT_FORMATS = {
+    "csv": "csv",
+    "text/csv": "csv",
+    "ndjson": "ndjson",
+    "jsonl": "ndjson",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+def detect_format(explicit=None, filename=None, mimetype=None):
+    """
+    'csv' or 'ndjson' from a ?format= value, the upload's file extension or its
+    content type, in that order; None when none of them is recognised.
+    """
+    candidates = [explicit, filename.rsplit(".", 1)[-1] if filename and "." in filename else None, mimetype]
+    for candidate in candidates:
+        if candidate and candidate.lower() in IMPORT_FORMATS:
+            return IMPORT_FORMATS[candidate.lower()]
+    return None
+
+
+def _text(stream):
+    # Decoded lazily, so only the current read buffer is ever held in memory
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def iter_csv_rows(stream):
+    """
+    Yield (line, row, error) for each record of a CSV upload with a header row.
+    Empty cells are left out of `row`, so optional fields fall back to their defaults.
+    """
+    reader = csv.DictReader(_text(stream))
+    try:
+        for row in reader:
+            data = {key: value for key, value in row.items() if key is not None and value != ""}
+            if None in row:
+                yield reader.line_num, None, "More values than header columns."
+            else:
+                yield reader.line_num, data, None
+    except csv.Error as err:
+        yield reader.line_num, None, f"Malformed CSV: {err}"
+
+
+def iter_ndjson_rows(stream):
+    """
+    Yield (line, row, error) for each non-blank line of a newline-delimited JSON upload.
+    """
+    loads = current_app.json.loads
+    for line_number, line in enumerate(_text(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON."
+            continue
+        if isinstance(data, dict):
+            yield line_number, data, None
+        else:
+            yield line_number, None, "Each line must be a JSON object."
+
+
+def iter_chunks(iterable, size):
+    """
+    Lists of up to `size` items from any iterable, without reading ahead further.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,45 @@
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.extensions import db
+from app.utils.role_cache import role_cache
+
+
+def user_claims(user):
+    """
+    Extra JWT claims issued at login so authorisation checks need no User lookup.
+    """
+    return {"role": user.role, "is_deleted": bool(user.is_deleted)}
+
+
+def get_current_user_id():
+    """
+    Id of the authenticated user, whether the token identity is the id itself
+    or the identity dict issued by auth_presenter.login_user.
+    """
+    identity = get_jwt_identity()
+    if isinstance(identity, dict):
+        return identity.get("id")
+    return identity
+
+
+def get_current_access():
+    """
+    Return (role, is_deleted) for the authenticated user.
+
+    Tokens that claim a non-admin role are trusted as-is, since a stale claim can
+    only under-grant. Admin claims, and older tokens without claims, are checked
+    against the role cache, which only hits the database once per TTL.
+    """
+    claims = get_jwt()
+    if "role" in claims and claims["role"] != "admin":
+        return claims["role"], bool(claims.get("is_deleted"))
+
+    user_id = get_current_user_id()
+    cached = role_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    from app.models.user import User
+    user = db.session.get(User, user_id)
+    if not user:
+        return None, True
+    return role_cache.set(user_id, user.role, user.is_deleted)
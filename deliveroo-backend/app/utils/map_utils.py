@@ -0,0 +1,319 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import click
+import numpy as np
+from flask import current_app
+from numpy.lib.format import open_memmap
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+MIN_CAPACITY = 64
+# Rows computed per step of a full build; bounds the float64 scratch to ROWS x capacity
+BUILD_CHUNK_ROWS = 1024
+
+MATRIX_FILE = "distances.npy"
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km between points given in degrees. Arguments broadcast,
+    so a column of origins against a row of destinations yields the full matrix.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _capacity_for(count):
+    capacity = MIN_CAPACITY
+    while capacity < count:
+        capacity *= 2
+    return capacity
+
+
+class DistanceMatrix:
+    """
+    Location-to-location great-circle (haversine) distance in km, as a square
+    float32 .npy file on disk. It is not road distance; routes by road run longer.
+
+    Each location owns a slot (row and column); index.json maps location ids to
+    slots and keeps their coordinates. The matrix is allocated with spare
+    capacity, so adding a location only fills in its own row and column in place.
+    A full rebuild happens only when capacity runs out, and then it doubles.
+
+    Workers memory-map the file read-only, so they all share one copy in the
+    page cache and see in-place writes straight away. They re-read the index at
+    most once every DISTANCE_MATRIX_CHECK_INTERVAL seconds. Writers take a file
+    lock and write the index last, after the slot's data is in place.
+    Travel times are estimates, not measured: great-circle distance at an
+    assumed DISTANCE_MATRIX_SPEED_KMH.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._directory = None
+        self._index_mtime = None
+        self._next_check = 0.0
+        self._matrix = None
+        self._slots = {}
+        self._slot_lookup = np.empty(0, dtype=np.int64)
+
+    # ----------------- Reads ----------------- #
+
+    def distance_km(self, origin_id, destination_id):
+        """
+        Distance between two locations, or None if either has no coordinates in the matrix.
+        """
+        self._ensure_fresh()
+        origin = self._slots.get(origin_id)
+        destination = self._slots.get(destination_id)
+        if origin is None or destination is None:
+            return None
+        return float(self._matrix[origin, destination])
+
+    def travel_minutes(self, origin_id, destination_id):
+        """
+        Estimated minutes between two locations: straight-line distance at the
+        assumed DISTANCE_MATRIX_SPEED_KMH, not a real travel time. None as for distance_km.
+        """
+        distance = self.distance_km(origin_id, destination_id)
+        if distance is None:
+            return None
+        return distance / current_app.config.get("DISTANCE_MATRIX_SPEED_KMH", 40) * 60
+
+    def distances_km(self, origin_ids, destination_ids):
+        """
+        Distances for parallel arrays of location ids; NaN where a location is not in the matrix.
+        """
+        self._ensure_fresh()
+        origins = self.slots_for(origin_ids)
+        destinations = self.slots_for(destination_ids)
+        distances = np.full(len(origins), np.nan)
+        known = (origins >= 0) & (destinations >= 0)
+        if known.any():
+            distances[known] = self._matrix[origins[known], destinations[known]]
+        return distances
+
+    def slots_for(self, location_ids):
+        """
+        Matrix slot of each location id, -1 where the location has none.
+        """
+        self._ensure_fresh()
+        ids = np.asarray(location_ids, dtype=np.int64)
+        slots = np.full(ids.shape, -1, dtype=np.int64)
+        in_range = (ids >= 0) & (ids < len(self._slot_lookup))
+        slots[in_range] = self._slot_lookup[ids[in_range]]
+        return slots
+
+    def submatrix(self, location_ids):
+        """
+        Dense distance matrix between `location_ids` (all must have slots), for routing.
+        """
+        slots = self.slots_for(location_ids)
+        if (slots < 0).any():
+            raise KeyError("Some locations have no coordinates in the distance matrix.")
+        return np.asarray(self._matrix[np.ix_(slots, slots)], dtype=float)
+
+    def _ensure_fresh(self):
+        directory = _matrix_directory()
+        if directory == self._directory and time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            index_path = os.path.join(directory, INDEX_FILE)
+            try:
+                mtime = os.stat(index_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if directory != self._directory or mtime != self._index_mtime:
+                self._load(directory, mtime)
+            interval = current_app.config.get("DISTANCE_MATRIX_CHECK_INTERVAL", 5)
+            self._next_check = time.monotonic() + interval
+
+    def _load(self, directory, mtime):
+        index = _read_index(directory)
+        self._directory = directory
+        self._index_mtime = mtime
+        if index is None:
+            self._matrix = None
+            self._slots = {}
+            self._slot_lookup = np.empty(0, dtype=np.int64)
+            return
+
+        self._matrix = np.load(os.path.join(directory, MATRIX_FILE), mmap_mode="r")
+        self._slots = {location_id: slot for slot, location_id in enumerate(index["ids"])}
+        lookup = np.full(max(index["ids"], default=-1) + 1, -1, dtype=np.int64)
+        lookup[index["ids"]] = np.arange(len(index["ids"]))
+        self._slot_lookup = lookup
+
+    def reset(self):
+        with self._lock:
+            self._directory = None
+            self._next_check = 0.0
+
+    # ----------------- Writes ----------------- #
+
+    def build(self, locations):
+        """
+        Rebuild the whole matrix from (id, latitude, longitude) triples.
+        """
+        directory = _matrix_directory()
+        with _file_lock(directory):
+            ids, coords = [], []
+            for location_id, latitude, longitude in locations:
+                ids.append(location_id)
+                coords.append([latitude, longitude])
+            _write_full(directory, ids, coords, _capacity_for(len(ids)), _next_version(directory))
+        self.reset()
+        return len(ids)
+
+    def upsert(self, location_id, latitude, longitude):
+        """
+        Give a location a slot (or move its existing one) and fill in its row and column.
+        """
+        directory = _matrix_directory()
+        with _file_lock(directory):
+            index = _read_index(directory) or {"capacity": 0, "ids": [], "coords": [], "version": 0}
+            ids, coords = index["ids"], index["coords"]
+
+            if location_id in ids:
+                slot = ids.index(location_id)
+                coords[slot] = [latitude, longitude]
+            elif len(ids) < index["capacity"]:
+                slot = len(ids)
+                ids.append(location_id)
+                coords.append([latitude, longitude])
+            else:
+                ids.append(location_id)
+                coords.append([latitude, longitude])
+                _write_full(directory, ids, coords, _capacity_for(len(ids) * 2), index["version"] + 1)
+                self.reset()
+                return
+
+            points = np.asarray(coords, dtype=float)
+            row = haversine_km(latitude, longitude, points[:, 0], points[:, 1]).astype(np.float32)
+            matrix = open_memmap(os.path.join(directory, MATRIX_FILE), mode="r+")
+            matrix[slot, :len(ids)] = row
+            matrix[:len(ids), slot] = row
+            matrix.flush()
+            del matrix
+
+            index["version"] += 1
+            _write_index(directory, index)
+        self.reset()
+
+
+distance_matrix = DistanceMatrix()
+
+
+def _matrix_directory():
+    return current_app.config.get("DISTANCE_MATRIX_DIR") or os.path.join(current_app.instance_path, "distance_matrix")
+
+
+@contextmanager
+def _file_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _read_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _write_index(directory, index):
+    path = os.path.join(directory, INDEX_FILE)
+    with open(f"{path}.tmp", "w") as handle:
+        json.dump(index, handle)
+    os.replace(f"{path}.tmp", path)
+
+
+def _next_version(directory):
+    index = _read_index(directory)
+    return index["version"] + 1 if index else 1
+
+
+def _write_full(directory, ids, coords, capacity, version):
+    # Written beside the live file and swapped in, so readers keep a valid mapping throughout
+    path = os.path.join(directory, MATRIX_FILE)
+    tmp_path = os.path.join(directory, f"building-{MATRIX_FILE}")
+    matrix = open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, capacity))
+    if ids:
+        points = np.asarray(coords, dtype=float)
+        lats, lons = points[:, 0], points[:, 1]
+        for start in range(0, len(ids), BUILD_CHUNK_ROWS):
+            stop = min(start + BUILD_CHUNK_ROWS, len(ids))
+            matrix[start:stop, :len(ids)] = haversine_km(
+                lats[start:stop, None], lons[start:stop, None], lats[None, :], lons[None, :]
+            )
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, path)
+    _write_index(directory, {"capacity": capacity, "ids": ids, "coords": coords, "version": version})
+
+
+# ----------------- Keeping the matrix in step with Location ----------------- #
+
+@event.listens_for(Session, "after_flush")
+def _collect_location_coordinates(session, flush_context):
+    from app.models.location import Location
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Location) and obj.latitude is not None and obj.longitude is not None:
+            session.info.setdefault("distance_matrix_updates", {})[obj.id] = (obj.latitude, obj.longitude)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_location_coordinates(session):
+    updates = session.info.pop("distance_matrix_updates", None)
+    if not updates:
+        return
+    for location_id, (latitude, longitude) in updates.items():
+        try:
+            distance_matrix.upsert(location_id, latitude, longitude)
+        except OSError as err:
+            # The next `flask distance-matrix` run repairs it; the commit itself stands
+            logger.error(f"Distance matrix not updated for location {location_id}: {err}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_location_coordinates(session):
+    session.info.pop("distance_matrix_updates", None)
+
+
+def register_map_commands(app):
+    @app.cli.command("distance-matrix")
+    def build_distance_matrix():
+        """Rebuild the location distance matrix from the locations table."""
+        from app.models.location import Location
+
+        rows = db.session.execute(
+            select(Location.id, Location.latitude, Location.longitude)
+            .where(Location.latitude.isnot(None), Location.longitude.isnot(None))
+            .order_by(Location.id)
+        ).all()
+        count = distance_matrix.build(rows)
+        click.echo(f"Distance matrix built for {count} locations in {_matrix_directory()}")
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import func, select, text, tuple_
+from app.extensions import db
+from app.utils.soft_delete import include_deleted, scope_to_live_rows
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    """
+    Build an opaque cursor token pointing just after the given row.
+    """
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Turn a cursor token back into its (created_at, id) pair.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+        return created_at, int(row_id)
+    except (binascii.Error, ValueError, TypeError) as err:
+        raise InvalidCursor(str(err)) from err
+
+
+def approximate_count(query):
+    """
+    Estimate how many rows `query` matches.
+
+    On Postgres this is the planner's row estimate, which costs no table scan.
+    Other backends (SQLite in tests) fall back to an exact COUNT(*).
+    """
+    # Scoped here: the session's soft-delete filter would ignore the inner query's include_deleted
+    statement = scope_to_live_rows(query.enable_eagerloads(False).order_by(None).statement)
+    if db.engine.dialect.name == "postgresql":
+        compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+        plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return db.session.execute(include_deleted(select(func.count()).select_from(statement.subquery()))).scalar()
+
+
+def keyset_query(query, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Restrict `query` to the page after `cursor`, newest first, fetching one extra row.
+
+    Rows are ordered by (created_at, id) descending and the cursor is applied as
+    a row-value comparison, so every page is an index range scan no matter how deep it is.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < (created_at, row_id))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def keyset_paginate(query, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of `query` ordered newest first, plus the cursor for the next page.
+    """
+    rows = keyset_query(query, model, cursor=cursor, limit=limit).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return items, next_cursor
+
+
+def keyset_page(query, model, key):
+    """
+    Paginate `query` using the request's `cursor`, `limit` and `include_total`
+    args and build the response body, with the items under `key`.
+    """
+    limit = min(max(request.args.get("limit", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get("cursor")
+    include_total = request.args.get("include_total", "false").lower() == "true"
+
+    total = approximate_count(query) if include_total else None
+    items, next_cursor = keyset_paginate(query, model, cursor=cursor, limit=limit)
+
+    body = {
+        key: [item.to_dict() for item in items],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+    if include_total:
+        body["total_estimate"] = total
+    return body
@@ -0,0 +1,219 @@
+import logging
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.indexes import is_live
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("status", "location", "day")
+
+
+def parcel_buckets(status_id, location_id, created_at):
+    """
+    The (dimension, bucket) counters one live parcel contributes to.
+    """
+    return [
+        ("status", str(status_id)),
+        ("location", str(location_id)),
+        ("day", created_at.date().isoformat()),
+    ]
+
+
+def counter_deltas(before, after):
+    """
+    Counter changes for a parcel going from `before` to `after`, each a
+    (status_id, location_id, created_at) tuple or None when the parcel is not live.
+    """
+    deltas = Counter()
+    if before is not None:
+        deltas.subtract(parcel_buckets(*before))
+    if after is not None:
+        deltas.update(parcel_buckets(*after))
+    return deltas
+
+
+def apply_counter_deltas(connection, deltas):
+    """
+    Add `deltas` ({(dimension, bucket): n}) to one randomly chosen shard, in the
+    caller's transaction, with a single multi-row upsert.
+    """
+    from app.models.parcel_counter import ParcelCounter
+
+    shard = random.randrange(current_app.config.get("PARCEL_COUNTER_SHARDS", 8))
+    # Sorted so concurrent writers lock counter rows in the same order
+    rows = [
+        {"dimension": dimension, "bucket": bucket, "shard": shard, "count": count}
+        for (dimension, bucket), count in sorted(deltas.items()) if count
+    ]
+    if not rows:
+        return
+
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(ParcelCounter)
+    statement = statement.on_conflict_do_update(
+        index_elements=["dimension", "bucket", "shard"],
+        set_={"count": ParcelCounter.count + statement.excluded["count"]},
+    )
+    connection.execute(statement, rows)
+
+
+def parcel_counts(days=30):
+    """
+    {"status": {status_id: n}, "location": {location_id: n}, "day": {iso date: n}}
+    summed over shards, with only the last `days` days.
+    """
+    from app.models.parcel_counter import ParcelCounter
+
+    cutoff = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    rows = db.session.execute(
+        select(ParcelCounter.dimension, ParcelCounter.bucket, func.sum(ParcelCounter.count))
+        .where((ParcelCounter.dimension != "day") | (ParcelCounter.bucket >= cutoff))
+        .group_by(ParcelCounter.dimension, ParcelCounter.bucket)
+    )
+    counts = {dimension: {} for dimension in DIMENSIONS}
+    for dimension, bucket, count in rows:
+        if count:
+            key = bucket if dimension == "day" else int(bucket)
+            counts[dimension][key] = int(count)
+    return counts
+
+
+def reconcile_parcel_counters():
+    """
+    Recount live parcels with GROUP BY and overwrite the counters, one row per bucket.
+
+    On Postgres the counters table is locked against writers while this runs,
+    so no delta lands between the recount and the overwrite; parcel writes
+    wait for it rather than fail. Returns {(dimension, bucket): (counter, actual)}
+    for every bucket that had drifted.
+    """
+    from app.models.parcel import Parcel
+    from app.models.parcel_counter import ParcelCounter
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("LOCK TABLE parcel_counters IN SHARE ROW EXCLUSIVE MODE"))
+
+    actual = Counter()
+    columns = {
+        "status": Parcel.status_id,
+        "location": Parcel.present_location_id,
+        "day": func.date(Parcel.created_at),
+    }
+    for dimension, column in columns.items():
+        for bucket, count in db.session.execute(
+            select(column, func.count()).where(is_live(Parcel)).group_by(column)
+        ):
+            actual[(dimension, str(bucket))] = count
+
+    recorded = Counter()
+    for dimension, bucket, count in db.session.execute(
+        select(ParcelCounter.dimension, ParcelCounter.bucket, func.sum(ParcelCounter.count))
+        .group_by(ParcelCounter.dimension, ParcelCounter.bucket)
+    ):
+        recorded[(dimension, bucket)] = int(count or 0)
+
+    drift = {
+        key: (recorded[key], actual[key])
+        for key in set(recorded) | set(actual)
+        if recorded[key] != actual[key]
+    }
+
+    db.session.execute(delete(ParcelCounter))
+    rows = [
+        {"dimension": dimension, "bucket": bucket, "shard": 0, "count": count}
+        for (dimension, bucket), count in sorted(actual.items())
+    ]
+    if rows:
+        db.session.execute(insert(ParcelCounter), rows)
+    db.session.commit()
+    return drift
+
+
+# ----------------- Keeping counters in step with ORM writes ----------------- #
+
+def _value_before(state, attribute):
+    history = state.attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), attribute)
+
+
+def _live_state(status_id, location_id, is_deleted, created_at):
+    return None if is_deleted else (status_id, location_id, created_at)
+
+
+@event.listens_for(Session, "before_flush")
+def _count_parcel_changes(session, flush_context, instances):
+    from app.models.parcel import Parcel
+
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Parcel):
+            # Set here rather than by the column default so the day bucket matches the row
+            obj.created_at = obj.created_at or datetime.utcnow()
+            deltas.update(counter_deltas(
+                None, _live_state(obj.status_id, obj.present_location_id, obj.is_deleted, obj.created_at)
+            ))
+    for obj in session.dirty:
+        if not isinstance(obj, Parcel):
+            continue
+        state = inspect(obj)
+        tracked = ("status_id", "present_location_id", "is_deleted")
+        if not any(state.attrs[name].history.has_changes() for name in tracked):
+            continue
+        before = _live_state(
+            _value_before(state, "status_id"), _value_before(state, "present_location_id"),
+            _value_before(state, "is_deleted"), obj.created_at,
+        )
+        after = _live_state(obj.status_id, obj.present_location_id, obj.is_deleted, obj.created_at)
+        deltas.update(counter_deltas(before, after))
+    for obj in session.deleted:
+        if isinstance(obj, Parcel):
+            deltas.update(counter_deltas(
+                _live_state(obj.status_id, obj.present_location_id, obj.is_deleted, obj.created_at), None
+            ))
+
+    if any(deltas.values()):
+        session.info.setdefault("parcel_counter_deltas", Counter()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_parcel_counter_deltas(session, flush_context):
+    deltas = session.info.pop("parcel_counter_deltas", None)
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_parcel_counter_deltas(session):
+    session.info.pop("parcel_counter_deltas", None)
+
+
+def register_counter_commands(app):
+    @app.cli.command("reconcile-parcel-counters")
+    @click.option("--every", type=float, default=None, help="Repeat every N seconds until interrupted.")
+    def reconcile(every):
+        """Recount parcels per status, location and day and correct the counters."""
+        while True:
+            drift = reconcile_parcel_counters()
+            for (dimension, bucket), (recorded, actual) in sorted(drift.items()):
+                logger.warning(f"Parcel counter {dimension}:{bucket} drifted: {recorded} -> {actual}")
+            click.echo(f"Parcel counters reconciled, {len(drift)} buckets corrected")
+            if every is None:
+                return
+            try:
+                time.sleep(every)
+            except KeyboardInterrupt:
+                return
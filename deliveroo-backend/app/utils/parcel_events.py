@@ -0,0 +1,157 @@
+import logging
+from datetime import datetime
+
+from flask import has_request_context
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.utils.jwt import get_current_user_id
+from app.utils.pubsub import get_broker
+from app.utils.reference_cache import reference_cache
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany batch when recording events for a bulk update
+EVENT_BATCH_SIZE = 1000
+
+
+def current_actor_id():
+    """
+    Id of the user behind the current request, or None outside a JWT-authenticated request.
+    """
+    if not has_request_context():
+        return None
+    try:
+        return get_current_user_id()
+    except RuntimeError:
+        return None
+
+
+def record_parcel_events(events, actor_id=None, created_at=None):
+    """
+    Insert events for changes made outside the ORM (bulk UPDATEs) in the current transaction.
+
+    `events` are dicts with parcel_id and optionally status_id, location_id and
+    the owner's user_id (for the owner's live stream); they are written with one
+    executemany per EVENT_BATCH_SIZE rows.
+    """
+    from app.models.parcel_event import ParcelEvent
+
+    created_at = created_at or datetime.utcnow()
+    rows = [
+        {
+            "parcel_id": entry["parcel_id"],
+            "status_id": entry.get("status_id"),
+            "location_id": entry.get("location_id"),
+            "actor_id": actor_id,
+            "created_at": created_at,
+        }
+        for entry in events
+    ]
+    for start in range(0, len(rows), EVENT_BATCH_SIZE):
+        db.session.execute(insert(ParcelEvent.__table__), rows[start:start + EVENT_BATCH_SIZE])
+
+    _queue_updates(db.session, [
+        update_message(row, user_id=entry.get("user_id")) for row, entry in zip(rows, events)
+    ])
+
+
+# ----------------- Live updates ----------------- #
+
+def parcel_channel(parcel_id):
+    return f"parcel:{parcel_id}"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def update_message(event, user_id=None, event_id=None):
+    """
+    What live streams receive for one event; `event` is a row dict or a ParcelEvent.
+    """
+    get = event.get if isinstance(event, dict) else lambda name: getattr(event, name)
+    status = reference_cache.status(get("status_id")) if get("status_id") else None
+    location = reference_cache.location(get("location_id")) if get("location_id") else None
+    created_at = get("created_at")
+    return {
+        "event_id": event_id,
+        "parcel_id": get("parcel_id"),
+        "user_id": user_id,
+        "status_id": get("status_id"),
+        "status": status["name"] if status else None,
+        "location_id": get("location_id"),
+        "location": location["city"] if location else None,
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+
+def _queue_updates(session, messages):
+    # Held until the transaction commits, so streams never see rolled-back changes
+    session.info.setdefault("parcel_updates", []).extend(messages)
+
+
+def _changed_value(state, attribute):
+    history = state.attrs[attribute].history
+    return history.added[0] if history.has_changes() and history.added else None
+
+
+@event.listens_for(Session, "before_flush")
+def _record_parcel_changes(session, flush_context, instances):
+    # Every ORM write to a parcel's status or location leaves an event in the same flush
+    from app.models.parcel import Parcel
+    from app.models.parcel_event import ParcelEvent
+
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Parcel):
+            events.append(ParcelEvent(parcel=obj, status_id=obj.status_id, location_id=obj.present_location_id))
+    for obj in session.dirty:
+        if not isinstance(obj, Parcel):
+            continue
+        state = inspect(obj)
+        status_id = _changed_value(state, "status_id")
+        location_id = _changed_value(state, "present_location_id")
+        if status_id is not None or location_id is not None:
+            events.append(ParcelEvent(parcel=obj, status_id=status_id, location_id=location_id))
+
+    if events:
+        actor_id = current_actor_id()
+        for parcel_event in events:
+            parcel_event.actor_id = actor_id
+        session.add_all(events)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_parcel_updates(session, flush_context):
+    from app.models.parcel_event import ParcelEvent
+
+    messages = [
+        update_message(obj, user_id=obj.parcel.user_id, event_id=obj.id)
+        for obj in session.new if isinstance(obj, ParcelEvent)
+    ]
+    if messages:
+        _queue_updates(session, messages)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_parcel_updates(session):
+    messages = session.info.pop("parcel_updates", None)
+    if not messages:
+        return
+    published = []
+    for message in messages:
+        published.append((parcel_channel(message["parcel_id"]), message))
+        if message["user_id"] is not None:
+            published.append((user_channel(message["user_id"]), message))
+    try:
+        get_broker().publish_many(published)
+    except Exception as err:
+        # Streams are best effort; the committed events remain readable from /events
+        logger.error(f"Publishing {len(messages)} parcel updates failed: {err}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_parcel_updates(session):
+    session.info.pop("parcel_updates", None)
@@ -0,0 +1,90 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+
+class HashingOverloaded(Exception):
+    """Raised when too many hashes are already queued; callers should answer 503."""
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug password hashing on a bounded process pool.
+
+    Hashing is CPU-bound and holds the GIL, so on the request thread a login
+    burst stalls every other request in the worker. Here at most
+    PASSWORD_HASH_MAX_PENDING hashes may be queued or running per process;
+    past that, callers wait up to PASSWORD_HASH_QUEUE_TIMEOUT seconds and then
+    get HashingOverloaded. PASSWORD_HASH_WORKERS = 0 hashes inline instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+
+    def _pool(self):
+        # Pools don't survive fork, so each gunicorn worker builds its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    config = current_app.config
+                    workers = config.get("PASSWORD_HASH_WORKERS", 0)
+                    self._executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+                    self._slots = threading.BoundedSemaphore(config.get("PASSWORD_HASH_MAX_PENDING", 64))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, fn, *args):
+        executor = self._pool()
+        if executor is None:
+            return fn(*args)
+
+        timeout = current_app.config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 0.5)
+        if not self._slots.acquire(timeout=timeout):
+            raise HashingOverloaded()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = None
+            self._pid = None
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password):
+    method = current_app.config.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    return password_hasher.run(generate_password_hash, password, method)
+
+
+def verify_password(password_hash, password):
+    return password_hasher.run(check_password_hash, password_hash, password)
+
+
+def normalise_method(method):
+    """
+    A werkzeug method string with its defaults filled in, as werkzeug writes it
+    into the hash: "scrypt" -> "scrypt:32768:8:1", "pbkdf2" -> "pbkdf2:sha256:600000".
+    """
+    name, *args = method.split(":")
+    defaults = {"scrypt": [2 ** 15, 8, 1], "pbkdf2": ["sha256", DEFAULT_PBKDF2_ITERATIONS]}.get(name, [])
+    return ":".join(str(part) for part in [name, *args, *defaults[len(args):]])
+
+
+def needs_rehash(password_hash):
+    """
+    True when `password_hash` was made with other parameters than PASSWORD_HASH_METHOD.
+    """
+    method = current_app.config.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    return normalise_method(password_hash.split("$", 1)[0]) != normalise_method(method)
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A bounded queue of messages for a set of channels. When a slow reader lets it
+    fill up, the oldest message is dropped, so a stuck client never holds memory.
+    """
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.active = False  # set by the broker while subscribed
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ----------------- Backends ----------------- #
+
+class MemoryBroker:
+    """Fans messages out to subscribers in this process only. Enough for a single worker."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._count = 0
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            subscription.active = True
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            # Closing twice (explicitly, then on leaving a with block) counts once
+            if not subscription.active:
+                return
+            subscription.active = False
+            self._count -= 1
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscription_count(self):
+        return self._count
+
+    def publish_many(self, messages):
+        """
+        Publish (channel, message) pairs.
+        """
+        for channel, message in messages:
+            self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+
+class PostgresBroker(MemoryBroker):
+    """
+    Shares messages between workers and hosts through Postgres LISTEN/NOTIFY.
+
+    Publishing sends NOTIFYs on one channel, packing several messages into each
+    payload (Postgres caps a payload at 8000 bytes). Each process has a single
+    listener thread on a dedicated connection that hands incoming messages to
+    its local subscribers, so subscribers cost no database connection each.
+    """
+
+    CHANNEL = "deliveroo_pubsub"
+    MAX_PAYLOAD_BYTES = 7500
+
+    def __init__(self, engine, queue_size=100):
+        super().__init__(queue_size)
+        self.engine = engine
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channels):
+        self._ensure_listener()
+        return super().subscribe(channels)
+
+    def publish_many(self, messages):
+        payloads, batch, size = [], [], 2
+        for channel, message in messages:
+            encoded = json.dumps([channel, message], default=str)
+            if batch and size + len(encoded) + 1 > self.MAX_PAYLOAD_BYTES:
+                payloads.append("[" + ",".join(batch) + "]")
+                batch, size = [], 2
+            batch.append(encoded)
+            size += len(encoded) + 1
+        if batch:
+            payloads.append("[" + ",".join(batch) + "]")
+        if not payloads:
+            return
+
+        with self.engine.connect() as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                [{"channel": self.CHANNEL, "payload": payload} for payload in payloads],
+            )
+            connection.commit()
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="pubsub-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                raw = self.engine.raw_connection()
+                raw.detach()
+                connection = raw.driver_connection
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {self.CHANNEL}")
+                while True:
+                    if select.select([connection], [], [], 30) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        for channel, message in json.loads(notify.payload):
+                            self.deliver(channel, message)
+            except Exception as err:
+                logger.error(f"Pub/sub listener lost its connection, reconnecting: {err}")
+                time.sleep(1)
+
+
+_broker = None
+_broker_pid = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Process-wide broker named by the PUBSUB_BACKEND setting ('memory' or 'postgres').
+    """
+    global _broker, _broker_pid
+    # Listener threads don't survive fork, so each worker builds its own
+    if _broker_pid != os.getpid():
+        with _broker_lock:
+            if _broker_pid != os.getpid():
+                config = current_app.config
+                name = config.get("PUBSUB_BACKEND", "memory")
+                queue_size = config.get("SSE_QUEUE_SIZE", 100)
+                if name == "memory":
+                    _broker = MemoryBroker(queue_size)
+                elif name == "postgres":
+                    _broker = PostgresBroker(db.engine, queue_size)
+                else:
+                    raise ValueError(f"Unknown PUBSUB_BACKEND '{name}'")
+                _broker_pid = os.getpid()
+    return _broker
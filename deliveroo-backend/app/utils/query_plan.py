@@ -0,0 +1,113 @@
+import json
+import re
+
+from app.extensions import db
+from app.utils.soft_delete import scope_to_live_rows
+
+# SQLite's EXPLAIN QUERY PLAN says "SCAN <table>" for a full table scan and
+# "SCAN <table> USING [COVERING] INDEX ..." or "SEARCH ..." when an index is used
+SQLITE_TABLE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def _statement(query):
+    # Compiled by hand, so the session's soft-delete filter is applied here
+    return scope_to_live_rows(query.statement if hasattr(query, "statement") else query)
+
+
+def _run_explain(prefix, statement):
+    compiled = _statement(statement).compile(dialect=db.engine.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return db.session.connection().exec_driver_sql(f"{prefix} {compiled}", params).fetchall()
+
+
+def explain(query):
+    """
+    Plan for `query` (an ORM query or a select) as a list of text lines.
+    """
+    if db.engine.dialect.name == "postgresql":
+        return [row[0] for row in _run_explain("EXPLAIN", query)]
+    return [row[-1] for row in _run_explain("EXPLAIN QUERY PLAN", query)]
+
+
+def _postgres_plan_without_seqscans(query):
+    # Postgres picks Seq Scans for small or unanalysed tables whatever indexes exist.
+    # With them priced out, a Seq Scan is left in the plan only when no index can
+    # serve the query. SET LOCAL ends with the savepoint, so the session is unaffected.
+    savepoint = db.session.begin_nested()
+    try:
+        db.session.connection().exec_driver_sql("SET LOCAL enable_seqscan = off")
+        return _run_explain("EXPLAIN (FORMAT JSON)", query)[0][0]
+    finally:
+        savepoint.rollback()
+
+
+def sequential_scans(query):
+    """
+    Names of the tables `query` has to read with a full sequential scan, for
+    want of a usable index.
+    """
+    if db.engine.dialect.name == "postgresql":
+        plan = _postgres_plan_without_seqscans(query)
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        tables, nodes = [], [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Node Type") == "Seq Scan":
+                tables.append(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+        return tables
+
+    tables = []
+    for detail in explain(query):
+        match = SQLITE_TABLE_SCAN.match(detail)
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def hot_queries():
+    """
+    The queries behind the busiest routes, built by the same helpers the routes use.
+    """
+    from datetime import datetime
+    from app.models.parcel import Parcel
+    from app.models.parcel_event import ParcelEvent
+    from app.models.user import User
+    from app.queries.parcel_queries import parcel_listing_query
+    from app.utils.pagination import encode_cursor, keyset_query
+
+    cursor = encode_cursor(datetime(2024, 1, 1), 1000)
+    live_users = User.query
+
+    return {
+        "GET /parcels (own, first page)": keyset_query(parcel_listing_query(user_id=1), Parcel),
+        "GET /parcels (own, deep page)": keyset_query(parcel_listing_query(user_id=1), Parcel, cursor=cursor),
+        "GET /admin/parcels (first page)": keyset_query(parcel_listing_query(), Parcel),
+        "GET /admin/parcels (deep page)": keyset_query(parcel_listing_query(), Parcel, cursor=cursor),
+        "parcels by status": keyset_query(parcel_listing_query().filter(Parcel.status_id == 1), Parcel),
+        "parcels at a location by status": parcel_listing_query().filter(
+            Parcel.present_location_id == 1, Parcel.status_id == 1
+        ),
+        "GET /parcels/<id>/events": ParcelEvent.query.filter_by(parcel_id=1).order_by(
+            ParcelEvent.created_at, ParcelEvent.id
+        ),
+        "GET /users (first page)": keyset_query(live_users, User),
+        "GET /users (deep page)": keyset_query(live_users, User, cursor=cursor),
+        "GET /users?role=": keyset_query(live_users.filter(User.role == "courier"), User),
+        "POST /auth/login": User.query.filter_by(email="someone@example.com"),
+    }
+
+
+def check_hot_queries():
+    """
+    Map of hot query name -> tables it scans sequentially, for offending queries only.
+    """
+    offenders = {}
+    for name, query in hot_queries().items():
+        tables = sequential_scans(query)
+        if tables:
+            offenders[name] = tables
+    return offenders
@@ -0,0 +1,243 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+from app.utils.jwt import get_current_user_id
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed with RATE_LIMIT_STORAGE=redis
+    redis = None
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+# Endpoints whose "account" is the email in the body; everywhere else it is the JWT user
+BODY_ACCOUNT_ENDPOINTS = {"auth_bp.login", "auth_bp.register"}
+
+Limit = namedtuple("Limit", "scope capacity rate")
+
+
+def parse_limit(spec):
+    """
+    "ip 20/minute" -> Limit("ip", 20, 20 / 60): a bucket of 20 tokens refilled
+    at 20 per minute. Scopes are "ip" and "account".
+    """
+    scope, _, amount = spec.strip().partition(" ")
+    count, _, period = amount.strip().partition("/")
+    if scope not in ("ip", "account") or period not in PERIODS:
+        raise ValueError(f"Invalid rate limit '{spec}'")
+    return Limit(scope, int(count), int(count) / PERIODS[period])
+
+
+class MemoryStore:
+    """
+    Token buckets in this process only; fine for a single worker. At most
+    `max_keys` buckets are kept, least recently used dropped first, so a
+    flood of distinct IPs cannot grow it without bound.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of last update)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """
+        Take one token. Returns (allowed, seconds until a token is available).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill and take in one atomic step, timed by the Redis clock so every worker agrees
+_CONSUME_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisStore:
+    """
+    Token buckets in Redis, shared by every worker: one hash per bucket,
+    updated by a server-side script in a single round trip. Idle buckets
+    expire once they would have refilled.
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_STORAGE=redis needs the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._consume = self._client.register_script(_CONSUME_SCRIPT)
+
+    def consume(self, key, capacity, rate):
+        allowed, retry_after = self._consume(keys=[key], args=[capacity, rate])
+        return bool(allowed), float(retry_after)
+
+    def clear(self):
+        pass
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Process-wide bucket store named by RATE_LIMIT_STORAGE ('memory' or 'redis').
+    """
+    global _store, _store_pid
+    # Redis connection pools must not be shared across fork
+    if _store_pid != os.getpid():
+        with _store_lock:
+            if _store_pid != os.getpid():
+                config = current_app.config
+                name = config.get("RATE_LIMIT_STORAGE", "memory")
+                if name == "memory":
+                    _store = MemoryStore(config.get("RATE_LIMIT_MAX_KEYS", 100000))
+                elif name == "redis":
+                    _store = RedisStore(config["RATE_LIMIT_REDIS_URL"])
+                else:
+                    raise ValueError(f"Unknown RATE_LIMIT_STORAGE '{name}'")
+                _store_pid = os.getpid()
+    return _store
+
+
+# ----------------- Request hooks ----------------- #
+
+_limits_cache = {}
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _limits_for(blueprint):
+    specs = tuple(current_app.config.get("RATE_LIMITS", {}).get(blueprint, ()))
+    if specs not in _limits_cache:
+        _limits_cache[specs] = [parse_limit(spec) for spec in specs]
+    return _limits_cache[specs]
+
+
+def _account():
+    # The account named in a login/register body, else the authenticated user.
+    # Elsewhere a body email is ignored: callers could pick a fresh bucket per request.
+    if request.endpoint in BODY_ACCOUNT_ENDPOINTS:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict) and isinstance(body.get("email"), str):
+            return body["email"].strip().lower()
+        return None
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None  # an invalid token is the view's to reject
+    user_id = get_current_user_id()
+    return f"user:{user_id}" if user_id is not None else None
+
+
+def _too_many(retry_after):
+    response = jsonify({"status": "error", "message": "Too many requests, try again later."})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def check_rate_limits():
+    """
+    Take a token from each of the blueprint's RATE_LIMITS buckets for a write
+    request; 429 with Retry-After when any is empty.
+
+    "ip" buckets key on request.remote_addr, which is the client only when it
+    connects directly or PROXY_FIX_X_FOR names the proxies in front.
+    """
+    if request.method not in WRITE_METHODS or not current_app.config.get("RATE_LIMIT_ENABLED", True):
+        return None
+    limits = _limits_for(request.blueprint)
+    if not limits:
+        return None
+
+    store = get_store()
+    for limit in limits:
+        subject = request.remote_addr if limit.scope == "ip" else _account()
+        if subject is None:
+            continue
+        key = f"rl:{request.blueprint}:{limit.scope}:{subject}"
+        allowed, retry_after = store.consume(key, limit.capacity, limit.rate)
+        if not allowed:
+            return _too_many(retry_after)
+    return None
+
+
+def shed_load():
+    """
+    Turn away requests beyond LOAD_SHED_MAX_INFLIGHT[blueprint] running at once
+    in this worker with 503, before they queue for CPU.
+    """
+    maximum = current_app.config.get("LOAD_SHED_MAX_INFLIGHT", {}).get(request.blueprint)
+    if not maximum:
+        return None
+    with _inflight_lock:
+        if _inflight.get(request.blueprint, 0) >= maximum:
+            response = jsonify({"status": "error", "message": "Server busy, try again shortly."})
+            response.status_code = 503
+            response.headers["Retry-After"] = "1"
+            return response
+        _inflight[request.blueprint] = _inflight.get(request.blueprint, 0) + 1
+    request.environ["rate_limit.inflight"] = request.blueprint
+    return None
+
+
+def _finish_request(exc):
+    blueprint = request.environ.pop("rate_limit.inflight", None)
+    if blueprint is not None:
+        with _inflight_lock:
+            _inflight[blueprint] -= 1
+
+
+def init_rate_limits(app):
+    """
+    Per-blueprint token buckets (RATE_LIMITS) and in-flight caps (LOAD_SHED_MAX_INFLIGHT).
+    Buckets live in memory or Redis, never in the database.
+    """
+    @app.before_request
+    def limit_request():
+        return check_rate_limits() or shed_load()
+
+    app.teardown_request(_finish_request)
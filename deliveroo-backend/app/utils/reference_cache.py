@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.cache_version import CacheVersion
+
+logger = logging.getLogger(__name__)
+
+# Row in cache_versions whose version is bumped whenever a status or location changes
+REFERENCE_VERSION_NAME = "reference_data"
+
+
+class ReferenceCache:
+    """
+    Per-process copy of the statuses and locations tables.
+
+    Statuses are keyed by id and name, locations by id and city. Every write
+    to either table bumps a shared version row in the same transaction, and
+    each worker compares its copy against that row at most once every
+    REFERENCE_CACHE_CHECK_INTERVAL seconds, reloading when it has moved on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = None
+        self._next_check = 0.0
+        self._statuses = {}
+        self._statuses_by_name = {}
+        self._locations = {}
+        self._locations_by_city = {}
+
+    @property
+    def version(self):
+        return self._version
+
+    def warm(self):
+        """
+        Load both tables now, regardless of the current version.
+        """
+        with self._lock:
+            self._load(self._read_version())
+
+    def invalidate(self):
+        """
+        Drop this worker's copy and bump the shared version so other workers reload too.
+
+        Only needed for writes that bypass the ORM session (bulk/Core inserts);
+        session writes to Status or Location are picked up automatically.
+        """
+        _bump_version(db.session.connection())
+        db.session.commit()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._next_check = 0.0
+
+    def current_version(self):
+        """
+        Version of the data this worker serves, after the usual freshness check.
+        """
+        self._ensure_fresh()
+        return self._version
+
+    def status(self, status_id):
+        self._ensure_fresh()
+        return self._statuses.get(status_id)
+
+    def status_by_name(self, name):
+        self._ensure_fresh()
+        return self._statuses_by_name.get(name)
+
+    def location(self, location_id):
+        self._ensure_fresh()
+        return self._locations.get(location_id)
+
+    def locations_by_city(self, city):
+        self._ensure_fresh()
+        return self._locations_by_city.get(city, [])
+
+    def _ensure_fresh(self):
+        if self._loaded and time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            if self._loaded and time.monotonic() < self._next_check:
+                return
+            version = self._read_version()
+            if not self._loaded or version != self._version:
+                self._load(version)
+            else:
+                self._schedule_next_check()
+
+    def _read_version(self):
+        return db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == REFERENCE_VERSION_NAME)
+        ).scalar() or 0
+
+    def _load(self, version):
+        from app.models.location import Location
+        from app.models.status import Status
+
+        statuses = {
+            status_id: {"id": status_id, "name": name}
+            for status_id, name in db.session.execute(select(Status.id, Status.name))
+        }
+        locations = {
+            location_id: {
+                "id": location_id,
+                "city": city,
+                "address": address,
+                "latitude": latitude,
+                "longitude": longitude,
+            }
+            for location_id, city, address, latitude, longitude in db.session.execute(
+                select(Location.id, Location.city, Location.address, Location.latitude, Location.longitude)
+                .order_by(Location.id)
+            )
+        }
+        locations_by_city = {}
+        for location in locations.values():
+            locations_by_city.setdefault(location["city"], []).append(location)
+
+        self._statuses = statuses
+        self._statuses_by_name = {status["name"]: status for status in statuses.values()}
+        self._locations = locations
+        self._locations_by_city = locations_by_city
+        self._version = version
+        self._loaded = True
+        self._schedule_next_check()
+
+    def _schedule_next_check(self):
+        interval = current_app.config.get("REFERENCE_CACHE_CHECK_INTERVAL", 5)
+        self._next_check = time.monotonic() + interval
+
+
+reference_cache = ReferenceCache()
+
+
+def _bump_version(connection):
+    # One upsert, so two first writers can't both INSERT the row (migration 0001a seeds it anyway)
+    now = datetime.utcnow()
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(CacheVersion).values(name=REFERENCE_VERSION_NAME, version=1, updated_at=now)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": CacheVersion.version + 1, "updated_at": now},
+    ))
+
+
+def _touches_reference_data(session):
+    from app.models.location import Location
+    from app.models.status import Status
+
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    return any(isinstance(obj, (Location, Status)) for obj in changed)
+
+
+@event.listens_for(Session, "before_flush")
+def _flag_reference_writes(session, flush_context, instances):
+    if _touches_reference_data(session):
+        session.info["reference_data_changed"] = True
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _bump_reference_version(session, flush_context):
+    if session.info.pop("reference_data_changed", False):
+        _bump_version(session.connection())
+        session.info["reference_data_committing"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_after_commit(session):
+    if session.info.pop("reference_data_committing", False):
+        reference_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop("reference_data_changed", None)
+    session.info.pop("reference_data_committing", None)
+
+
+def init_reference_cache(app):
+    """
+    Warm the cache at startup. A missing schema (fresh database, tests that
+    call create_all later) is not fatal; the cache then loads on first use.
+    """
+    with app.app_context():
+        try:
+            reference_cache.warm()
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            logger.warning(f"Reference cache not warmed at startup: {err.__class__.__name__}")
+        finally:
+            db.session.remove()
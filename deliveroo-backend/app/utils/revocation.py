@@ -0,0 +1,248 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import and_, delete, event, exists, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db, jwt
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership with no false negatives and about `error_rate`
+    false positives once `capacity` items are in. Items cannot be removed.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        # Distinct items added (approximately: one whose bits were all set already
+        # is taken for a repeat), so re-adding the sync overlap doesn't inflate it
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        new = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _token_user_id(payload):
+    identity = payload.get(current_app.config.get("JWT_IDENTITY_CLAIM", "sub"))
+    return identity.get("id") if isinstance(identity, dict) else identity
+
+
+def _token_lifetime():
+    expires = current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES", 3600)
+    if expires is False:
+        return timedelta(days=3650)
+    return expires if isinstance(expires, timedelta) else timedelta(seconds=expires)
+
+
+class RevocationList:
+    """
+    Answers "is this token revoked?" for the JWT blocklist loader.
+
+    Revoked jtis and user ids are held in a Bloom filter, so the usual answer,
+    "no", needs no query. Only when the filter reports a possible hit (a real
+    revocation, or a false positive at REVOCATION_FILTER_ERROR_RATE) is the
+    token_revocations table consulted.
+
+    Every REVOCATION_CHECK_INTERVAL seconds the filter takes in rows revoked
+    since its last sync (re-reading a REVOCATION_SYNC_OVERLAP window, for
+    transactions that committed late). It is rebuilt from scratch every
+    REVOCATION_REBUILD_INTERVAL seconds, which drops purged rows, or sooner
+    once it outgrows its capacity. Revocations committed in this process are
+    added straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_to = None
+        self._next_check = 0.0
+        self._next_rebuild = 0.0
+
+    def is_revoked(self, payload):
+        bloom = self._ensure_fresh()
+        jti = payload.get("jti")
+        user_id = _token_user_id(payload)
+        jti = jti if jti and f"jti:{jti}" in bloom else None
+        user_id = user_id if user_id is not None and f"user:{user_id}" in bloom else None
+        if jti is None and user_id is None:
+            return False
+        return self._revoked_in_db(jti, user_id, payload.get("iat"))
+
+    def add(self, kind, subject):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(f"{kind}:{subject}")
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+            self._next_check = self._next_rebuild = 0.0
+
+    def _ensure_fresh(self):
+        bloom = self._filter
+        if bloom is not None and time.monotonic() < self._next_check:
+            return bloom
+        with self._lock:
+            now = time.monotonic()
+            if self._filter is not None and now < self._next_check:
+                return self._filter
+            if self._filter is None or now >= self._next_rebuild or self._filter.count > self._filter.capacity:
+                self._rebuild()
+                self._next_rebuild = now + current_app.config.get("REVOCATION_REBUILD_INTERVAL", 600)
+            else:
+                self._catch_up()
+            self._next_check = now + current_app.config.get("REVOCATION_CHECK_INTERVAL", 2)
+            return self._filter
+
+    def _rebuild(self):
+        from app.models.token_revocation import TokenRevocation
+
+        started = datetime.utcnow()
+        live = TokenRevocation.expires_at > started
+        count = db.session.execute(select(func.count()).where(live)).scalar()
+        config = current_app.config
+        bloom = BloomFilter(
+            max(config.get("REVOCATION_FILTER_CAPACITY", 100000), count * 2),
+            config.get("REVOCATION_FILTER_ERROR_RATE", 0.001),
+        )
+        rows = db.session.execute(
+            select(TokenRevocation.kind, TokenRevocation.subject).where(live).execution_options(yield_per=10000)
+        )
+        for kind, subject in rows:
+            bloom.add(f"{kind}:{subject}")
+        self._filter = bloom
+        self._synced_to = started
+
+    def _catch_up(self):
+        from app.models.token_revocation import TokenRevocation
+
+        started = datetime.utcnow()
+        since = self._synced_to - timedelta(seconds=current_app.config.get("REVOCATION_SYNC_OVERLAP", 60))
+        for kind, subject in db.session.execute(
+            select(TokenRevocation.kind, TokenRevocation.subject).where(TokenRevocation.revoked_at >= since)
+        ):
+            self._filter.add(f"{kind}:{subject}")
+        self._synced_to = started
+
+    @staticmethod
+    def _revoked_in_db(jti, user_id, issued_at):
+        from app.models.token_revocation import TokenRevocation
+
+        conditions = []
+        if jti is not None:
+            conditions.append(and_(TokenRevocation.kind == "jti", TokenRevocation.subject == jti))
+        if user_id is not None:
+            user_revoked = and_(TokenRevocation.kind == "user", TokenRevocation.subject == str(user_id))
+            if issued_at is not None:
+                # Tokens issued after the revocation (a later login) stay valid
+                user_revoked = and_(user_revoked, TokenRevocation.revoked_at >= datetime.utcfromtimestamp(issued_at))
+            conditions.append(user_revoked)
+        return db.session.execute(select(exists().where(or_(*conditions)))).scalar()
+
+
+revocation_list = RevocationList()
+
+
+def revoke_token(payload):
+    """
+    Revoke one access token (e.g. on logout) in the current transaction.
+    """
+    from app.models.token_revocation import TokenRevocation
+
+    db.session.add(TokenRevocation(
+        kind="jti", subject=payload["jti"], expires_at=datetime.utcfromtimestamp(payload["exp"])
+        if payload.get("exp") else datetime.utcnow() + _token_lifetime(),
+    ))
+
+
+def revoke_user_tokens(session, user_id):
+    """
+    Revoke every token issued to the user so far, in `session`'s transaction.
+    """
+    from app.models.token_revocation import TokenRevocation
+
+    now = datetime.utcnow()
+    session.add(TokenRevocation(kind="user", subject=str(user_id), revoked_at=now, expires_at=now + _token_lifetime()))
+
+
+def purge_expired_revocations():
+    from app.models.token_revocation import TokenRevocation
+
+    deleted = db.session.execute(delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.utcnow()))
+    db.session.commit()
+    return deleted.rowcount
+
+
+# ----------------- Keeping revocations in step with ORM writes ----------------- #
+
+@event.listens_for(Session, "before_flush")
+def _revoke_deleted_users(session, flush_context, instances):
+    # However a user gets soft-deleted, the tokens they already hold stop working
+    from app.models.user import User
+
+    for obj in list(session.dirty):
+        if isinstance(obj, User) and obj.is_deleted:
+            history = inspect(obj).attrs.is_deleted.history
+            if history.added and not any(history.deleted):
+                revoke_user_tokens(session, obj.id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_revocations(session, flush_context):
+    from app.models.token_revocation import TokenRevocation
+
+    revoked = [(obj.kind, obj.subject) for obj in session.new if isinstance(obj, TokenRevocation)]
+    if revoked:
+        session.info.setdefault("token_revocations", []).extend(revoked)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(session):
+    for kind, subject in session.info.pop("token_revocations", []):
+        revocation_list.add(kind, subject)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_revocations(session):
+    session.info.pop("token_revocations", None)
+
+
+def init_revocations(app):
+    """
+    Route flask_jwt_extended's blocklist check through the revocation list,
+    and add `flask purge-token-revocations`.
+    """
+    @jwt.token_in_blocklist_loader
+    def token_is_revoked(jwt_header, jwt_payload):
+        return revocation_list.is_revoked(jwt_payload)
+
+    @app.cli.command("purge-token-revocations")
+    def purge():
+        """Delete revocations whose tokens have all expired."""
+        click.echo(f"Purged {purge_expired_revocations()} expired token revocations")
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from flask import current_app
+
+
+class RoleCache:
+    """
+    Small per-process cache of (role, is_deleted) keyed by user id.
+
+    Entries expire after ROLE_CACHE_TTL seconds, and role or soft-delete
+    changes invalidate the user's entry straight away, so a demotion takes
+    effect immediately in this worker and within one TTL in every other worker.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            role, is_deleted, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            return role, is_deleted
+
+    def set(self, user_id, role, is_deleted):
+        ttl = current_app.config.get("ROLE_CACHE_TTL", 30)
+        with self._lock:
+            self._entries[user_id] = (role, bool(is_deleted), time.monotonic() + ttl)
+        return role, bool(is_deleted)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+role_cache = RoleCache()
@@ -0,0 +1,200 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from flask import current_app
+
+from app.utils.map_utils import distance_matrix, haversine_km
+
+
+class RoutingOverloaded(Exception):
+    """Raised when too many route plans are already running; callers should answer 503."""
+
+
+# ----------------- Construction and improvement ----------------- #
+
+def sweep_clusters(depot, points, demands, route_count):
+    """
+    Split stops into `route_count` or a few more contiguous sectors around the depot.
+
+    Stops are ordered by bearing from the depot and cut whenever a sector would
+    go past an even share of the total demand. Returns a list of index arrays.
+    """
+    if len(points) == 0:
+        return []
+    lat0 = math.radians(depot[0])
+    angles = np.arctan2(points[:, 0] - depot[0], (points[:, 1] - depot[1]) * math.cos(lat0))
+    order = np.argsort(angles, kind="stable")
+
+    target = max(1, math.ceil(int(demands.sum()) / max(route_count, 1)))
+    clusters, start, load = [], 0, 0
+    for position, stop in enumerate(order.tolist()):
+        demand = int(demands[stop])
+        if load and load + demand > target:
+            clusters.append(order[start:position])
+            start, load = position, 0
+        load += demand
+    clusters.append(order[start:])
+    return clusters
+
+
+def nearest_neighbour_tour(distances):
+    """
+    Closed tour from node 0 (the depot), always moving to the closest unvisited node.
+    """
+    size = len(distances)
+    tour = [0]
+    unvisited = np.ones(size, dtype=bool)
+    unvisited[0] = False
+    current = 0
+    for _ in range(size - 1):
+        candidates = np.where(unvisited, distances[current], np.inf)
+        current = int(np.argmin(candidates))
+        unvisited[current] = False
+        tour.append(current)
+    tour.append(0)
+    return np.array(tour)
+
+
+def two_opt(tour, distances, deadline):
+    """
+    Improve a closed tour by reversing segments until no reversal shortens it or
+    `deadline` (time.monotonic()) passes. Every candidate end point for a given
+    segment start is scored in one vectorised step.
+    """
+    tour = tour.copy()
+    size = len(tour)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, size - 2):
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[i + 1:size - 1], tour[i + 2:size]
+            gains = distances[a, b] + distances[c, d] - distances[a, c] - distances[b, d]
+            best = int(np.argmax(gains))
+            if gains[best] > 1e-9:
+                j = i + 1 + best
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                improved = True
+            if time.monotonic() >= deadline:
+                break
+    return tour
+
+
+def tour_length(tour, distances):
+    return float(distances[tour[:-1], tour[1:]].sum())
+
+
+def solve_route(depot, points, time_budget, distances=None):
+    """
+    Order one courier's stops: nearest-neighbour construction, then 2-opt within
+    `time_budget` seconds. Returns (stop order as indexes into `points`, length in km).
+
+    `distances` is the depot-then-stops distance matrix; without one it is
+    computed from the coordinates.
+    """
+    deadline = time.monotonic() + time_budget
+    if distances is None:
+        nodes = np.vstack([np.asarray(depot, dtype=float)[None, :], points])
+        distances = haversine_km(nodes[:, 0, None], nodes[:, 1, None], nodes[None, :, 0], nodes[None, :, 1])
+    tour = two_opt(nearest_neighbour_tour(distances), distances, deadline)
+    return tour[1:-1] - 1, tour_length(tour, distances)
+
+
+def _solve_route_task(args):
+    return solve_route(*args)
+
+
+# ----------------- Process pool ----------------- #
+
+class RoutePlanner:
+    """
+    Plans multi-stop courier routes on a process pool.
+
+    Route construction and 2-opt are CPU-bound, so each sector is solved in a
+    separate process and the request thread only waits on the results. At most
+    ROUTING_MAX_PENDING plans may run per process; past that, callers get
+    RoutingOverloaded. ROUTING_WORKERS = 0 solves inline instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._workers = 0
+        self._slots = None
+        self._pid = None
+
+    def _pool(self):
+        # Pools don't survive fork, so each gunicorn worker builds its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    config = current_app.config
+                    self._workers = config.get("ROUTING_WORKERS", 0)
+                    self._executor = ProcessPoolExecutor(max_workers=self._workers) if self._workers else None
+                    self._slots = threading.BoundedSemaphore(config.get("ROUTING_MAX_PENDING", 2))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def plan(self, depot, points, demands, courier_count, max_parcels, time_budget, location_ids=None):
+        """
+        Routes for `points` (lat/lng per stop, `demands` parcels per stop) out of `depot`.
+
+        Uses at least `courier_count` routes and enough that none carries much more
+        than `max_parcels`. The time budget is shared by all routes. Returns
+        a list of (stop indexes in visiting order, length in km).
+
+        With `location_ids` (the depot's id, then one per stop), each route's
+        distances are read from the shared distance matrix rather than
+        recomputed; a route with a location the matrix lacks falls back to
+        the coordinates.
+        """
+        executor = self._pool()
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        demands = np.asarray(demands, dtype=np.int64)
+        route_count = max(courier_count, math.ceil(int(demands.sum()) / max_parcels))
+        clusters = sweep_clusters(depot, points, demands, route_count)
+        if not clusters:
+            return []
+
+        # Sectors beyond the worker count queue up, so each gets a share of the budget
+        parallel = min(max(self._workers, 1), len(clusters))
+        budget = time_budget * parallel / len(clusters)
+        tasks = [(depot, points[cluster], budget, self._distances(location_ids, cluster)) for cluster in clusters]
+
+        if executor is None:
+            solved = map(_solve_route_task, tasks)
+        else:
+            if not self._slots.acquire(timeout=current_app.config.get("ROUTING_QUEUE_TIMEOUT", 1)):
+                raise RoutingOverloaded()
+            try:
+                chunksize = max(1, len(tasks) // (self._workers * 4))
+                solved = list(executor.map(_solve_route_task, tasks, chunksize=chunksize))
+            finally:
+                self._slots.release()
+
+        return [(cluster[order], length) for cluster, (order, length) in zip(clusters, solved)]
+
+    @staticmethod
+    def _distances(location_ids, cluster):
+        # Read here, in the request thread: pool processes have no app context
+        if location_ids is None:
+            return None
+        ids = np.asarray(location_ids, dtype=np.int64)
+        try:
+            return distance_matrix.submatrix(np.concatenate([ids[:1], ids[1:][cluster]]))
+        except KeyError:
+            return None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = None
+            self._pid = None
+
+
+route_planner = RoutePlanner()
@@ -0,0 +1,75 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in the Pipfile; this keeps the stdlib path working
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson when it is installed.
+
+    Output matches the default provider: keys stay sorted and datetimes are
+    still passed to `default`, which formats them as HTTP dates. orjson writes
+    UTF-8 directly instead of \\u escapes. Without orjson, every call falls
+    through to the stdlib implementation.
+    """
+
+    options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or not self._orjson_compatible(kwargs):
+            return super().dumps(obj, **kwargs)
+        options = self.options | (orjson.OPT_INDENT_2 if kwargs.get("indent") else 0)
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=options).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    @staticmethod
+    def _orjson_compatible(kwargs):
+        # Anything beyond what Flask itself passes (e.g. a custom cls) needs the stdlib encoder
+        return set(kwargs) <= {"default", "indent", "separators"} and kwargs.get("indent") in (None, 2)
+
+
+class Projection:
+    """
+    Builds a model's API dicts straight from selected columns, without ORM objects.
+
+    `fields` maps each output key to a column, or to (column, convert) where
+    `convert` turns the raw value into the output value. `columns` is what to
+    SELECT and `to_dicts` maps the resulting rows in order.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.keys = list(fields)
+        self.columns = []
+        self.converters = []
+        for spec in fields.values():
+            column, convert = spec if isinstance(spec, tuple) else (spec, None)
+            self.columns.append(column)
+            self.converters.append(convert)
+
+    def extend(self, **fields):
+        """
+        A projection with `fields` added after this one's.
+        """
+        return Projection(**self.fields, **fields)
+
+    def to_dict(self, row):
+        return {
+            key: convert(value) if convert is not None else value
+            for key, convert, value in zip(self.keys, self.converters, row)
+        }
+
+    def to_dicts(self, rows):
+        to_dict = self.to_dict
+        return [to_dict(row) for row in rows]
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, event, exists, false, inspect, or_, select, true
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app.extensions import db
+from app.models.soft_delete import SoftDeleteMixin
+
+INCLUDE_DELETED = "include_deleted"
+
+
+def _live_rows_criteria():
+    # Same literal predicate as the live-row partial indexes (models.indexes.live_rows_index)
+    return with_loader_criteria(SoftDeleteMixin, lambda cls: cls.is_deleted == false(), include_aliases=True)
+
+
+def include_deleted(query):
+    """
+    `query` (an ORM query or a select) with soft-deleted rows left in.
+    """
+    return query.execution_options(**{INCLUDE_DELETED: True})
+
+
+def scope_to_live_rows(statement):
+    """
+    `statement` with the soft-delete filter applied, for code that compiles
+    a statement itself (EXPLAIN, row estimates) instead of executing it
+    through the session.
+    """
+    if statement.get_execution_options().get(INCLUDE_DELETED, False):
+        return statement
+    return statement.options(_live_rows_criteria())
+
+
+# ----------------- Session hooks ----------------- #
+
+@event.listens_for(Session, "do_orm_execute")
+def _leave_out_deleted_rows(execute_state):
+    # Refreshes of already-loaded rows and relationship loads are left alone;
+    # the latter inherit the filter from the query that loaded their parent
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        execute_state.statement = execute_state.statement.options(_live_rows_criteria())
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_deleted_at(session, flush_context, instances):
+    now = datetime.utcnow()
+    for obj in session.new:
+        if isinstance(obj, SoftDeleteMixin) and obj.is_deleted and obj.deleted_at is None:
+            obj.deleted_at = now
+    for obj in session.dirty:
+        if isinstance(obj, SoftDeleteMixin) and inspect(obj).attrs.is_deleted.history.added:
+            obj.deleted_at = now if obj.is_deleted else None
+
+
+# ----------------- Purge ----------------- #
+
+def _purge_batches(model, extra_conditions, cutoff, batch_size, before_delete=None):
+    purged = 0
+    while True:
+        ids = db.session.execute(include_deleted(
+            select(model.id)
+            .where(model.is_deleted == true(), model.deleted_at < cutoff, *extra_conditions)
+            .order_by(model.deleted_at)
+            .limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            return purged
+        if before_delete is not None:
+            before_delete(ids)
+        db.session.execute(delete(model.__table__).where(model.__table__.c.id.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+
+
+def purge_soft_deleted(older_than_days=None, batch_size=None):
+    """
+    Hard-delete parcels and users soft-deleted more than `older_than_days` ago,
+    `batch_size` rows per transaction. Returns {"parcels": n, "users": n}.
+
+    A parcel takes its events with it; deleted parcels are not in the
+    /admin/stats counters, so those need no correction. Users still referenced
+    by a parcel (as owner or courier) or by a parcel event are kept; purged
+    users' token revocations go with them.
+    """
+    from app.models.parcel import Parcel
+    from app.models.parcel_event import ParcelEvent
+    from app.models.token_revocation import TokenRevocation
+    from app.models.user import User
+
+    config = current_app.config
+    older_than_days = config.get("SOFT_DELETE_RETENTION_DAYS", 90) if older_than_days is None else older_than_days
+    batch_size = batch_size or config.get("SOFT_DELETE_PURGE_BATCH_SIZE", 1000)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    def delete_events(parcel_ids):
+        # Not left to ON DELETE CASCADE, which SQLite only honours with foreign keys switched on
+        db.session.execute(delete(ParcelEvent.__table__).where(ParcelEvent.__table__.c.parcel_id.in_(parcel_ids)))
+
+    parcels = _purge_batches(Parcel, (), cutoff, batch_size, before_delete=delete_events)
+    referenced = or_(
+        exists().where(or_(Parcel.user_id == User.id, Parcel.courier_id == User.id)),
+        exists().where(ParcelEvent.actor_id == User.id),
+    )
+    def delete_revocations(user_ids):
+        # Their tokens have long expired; ids may be reused by databases that recycle them
+        db.session.execute(delete(TokenRevocation.__table__).where(
+            TokenRevocation.kind == "user", TokenRevocation.subject.in_([str(user_id) for user_id in user_ids])
+        ))
+
+    users = _purge_batches(User, (~referenced,), cutoff, batch_size, before_delete=delete_revocations)
+    return {"parcels": parcels, "users": users}
+
+
+def register_soft_delete_commands(app):
+    @app.cli.command("purge-soft-deleted")
+    @click.option("--older-than-days", type=int, default=None,
+                  help="Only rows soft-deleted this long ago (default SOFT_DELETE_RETENTION_DAYS).")
+    @click.option("--batch-size", type=int, default=None, help="Rows deleted per transaction.")
+    def purge(older_than_days, batch_size):
+        """Hard-delete long soft-deleted parcels and users."""
+        purged = purge_soft_deleted(older_than_days, batch_size)
+        click.echo(f"Purged {purged['parcels']} parcels and {purged['users']} users")
@@ -0,0 +1,179 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statement shapes: literals and bound parameters are blanked out and IN lists
+# collapsed, so the same query with different ids counts as one shape
+_WHITESPACE = re.compile(r"\s+")
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*\)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_active = threading.local()
+
+
+def statement_shape(statement):
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PARAM_LIST.sub("(?...)", shape)
+    return _LITERALS.sub("?", shape)
+
+
+class QueryProfile:
+    """
+    The SQL statements run while the profile is active, grouped by shape.
+
+    A shape that runs at least `repeat_threshold` times is reported as a likely
+    N+1: the same query issued once per row, such as a relationship lazy load
+    inside a to_dict() loop.
+    """
+
+    def __init__(self, repeat_threshold=5):
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        entry = self.shapes.setdefault(shape, {"shape": shape, "count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+
+    @property
+    def repeated(self):
+        return sorted(
+            (entry for entry in self.shapes.values() if entry["count"] >= self.repeat_threshold),
+            key=lambda entry: entry["count"],
+            reverse=True,
+        )
+
+    def to_dict(self):
+        def shape_dict(entry):
+            return {"shape": entry["shape"], "count": entry["count"], "total_ms": round(entry["seconds"] * 1000, 2)}
+
+        return {
+            "count": self.count,
+            "total_ms": round(self.seconds * 1000, 2),
+            "n_plus_one": [shape_dict(entry) for entry in self.repeated],
+            "statements": [shape_dict(entry) for entry in self.shapes.values()],
+        }
+
+
+def _profiles():
+    if not hasattr(_active, "profiles"):
+        _active.profiles = []
+    return _active.profiles
+
+
+@contextmanager
+def capture_queries(repeat_threshold=5):
+    """
+    Profile every statement this thread runs inside the block, e.g. in tests.
+    """
+    profile = QueryProfile(repeat_threshold)
+    _profiles().append(profile)
+    try:
+        yield profile
+    finally:
+        _profiles().remove(profile)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if _profiles():
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started_at")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    for profile in _profiles():
+        profile.record(statement, elapsed)
+
+
+# ----------------- Per-request profiling ----------------- #
+
+class RequestProfiles:
+    """The most recent SQL_PROFILER_HISTORY request profiles of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=50)
+
+    def add(self, entry, maxlen):
+        with self._lock:
+            if self._entries.maxlen != maxlen:
+                self._entries = deque(self._entries, maxlen=maxlen)
+            self._entries.appendleft(entry)
+
+    def recent(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+request_profiles = RequestProfiles()
+
+
+def init_sql_profiler(app):
+    """
+    With SQL_PROFILER_ENABLED, profile the SQL of every request: responses get
+    X-DB-Query-Count, X-DB-Time-Ms and X-DB-Repeated-Queries headers, likely
+    N+1 patterns are logged, and the last SQL_PROFILER_HISTORY profiles are
+    kept in `request_profiles` for GET /debug/queries.
+    """
+
+    @app.before_request
+    def start_profile():
+        if app.config.get("SQL_PROFILER_ENABLED"):
+            g.sql_profile = QueryProfile(app.config.get("SQL_PROFILER_REPEAT_THRESHOLD", 5))
+            _profiles().append(g.sql_profile)
+
+    @app.after_request
+    def finish_profile(response):
+        profile = _stop_profile()
+        if profile is None:
+            return response
+
+        repeated = profile.repeated
+        for entry in repeated:
+            logger.warning(
+                f"Possible N+1 on {request.method} {request.path}: "
+                f"{entry['count']}x {entry['shape'][:200]}"
+            )
+        response.headers["X-DB-Query-Count"] = str(profile.count)
+        response.headers["X-DB-Time-Ms"] = f"{profile.seconds * 1000:.2f}"
+        response.headers["X-DB-Repeated-Queries"] = str(len(repeated))
+        if request.blueprint != "debug_bp":
+            # Path only: query strings can carry credentials (the SSE routes take ?jwt=)
+            request_profiles.add(
+                {"method": request.method, "path": request.path,
+                 "status": response.status_code, **profile.to_dict()},
+                app.config.get("SQL_PROFILER_HISTORY", 50),
+            )
+        return response
+
+    # after_request is skipped when a view raises
+    app.teardown_request(lambda exc: _stop_profile())
+
+
+def _stop_profile():
+    profile = g.pop("sql_profile", None)
+    if profile is not None and profile in _profiles():
+        _profiles().remove(profile)
+    return profile
@@ -0,0 +1,99 @@
+import json
+from datetime import timedelta
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_request_location, verify_jwt_in_request
+
+from app.extensions import jwt
+from app.utils.pubsub import get_broker
+
+# Sent once per stream; how long browsers wait before reconnecting
+SSE_RETRY_MS = 3000
+# Claim marking a token as good for opening streams and nothing else
+STREAM_SCOPE = "stream"
+STREAM_ENDPOINTS = {"parcel_bp.stream_user_parcels", "parcel_bp.stream_parcel"}
+
+
+def format_event(name, data, event_id=None):
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_response(channels, initial=()):
+    """
+    A text/event-stream response that relays messages published on `channels`.
+
+    `initial` is a list of (event name, data) pairs sent first. The stream
+    holds no request context or database connection, only a bounded queue, so an
+    idle subscriber is cheap. Under a cooperative worker (gunicorn -k gevent)
+    one process can hold thousands of them. A comment line every
+    SSE_HEARTBEAT_SECONDS keeps proxies from closing idle streams.
+    """
+    config = current_app.config
+    broker = get_broker()
+    if broker.subscription_count() >= config.get("SSE_MAX_STREAMS", 5000):
+        return jsonify({"error": "Too many open streams, please retry shortly"}), 503
+
+    subscription = broker.subscribe(channels)
+    heartbeat = config.get("SSE_HEARTBEAT_SECONDS", 15)
+
+    def generate():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        for name, data in initial:
+            yield format_event(name, data)
+        while True:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event("parcel", message, message.get("event_id"))
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    # Also runs when the client goes away before the first chunk is sent
+    response.call_on_close(subscription.close)
+    return response
+
+
+# ----------------- Stream tokens ----------------- #
+
+def create_stream_token(identity, claims):
+    """
+    Short-lived token for `?jwt=` on the stream endpoints. EventSource can't set
+    headers, and a URL ends up in access logs, so the long-lived access token
+    never goes there. The stream token carries the access token's identity and
+    role claims, lasts SSE_TOKEN_EXPIRES seconds, and opens streams only.
+    """
+    role_claims = {name: claims[name] for name in ("role", "is_deleted") if name in claims}
+    return create_access_token(
+        identity=identity,
+        additional_claims={**role_claims, "scope": STREAM_SCOPE},
+        expires_delta=timedelta(seconds=current_app.config.get("SSE_TOKEN_EXPIRES", 60)),
+    )
+
+
+def stream_jwt_required(view):
+    """
+    Like jwt_required(), but also takes a stream token from the query string.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request(locations=["headers", "query_string"])
+        if get_jwt_request_location() == "query_string" and get_jwt().get("scope") != STREAM_SCOPE:
+            return jsonify({"error": "Pass a stream token (POST /parcels/stream-token) in the query string"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_stream_tokens(app):
+    """
+    Refuse stream tokens everywhere but the stream endpoints.
+    """
+    @jwt.token_verification_loader
+    def stream_tokens_open_streams_only(jwt_header, jwt_payload):
+        return jwt_payload.get("scope") != STREAM_SCOPE or request.endpoint in STREAM_ENDPOINTS
@@ -0,0 +1,86 @@
+"""
+Round trips and wall time of bulk_update_parcels for growing batch sizes.
+
+    python -m benchmarks.bench_bulk_update
+
+Runs against an in-memory SQLite database unless BENCH_DATABASE_URL points
+at a scratch database (its tables are dropped afterwards).
+
+Every batch moves all of its parcels to one status/location pair, the same
+way a sorting-hub scan does, so the statement count should stay roughly
+flat (one extra IN chunk per BULK_CHUNK_SIZE ids) as the batch grows.
+"""
+import os
+import time
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+from app.models.location import Location
+from app.models.parcel import Parcel
+from app.models.status import Status
+from app.models.user import User
+from app.presenters.admin_parcel_presenter import bulk_update_parcels
+from app.utils.reference_cache import reference_cache
+
+BATCH_SIZES = [100, 1000, 5000, 10000]
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv("BENCH_DATABASE_URL", "sqlite:///:memory:")
+
+
+def seed(count):
+    admin = User(name="Bench Admin", email="bench-admin@example.com", password_hash="x", role="admin")
+    hub = Location(city="Nairobi", address="Kenyatta Avenue")
+    sorting = Location(city="Mombasa", address="Moi Avenue")
+    statuses = [Status(name=name) for name in ["Pending", "In Transit"]]
+    db.session.add_all([admin, hub, sorting, *statuses])
+    db.session.commit()
+
+    db.session.execute(Parcel.__table__.insert(), [
+        {
+            "description": f"Bench parcel {i}",
+            "user_id": admin.id,
+            "origin_id": hub.id,
+            "destination_id": sorting.id,
+            "present_location_id": hub.id,
+            "status_id": statuses[0].id,
+            "is_deleted": False,
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+    return admin.id
+
+
+def run():
+    app = create_app(BenchConfig)
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        admin_id = seed(max(BATCH_SIZES))
+        parcel_ids = db.session.execute(db.select(Parcel.id).order_by(Parcel.id)).scalars().all()
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        print(f"{'batch':>8} {'statements':>11} {'seconds':>9}")
+        for size in BATCH_SIZES:
+            entries = [
+                {"parcel_id": parcel_id, "status": "In Transit", "current_location": "Mombasa"}
+                for parcel_id in parcel_ids[:size]
+            ]
+            db.session.expire_all()
+            reference_cache.warm()
+            statements.clear()
+            started = time.perf_counter()
+            bulk_update_parcels(admin_id, entries)
+            elapsed = time.perf_counter() - started
+            print(f"{size:>8} {len(statements):>11} {elapsed:>9.3f}")
+
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,74 @@
+"""
+Parcel import throughput through POST /parcels/import, CSV and NDJSON.
+
+    python -m benchmarks.bench_import [rows]
+
+Runs against an in-memory SQLite database unless BENCH_DATABASE_URL points
+at a scratch database (its tables are dropped afterwards). Locations are
+given by city and the status is left to default, so every row goes through
+schema validation and the reference cache lookups.
+"""
+import io
+import json
+import sys
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models.location import Location
+from app.models.parcel import Parcel
+from app.models.status import Status
+from app.models.user import User
+from app.utils.jwt import user_claims
+from benchmarks.generate_data import BenchConfig
+
+ROWS = 100_000
+CITIES = ["Nairobi", "Mombasa", "Kisumu", "Nakuru"]
+
+
+def csv_upload(count):
+    lines = ["description,origin,destination"]
+    lines += [f"Bench parcel {i},{CITIES[i % 4]},{CITIES[(i + 1) % 4]}" for i in range(count)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def ndjson_upload(count):
+    return "".join(
+        json.dumps({"description": f"Bench parcel {i}", "origin": CITIES[i % 4], "destination": CITIES[(i + 1) % 4]})
+        + "\n"
+        for i in range(count)
+    ).encode()
+
+
+def run(count):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        merchant = User(name="Bench Merchant", email="bench-merchant@example.com", password_hash="x")
+        db.session.add_all([merchant, Status(name="Pending"),
+                            *[Location(city=city, address="Main Street") for city in CITIES]])
+        db.session.commit()
+        headers = {"Authorization": "Bearer " + create_access_token(
+            identity={"id": merchant.id}, additional_claims=user_claims(merchant))}
+
+        client = app.test_client()
+        print(f"{'format':<8} {'rows':>8} {'seconds':>9} {'rows/s':>10}")
+        for name, build in (("csv", csv_upload), ("ndjson", ndjson_upload)):
+            upload = build(count)
+            started = time.perf_counter()
+            response = client.post(
+                "/parcels/import", headers=headers, content_type="multipart/form-data",
+                data={"file": (io.BytesIO(upload), f"parcels.{name}")},
+            )
+            elapsed = time.perf_counter() - started
+            report = response.get_json()
+            assert report["imported"] == count, report
+            print(f"{name:<8} {count:>8} {elapsed:>9.2f} {count / elapsed:>10.0f}")
+
+        assert Parcel.query.count() == count * 2
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
@@ -0,0 +1,321 @@
+"""
+Concurrent load through the real routes: login, parcel listing, parcel
+creation and admin bulk updates, mixed by weight.
+
+    python -m benchmarks.bench_load [--parcels N] [--duration S] [--concurrency C]
+                                   [--mix login=1,list=10,create=3,bulk_update=1]
+                                   [--url http://host:port] [--compare previous.json]
+                                   [--rate-limits]
+
+Without --url the requests go through the Flask test client of an in-process
+app (BENCH_DATABASE_URL, in-memory SQLite by default); with --url they go over
+HTTP to a running server, which must use the same database (and should run
+with RATE_LIMIT_ENABLED=false). Unless
+--no-generate is given, benchmarks.generate_data first adds --users,
+--locations and --parcels rows. Clients sign in as generated users.
+
+Rate limiting is off in-process: every client shares 127.0.0.1 and the
+admin account, so the limits would turn most logins and bulk updates into
+429s. --rate-limits keeps them on, to measure the limiter itself.
+
+Each client thread picks scenarios at random by weight until --duration runs
+out; the first --warmup seconds are not recorded. The report shows requests/s,
+error counts and latency percentiles per scenario, and is written as JSON to
+--output (default benchmarks/results/bench_load-<time>.json). --compare prints
+the change against an earlier result file.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app import create_app, db
+from app.models.location import Location
+from app.models.parcel import Parcel
+from app.models.user import User
+from app.models.status import Status
+from benchmarks.generate_data import BenchConfig, EMAIL_PREFIX, LOAD_PASSWORD, STATUSES, generate
+
+CORES = os.cpu_count() or 1
+DEFAULT_MIX = "login=1,list=10,create=3,bulk_update=1"
+BULK_UPDATE_SIZE = 100
+SAMPLE_SIZE = 1000
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+PERCENTILES = (50, 90, 95, 99)
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+
+def load_sample():
+    """
+    Generated users, locations and parcels for the clients to work with.
+    """
+    users = db.session.execute(
+        select(User.email).where(User.email.like(f"{EMAIL_PREFIX}%"), User.role == "user", User.is_deleted.is_(False))
+        .order_by(func.random()).limit(SAMPLE_SIZE)
+    ).scalars().all()
+    admin = db.session.execute(
+        select(User.email).where(User.email.like(f"{EMAIL_PREFIX}%"), User.role == "admin", User.is_deleted.is_(False))
+        .limit(1)
+    ).scalar()
+    if not users or admin is None:
+        raise SystemExit("No generated users found; run without --no-generate first.")
+    return {
+        "users": users,
+        "admin": admin,
+        "location_ids": db.session.execute(
+            select(Location.id).order_by(func.random()).limit(SAMPLE_SIZE)).scalars().all(),
+        "parcel_ids": db.session.execute(
+            select(Parcel.id).where(Parcel.is_deleted.is_(False)).order_by(func.random()).limit(SAMPLE_SIZE * 10)
+        ).scalars().all(),
+        "pending_id": db.session.execute(select(Status.id).where(Status.name == "Pending")).scalar(),
+        "rows": {
+            model.__tablename__: db.session.execute(select(func.count()).select_from(model)).scalar()
+            for model in (User, Location, Parcel)
+        },
+    }
+
+
+def login(transport, email):
+    status, body = transport.request("POST", "/auth/login", {"email": email, "password": LOAD_PASSWORD})
+    return (body or {}).get("access_token") if status == 200 else None
+
+
+def make_scenarios(sample):
+    def login_scenario(transport, session):
+        return transport.request("POST", "/auth/login", {"email": random.choice(sample["users"]),
+                                                        "password": LOAD_PASSWORD})[0]
+
+    def list_scenario(transport, session):
+        return transport.request("GET", "/parcels?limit=20", token=session["token"])[0]
+
+    def create_scenario(transport, session):
+        origin, destination = random.sample(sample["location_ids"], 2)
+        return transport.request("POST", "/parcels", {
+            "description": "Load test parcel",
+            "origin_id": origin,
+            "destination_id": destination,
+            "status_id": sample["pending_id"],
+        }, token=session["token"])[0]
+
+    def bulk_update_scenario(transport, session):
+        parcel_ids = random.sample(sample["parcel_ids"], min(BULK_UPDATE_SIZE, len(sample["parcel_ids"])))
+        return transport.request("PATCH", "/admin/parcels/bulk-update", [
+            {"parcel_id": parcel_id, "status": random.choice(STATUSES)} for parcel_id in parcel_ids
+        ], token=session["admin_token"])[0]
+
+    return {
+        "login": login_scenario,
+        "list": list_scenario,
+        "create": create_scenario,
+        "bulk_update": bulk_update_scenario,
+    }
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_load(transport_factory, sample, mix, concurrency, duration, warmup):
+    """
+    (elapsed seconds, {scenario: [(latency seconds, status), ...]}) for the recorded window.
+    """
+    scenarios = make_scenarios(sample)
+    unknown = set(mix) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    results = {name: [] for name in names}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    record_from = started + warmup
+    deadline = record_from + duration
+
+    def client_loop():
+        transport = transport_factory()
+        session = {
+            "token": login(transport, random.choice(sample["users"])),
+            "admin_token": login(transport, sample["admin"]),
+        }
+        local = {name: [] for name in names}
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            name = random.choices(names, weights)[0]
+            status = scenarios[name](transport, session)
+            finished = time.perf_counter()
+            if now >= record_from:
+                local[name].append((finished - now, status))
+        with lock:
+            for name, samples in local.items():
+                results[name].extend(samples)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - record_from, results
+
+
+def summarise(samples, elapsed):
+    if not samples:
+        return {"requests": 0, "errors": 0, "throughput": 0.0}
+    latencies = np.array([latency for latency, _ in samples]) * 1000
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for _, status in samples if status >= 400),
+        "statuses": statuses,
+        "throughput": round(len(samples) / elapsed, 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+        "max_ms": round(float(latencies.max()), 2),
+    }
+    for percentile, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        summary[f"p{percentile}_ms"] = round(float(value), 2)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, previous=None):
+    print(f"{report['concurrency']} clients, {report['elapsed']:.1f}s recorded, {report['database']}")
+    header = f"{'scenario':<12} {'req/s':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if previous:
+        header += f" {'req/s vs':>9} {'p95 vs':>9}"
+    print(header)
+    for name, stats in {**report["scenarios"], "overall": report["overall"]}.items():
+        line = (f"{name:<12} {stats['throughput']:>9.1f} {stats['errors']:>7} "
+                f"{stats.get('p50_ms', 0):>9.1f} {stats.get('p95_ms', 0):>9.1f} {stats.get('p99_ms', 0):>9.1f}")
+        before = None
+        if previous:
+            before = previous["overall"] if name == "overall" else previous["scenarios"].get(name)
+        if before:
+            line += f" {_change(before['throughput'], stats['throughput']):>9} "
+            line += f"{_change(before.get('p95_ms'), stats.get('p95_ms')):>9}"
+        print(line)
+
+
+def _change(before, after):
+    if not before or after is None:
+        return "-"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--parcels", type=int, default=100_000)
+    parser.add_argument("--no-generate", action="store_true", help="Use the rows already in the database.")
+    parser.add_argument("--concurrency", type=int, default=CORES * 2)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--url", default=None, help="Drive a running server instead of an in-process app.")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rate-limits", action="store_true", help="Keep RATE_LIMITS on for the in-process app.")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    BenchConfig.RATE_LIMIT_ENABLED = args.rate_limits
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        generated = None
+        if not args.no_generate:
+            generated = generate(args.users, args.locations, args.parcels, seed=args.seed)
+        sample = load_sample()
+        database = db.engine.dialect.name
+
+    if args.url:
+        transport_factory = lambda: HttpTransport(args.url)  # noqa: E731
+    else:
+        transport_factory = lambda: TestClientTransport(app)  # noqa: E731
+
+    elapsed, results = run_load(
+        transport_factory, sample, parse_mix(args.mix), args.concurrency, args.duration, args.warmup
+    )
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "database": database,
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "mix": parse_mix(args.mix),
+        "rows": sample["rows"],
+        "generated": generated,
+        "elapsed": round(elapsed, 3),
+        "scenarios": {name: summarise(samples, elapsed) for name, samples in results.items()},
+        "overall": summarise([entry for samples in results.values() for entry in samples], elapsed),
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_load-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
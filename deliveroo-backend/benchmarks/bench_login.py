@@ -0,0 +1,87 @@
+"""
+Login throughput through POST /auth/login at several password-hash cost settings.
+
+    python -m benchmarks.bench_login [seconds-per-setting]
+
+Each setting gets a fresh app whose hashing pool has one process per core.
+Logins are fired from 2x as many client threads, and the report shows
+logins/sec overall and per core. Uses in-memory SQLite unless
+BENCH_DATABASE_URL points at a scratch database.
+"""
+import os
+import sys
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.config import Config
+from app.models.user import User
+from app.utils.password_hashing import password_hasher
+
+COST_SETTINGS = [
+    "pbkdf2:sha256:100000",
+    "pbkdf2:sha256:600000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+]
+CORES = os.cpu_count() or 1
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv("BENCH_DATABASE_URL", "sqlite:///:memory:")
+    PASSWORD_HASH_WORKERS = CORES
+    PASSWORD_HASH_MAX_PENDING = CORES * 4
+    PASSWORD_HASH_QUEUE_TIMEOUT = 30
+    # One account from one address: the login limits would cap it at a few per minute
+    RATE_LIMIT_ENABLED = False
+
+
+def bench_setting(method, duration):
+    BenchConfig.PASSWORD_HASH_METHOD = method
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(
+            name="Bench User",
+            email="bench@example.com",
+            password_hash=generate_password_hash("password", method=method),
+        ))
+        db.session.commit()
+
+    logins, rejected = [], []
+    deadline = time.perf_counter() + duration
+
+    def client_loop():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            response = client.post("/auth/login", json={"email": "bench@example.com", "password": "password"})
+            (logins if response.status_code == 200 else rejected).append(1)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(CORES * 2)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        password_hasher.shutdown()
+        db.drop_all()
+
+    rate = len(logins) / elapsed
+    return rate, rate / CORES, len(rejected)
+
+
+def run(duration):
+    print(f"{CORES} cores, {duration}s per setting")
+    print(f"{'method':<24} {'logins/s':>10} {'per core':>10} {'rejected':>9}")
+    for method in COST_SETTINGS:
+        rate, per_core, rejected = bench_setting(method, duration)
+        print(f"{method:<24} {rate:>10.1f} {per_core:>10.1f} {rejected:>9}")
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,67 @@
+"""
+Route planning on synthetic instances of 1k to 50k parcels.
+
+    python -m benchmarks.bench_routing [time-budget-seconds]
+
+Parcels get distinct random drop-offs within ~25 km of a Nairobi hub, which
+is the worst case: no two share a stop. Each size is planned twice on a
+pool with one process per core. The first run is nearest-neighbour
+construction only (budget 0). The second adds 2-opt within the budget. The
+report shows routes, total km for both runs, and wall time.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from app import create_app
+from app.config import Config
+from app.utils.routing import route_planner
+
+SIZES = [1_000, 5_000, 10_000, 50_000]
+PARCELS_PER_COURIER = 200
+HUB = (-1.2864, 36.8172)
+CORES = os.cpu_count() or 1
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv("BENCH_DATABASE_URL", "sqlite:///:memory:")
+    ROUTING_WORKERS = CORES
+    ROUTING_QUEUE_TIMEOUT = 30
+
+
+def synthetic_instance(size, seed=42):
+    rng = np.random.default_rng(seed)
+    radius = 0.225 * np.sqrt(rng.uniform(0, 1, size))
+    bearing = rng.uniform(0, 2 * np.pi, size)
+    points = np.column_stack([HUB[0] + radius * np.sin(bearing), HUB[1] + radius * np.cos(bearing)])
+    return points, np.ones(size, dtype=np.int64)
+
+
+def timed_plan(points, demands, couriers, max_parcels, budget):
+    started = time.perf_counter()
+    routes = route_planner.plan(HUB, points, demands, couriers, max_parcels, budget)
+    elapsed = time.perf_counter() - started
+    return len(routes), sum(length for _, length in routes), elapsed
+
+
+def run(budget):
+    app = create_app(BenchConfig)
+    max_parcels = app.config["ROUTE_MAX_PARCELS"]
+    print(f"{CORES} cores, {budget}s 2-opt budget, {max_parcels} parcels per route")
+    print(f"{'parcels':>8} {'routes':>7} {'NN km':>11} {'2-opt km':>11} {'saved':>7} {'NN s':>7} {'total s':>8}")
+    with app.app_context():
+        for size in SIZES:
+            points, demands = synthetic_instance(size)
+            couriers = max(1, size // PARCELS_PER_COURIER)
+            routes, nn_km, nn_seconds = timed_plan(points, demands, couriers, max_parcels, 0)
+            _, best_km, seconds = timed_plan(points, demands, couriers, max_parcels, budget)
+            saved = 100 * (nn_km - best_km) / nn_km
+            print(f"{size:>8} {routes:>7} {nn_km:>11.1f} {best_km:>11.1f} {saved:>6.1f}% "
+                  f"{nn_seconds:>7.2f} {seconds:>8.2f}")
+        route_planner.shutdown()
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
@@ -0,0 +1,102 @@
+"""
+Serialising 100k parcels: ORM objects + to_dict() + stdlib json versus the
+column projection + orjson path used by the listings.
+
+    python -m benchmarks.bench_serialization [rows]
+
+Runs against an in-memory SQLite database unless BENCH_DATABASE_URL points
+at a scratch database (its tables are dropped afterwards). Each path is timed
+end to end (query, dict building, encoding) and the two outputs are checked
+to decode to the same data.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app, db
+from app.config import Config
+from app.models.location import Location
+from app.models.parcel import Parcel, parcel_projection
+from app.models.status import Status
+from app.models.user import User
+from app.utils.reference_cache import reference_cache
+
+ROWS = 100_000
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv("BENCH_DATABASE_URL", "sqlite:///:memory:")
+
+
+def seed(count):
+    owner = User(name="Bench Owner", email="bench-owner@example.com", password_hash="x")
+    locations = [Location(city=city, address="Main Street") for city in ["Nairobi", "Mombasa", "Kisumu"]]
+    statuses = [Status(name=name) for name in ["Pending", "In Transit", "Delivered"]]
+    db.session.add_all([owner, *locations, *statuses])
+    db.session.commit()
+
+    now = datetime.utcnow()
+    db.session.execute(Parcel.__table__.insert(), [
+        {
+            "description": f"Bench parcel {i}",
+            "user_id": owner.id,
+            "origin_id": locations[i % 3].id,
+            "destination_id": locations[(i + 1) % 3].id,
+            "present_location_id": locations[i % 3].id,
+            "status_id": statuses[i % 3].id,
+            "is_deleted": False,
+            "created_at": now,
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def orm_path(encoder):
+    parcels = Parcel.query.order_by(Parcel.id).all()
+    return encoder.dumps({"parcels": [parcel.to_dict() for parcel in parcels]})
+
+
+def projection_path(encoder):
+    rows = db.session.execute(db.select(*parcel_projection.columns).order_by(Parcel.id))
+    return encoder.dumps({"parcels": parcel_projection.to_dicts(rows)})
+
+
+def timed(path, encoder):
+    db.session.expunge_all()
+    started = time.perf_counter()
+    body = path(encoder)
+    return time.perf_counter() - started, body
+
+
+def run(rows):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        try:
+            seed(rows)
+            reference_cache.warm()
+            stdlib = DefaultJSONProvider(app)
+
+            baseline, baseline_body = timed(orm_path, stdlib)
+            fast, fast_body = timed(projection_path, app.json)
+            assert stdlib.loads(baseline_body) == app.json.loads(fast_body)
+
+            print(f"{rows} parcels, {len(fast_body) / 1e6:.1f} MB of JSON")
+            print(f"{'path':<34} {'seconds':>8} {'rows/s':>10}")
+            for name, seconds in (
+                ("ORM + to_dict + json", baseline),
+                (f"projection + {type(app.json).__name__}", fast),
+            ):
+                print(f"{name:<34} {seconds:>8.2f} {rows / seconds:>10.0f}")
+            print(f"speed-up: {baseline / fast:.1f}x")
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
@@ -0,0 +1,265 @@
+"""
+Synthetic users, locations and parcels at production scale.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.generate_data \\
+        --users 1000000 --locations 2000 --parcels 5000000
+
+Rows are appended to whatever is already there (nothing is dropped), so a
+database can be grown across runs. On Postgres each table is streamed in with
+COPY, elsewhere it goes through batched executemany inserts. Every generated
+user has the password "password" (one hash, computed once), the first user of
+each run is an admin, and parcels get one parcel_events row each. Afterwards
+the parcel counters are reconciled, the reference cache version is bumped and
+the distance matrix is rebuilt, since bulk loads bypass the ORM listeners that
+normally keep them in step.
+
+BENCH_DATABASE_URL must be set: an in-memory database would vanish with this
+process (benchmarks.bench_load calls generate() in-process instead).
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, insert, select, text
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.config import Config
+from app.models.location import Location
+from app.models.parcel import Parcel
+from app.models.parcel_event import ParcelEvent
+from app.models.status import Status
+from app.models.user import User
+from app.utils.map_utils import distance_matrix
+from app.utils.parcel_counters import reconcile_parcel_counters
+from app.utils.reference_cache import reference_cache
+from app.utils.soft_delete import include_deleted
+
+LOAD_PASSWORD = "password"
+EMAIL_PREFIX = "load-"
+STATUSES = ["Pending", "In Transit", "Delivered", "Cancelled"]
+TOWNS = ["Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret", "Thika", "Malindi", "Kitale", "Garissa", "Kakamega"]
+# Kenya, roughly
+LATITUDES = (-4.7, 4.6)
+LONGITUDES = (33.9, 41.9)
+BATCH_SIZE = 50_000
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv("BENCH_DATABASE_URL", "sqlite:///:memory:")
+    # Every bench client comes from one address and a handful of accounts, so the
+    # limiter would answer most requests with 429 and the numbers would measure it
+    RATE_LIMIT_ENABLED = False
+
+
+def bulk_insert(table, columns, batches):
+    """
+    Load `batches` (lists of row tuples in `columns` order) into `table`, with
+    COPY on Postgres and executemany elsewhere. Commits once at the end.
+    """
+    connection = db.session.connection()
+    copy = connection.dialect.name == "postgresql"
+    total = 0
+    for rows in batches:
+        if copy:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(("" if value is None else value for value in row) for row in rows)
+            buffer.seek(0)
+            cursor = connection.connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.close()
+        else:
+            connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+        total += len(rows)
+    db.session.commit()
+    return total
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield start, min(batch_size, count - start)
+
+
+def _timestamps(rng, now, days, size):
+    seconds = rng.integers(0, days * 86400, size=size)
+    return [now - timedelta(seconds=int(offset)) for offset in seconds]
+
+
+def _new_ids(model, after_id):
+    return np.fromiter(
+        db.session.execute(select(model.id).where(model.id > after_id).order_by(model.id)).scalars(), dtype=np.int64
+    )
+
+
+def _max_id(model):
+    return db.session.execute(include_deleted(select(func.coalesce(func.max(model.id), 0)))).scalar()
+
+
+def ensure_statuses():
+    existing = {status.name: status.id for status in Status.query.filter(Status.name.in_(STATUSES))}
+    missing = [Status(name=name) for name in STATUSES if name not in existing]
+    if missing:
+        db.session.add_all(missing)
+        db.session.commit()
+        existing.update((status.name, status.id) for status in missing)
+    return np.array([existing[name] for name in STATUSES], dtype=np.int64)
+
+
+def generate_users(count, rng, run, now, days, batch_size):
+    password_hash = generate_password_hash(LOAD_PASSWORD, method=current_app.config["PASSWORD_HASH_METHOD"])
+    columns = ["name", "email", "password_hash", "role", "is_deleted", "deleted_at", "created_at"]
+
+    def batches():
+        for start, size in _batches(count, batch_size):
+            roles = rng.choice(["user", "courier"], size=size, p=[0.98, 0.02])
+            deleted = rng.random(size) < 0.01
+            created = _timestamps(rng, now, days, size)
+            rows = []
+            for i in range(size):
+                n = start + i
+                role, is_deleted = ("admin", False) if n == 0 else (str(roles[i]), bool(deleted[i]))
+                rows.append((f"Load User {n}", f"{EMAIL_PREFIX}{run}-{n}@example.com", password_hash,
+                             role, is_deleted, created[i] if is_deleted else None, created[i]))
+            yield rows
+
+    before = _max_id(User)
+    bulk_insert(User.__table__, columns, batches())
+    return _new_ids(User, before)
+
+
+def generate_locations(count, rng, now, batch_size):
+    columns = ["city", "address", "latitude", "longitude", "created_at"]
+
+    def batches():
+        for start, size in _batches(count, batch_size):
+            latitudes = rng.uniform(*LATITUDES, size=size)
+            longitudes = rng.uniform(*LONGITUDES, size=size)
+            yield [
+                (f"{TOWNS[(start + i) % len(TOWNS)]} {start + i}", f"{start + i} Load Street",
+                 round(float(latitudes[i]), 6), round(float(longitudes[i]), 6), now)
+                for i in range(size)
+            ]
+
+    before = _max_id(Location)
+    bulk_insert(Location.__table__, columns, batches())
+    return _new_ids(Location, before)
+
+
+def generate_parcels(count, rng, user_ids, location_ids, status_ids, now, days, batch_size):
+    columns = ["description", "user_id", "origin_id", "destination_id", "present_location_id",
+               "status_id", "is_deleted", "deleted_at", "created_at"]
+
+    def batches():
+        for start, size in _batches(count, batch_size):
+            users = rng.choice(user_ids, size=size)
+            origins = rng.choice(location_ids, size=size)
+            destinations = rng.choice(location_ids, size=size)
+            # Half still at the origin, the rest somewhere along the way
+            present = np.where(rng.random(size) < 0.5, origins, rng.choice(location_ids, size=size))
+            statuses = rng.choice(status_ids, size=size, p=[0.4, 0.3, 0.25, 0.05])
+            deleted = rng.random(size) < 0.02
+            created = _timestamps(rng, now, days, size)
+            yield [
+                (f"Load parcel {start + i}", int(users[i]), int(origins[i]), int(destinations[i]),
+                 int(present[i]), int(statuses[i]), bool(deleted[i]),
+                 created[i] if deleted[i] else None, created[i])
+                for i in range(size)
+            ]
+
+    before = _max_id(Parcel)
+    total = bulk_insert(Parcel.__table__, columns, batches())
+
+    # The creation event of each new parcel, in one INSERT ... SELECT
+    db.session.execute(insert(ParcelEvent).from_select(
+        ["parcel_id", "status_id", "location_id", "actor_id", "created_at"],
+        select(Parcel.id, Parcel.status_id, Parcel.present_location_id, Parcel.user_id, Parcel.created_at)
+        .where(Parcel.id > before),
+    ))
+    db.session.commit()
+    return total
+
+
+def generate(users, locations, parcels, seed=None, days=365, batch_size=BATCH_SIZE):
+    """
+    Append the given numbers of rows and bring the derived data back in step.
+    Returns row counts and timings.
+    """
+    rng = np.random.default_rng(seed)
+    run = uuid.uuid4().hex[:8]
+    now = datetime.utcnow()
+    timings = {}
+
+    started = time.perf_counter()
+    status_ids = ensure_statuses()
+    user_ids = generate_users(users, rng, run, now, days, batch_size)
+    timings["users"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    location_ids = generate_locations(locations, rng, now, batch_size)
+    timings["locations"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if parcels and (not len(user_ids) or not len(location_ids)):
+        # Reuse earlier runs' rows when this one adds no users or locations
+        user_ids = user_ids if len(user_ids) else _new_ids(User, 0)
+        location_ids = location_ids if len(location_ids) else _new_ids(Location, 0)
+    generate_parcels(parcels, rng, user_ids, location_ids, status_ids, now, days, batch_size)
+    timings["parcels"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reconcile_parcel_counters()
+    reference_cache.invalidate()
+    db.session.commit()
+    located = db.session.execute(
+        select(Location.id, Location.latitude, Location.longitude)
+        .where(Location.latitude.isnot(None), Location.longitude.isnot(None))
+    ).all()
+    distance_matrix.build(located)
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("ANALYZE users, locations, parcels, parcel_events"))
+        db.session.commit()
+    timings["derived"] = time.perf_counter() - started
+
+    return {
+        "run": run,
+        "rows": {"users": users, "locations": locations, "parcels": parcels},
+        "seconds": {name: round(seconds, 3) for name, seconds in timings.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--parcels", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if not os.getenv("BENCH_DATABASE_URL"):
+        sys.exit("Set BENCH_DATABASE_URL to the scratch database to load.")
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        summary = generate(args.users, args.locations, args.parcels, args.seed, args.days, args.batch_size)
+
+    for table, count in summary["rows"].items():
+        seconds = summary["seconds"][table]
+        print(f"{table:<10} {count:>10} rows {seconds:>9.1f}s {count / seconds if seconds else 0:>10.0f} rows/s")
+    print(f"{'derived':<10} {'':>15} {summary['seconds']['derived']:>9.1f}s")
+
+
+if __name__ == "__main__":
+    main()
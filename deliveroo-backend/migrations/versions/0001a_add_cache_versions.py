@@ -0,0 +1,35 @@
+"""add cache versions
+
+Version counters for per-process caches, seeded with the reference_data row
+that every status or location write bumps.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 18:30:35.104512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(cache_versions.insert().values(
+        name='reference_data', version=1, updated_at=sa.func.current_timestamp()
+    ))
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,47 @@
+"""add parcel and user indexes
+
+Composite indexes for the hot parcel and user access paths. They are
+partial, covering live (is_deleted = false) rows only. On Postgres they are
+built CONCURRENTLY so the tables stay writable while the indexes build.
+
+Revision ID: 0002
+Revises: 0001b
+Create Date: 2026-10-18 18:30:48.185195
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001b'
+branch_labels = None
+depends_on = None
+
+LIVE_ROWS = dict(
+    postgresql_where=sa.text('is_deleted = false'),
+    sqlite_where=sa.text('is_deleted = 0'),
+)
+
+INDEXES = [
+    ('ix_parcels_live_user_id_created_at', 'parcels', ['user_id', 'created_at', 'id']),
+    ('ix_parcels_live_created_at', 'parcels', ['created_at', 'id']),
+    ('ix_parcels_live_status_id_created_at', 'parcels', ['status_id', 'created_at']),
+    ('ix_parcels_live_present_location_id_status_id', 'parcels', ['present_location_id', 'status_id']),
+    ('ix_users_live_created_at', 'users', ['created_at', 'id']),
+    ('ix_users_live_role_created_at', 'users', ['role', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, **LIVE_ROWS)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
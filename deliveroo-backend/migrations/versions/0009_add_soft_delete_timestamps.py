@@ -0,0 +1,56 @@
+"""add soft delete timestamps
+
+deleted_at on users and parcels, stamped when is_deleted turns true, with
+partial indexes over soft-deleted rows only for the purge job. Rows already
+soft-deleted take their updated_at (or created_at) as the deletion time.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 21:47:20.272324
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+DEAD_ROWS = dict(
+    postgresql_where=sa.text('is_deleted = true'),
+    sqlite_where=sa.text('is_deleted = 1'),
+)
+
+TABLES = ['users', 'parcels']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        rows = sa.table(table, sa.column('is_deleted'), sa.column('deleted_at'),
+                        sa.column('created_at'), sa.column('updated_at'))
+        op.execute(
+            rows.update()
+            .where(rows.c.is_deleted == sa.true())
+            .values(deleted_at=sa.func.coalesce(rows.c.updated_at, rows.c.created_at, sa.func.current_timestamp()))
+        )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f'ix_{table}_dead_deleted_at', table, ['deleted_at'], unique=False,
+                            postgresql_concurrently=True, **DEAD_ROWS)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_dead_deleted_at', table_name=table, postgresql_concurrently=True)
+
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('deleted_at')
@@ -0,0 +1,73 @@
+"""add search indexes
+
+Text search for GET /admin/search. On Postgres: pg_trgm and a trigram GiST
+index per searchable table, live rows only for parcels and users, built
+CONCURRENTLY. On SQLite: an FTS5 trigram table per searchable table, filled
+from the base table and kept current by triggers. Same DDL as
+app/models/search_index.py.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 22:31:09.418223
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+DOCUMENTS = {
+    'parcels': ("description", ['description'], True),
+    'users': ("name || ' ' || email", ['name', 'email'], True),
+    'locations': ("city || ' ' || address", ['city', 'address'], False),
+}
+
+
+def _fts_statements(table, columns):
+    listed = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    remove = f"INSERT INTO {table}_fts({table}_fts, rowid, {listed}) VALUES ('delete', old.id, {old});"
+    add = f"INSERT INTO {table}_fts(rowid, {listed}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+        f"{listed}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {listed} ON {table} "
+        f"BEGIN {remove} {add} END",
+        f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            for table, (document, _, live_only) in DOCUMENTS.items():
+                where = ' WHERE is_deleted = false' if live_only else ''
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_trgm ON {table} '
+                    f'USING gist (({document}) gist_trgm_ops){where}'
+                )
+    elif op.get_bind().dialect.name == 'sqlite':
+        for table, (_, columns, _) in DOCUMENTS.items():
+            for statement in _fts_statements(table, columns):
+                op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in reversed(list(DOCUMENTS)):
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_trgm')
+    elif op.get_bind().dialect.name == 'sqlite':
+        for table in reversed(list(DOCUMENTS)):
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
@@ -34,9 +34,9 @@ def seed_data():
 
     # Seed Locations
     locations = [
-        Location(city="Nairobi", address="Kenyatta Avenue"),
-        Location(city="Mombasa", address="Moi Avenue"),
-        Location(city="Kisumu", address="Oginga Odinga St"),
+        Location(city="Nairobi", address="Kenyatta Avenue", latitude=-1.2841, longitude=36.8219),
+        Location(city="Mombasa", address="Moi Avenue", latitude=-4.0621, longitude=39.6709),
+        Location(city="Kisumu", address="Oginga Odinga St", latitude=-0.1022, longitude=34.7617),
     ]
     db.session.add_all(locations)
     db.session.commit()
@@ -3,13 +3,15 @@ from app import create_app, db
 from app.models import Location, Status
 
 @pytest.fixture(scope='session')
-def app():
+def app(tmp_path_factory):
     app = create_app()
     app.config.update({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
         "SQLALCHEMY_TRACK_MODIFICATIONS": False,
         "JWT_SECRET_KEY": "test-secret-key",
+        "DISTANCE_MATRIX_DIR": str(tmp_path_factory.mktemp("distance_matrix")),
+        "RATE_LIMIT_ENABLED": False,
     })
 
     with app.app_context():
@@ -32,3 +34,53 @@ def seed_data(app):
 
     db.session.add_all([location1, location2, pending_status, delivered_status])
     db.session.commit()
+
+@pytest.fixture
+def query_budget(app):
+    """
+    Context manager failing the test when its block runs more than `max_queries`
+    SQL statements, or repeats one statement shape `max_repeats` times or more:
+
+        with query_budget(3):
+            client.get("/parcels", headers=headers)
+    """
+    from contextlib import contextmanager
+    from app.utils.sql_profiler import capture_queries
+
+    @contextmanager
+    def budget(max_queries, max_repeats=None):
+        with capture_queries(max_repeats or app.config["SQL_PROFILER_REPEAT_THRESHOLD"]) as profile:
+            yield profile
+        shapes = "\n".join(f"  {entry['count']}x {entry['shape']}" for entry in profile.shapes.values())
+        assert profile.count <= max_queries, (
+            f"{profile.count} SQL statements, budget {max_queries}:\n{shapes}"
+        )
+        assert not profile.repeated, f"Repeated statement shapes (N+1?):\n{shapes}"
+
+    return budget
+
+@pytest.fixture
+def auth_headers(app):
+    """
+    Authorization header with an access token for `user`, carrying its role claims:
+
+        client.get("/parcels", headers=auth_headers(owner))
+    """
+    from flask_jwt_extended import create_access_token
+    from app.utils.jwt import user_claims
+
+    def headers(user):
+        token = create_access_token(identity={"id": user.id}, additional_claims=user_claims(user))
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
+
+@pytest.fixture
+def pending_status(app):
+    """The "Pending" status new parcels start in, created if no earlier test has."""
+    pending = Status.query.filter_by(name="Pending").first()
+    if pending is None:
+        pending = Status(name="Pending")
+        db.session.add(pending)
+        db.session.commit()
+    return pending
@@ -20,3 +20,276 @@ def test_get_all_users_admin(client):
 
     assert res.status_code == 200
     assert isinstance(res.get_json(), list)
+
+def make_admin_token(email):
+    from flask_jwt_extended import create_access_token
+    from app import db
+    from app.models.user import User
+
+    admin = User(name="Export Admin", email=email, password_hash="x", role="admin")
+    db.session.add(admin)
+    db.session.commit()
+    return create_access_token(identity=admin.id)
+
+def test_export_parcels_streams_ndjson_and_csv(client):
+    import csv
+    import io
+    import json
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+
+    token = make_admin_token("export-admin@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    hub = Location(city="Eldoret", address="Uganda Road")
+    in_transit = Status(name="Export In Transit")
+    db.session.add_all([hub, in_transit])
+    db.session.commit()
+    db.session.add_all([
+        Parcel(description=f"Export {i}", user_id=1, origin_id=hub.id, destination_id=hub.id,
+               present_location_id=hub.id, status_id=in_transit.id)
+        for i in range(3)
+    ])
+    db.session.commit()
+
+    res = client.get("/admin/parcels/export?status=Export In Transit", headers=headers)
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert [row["description"] for row in rows] == ["Export 0", "Export 1", "Export 2"]
+    assert {row["present_location"] for row in rows} == {"Eldoret"}
+
+    res = client.get("/admin/parcels/export?format=csv&location=eldoret", headers=headers)
+    assert res.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(res.get_data(as_text=True))))
+    assert len(rows) == 3
+    assert rows[0]["status"] == "Export In Transit"
+    # Filter values are matched literally, not as LIKE patterns
+    assert client.get("/admin/parcels/export?location=%", headers=headers).get_data(as_text=True) == ""
+
+    res = client.get("/admin/parcels/export?format=xml", headers=headers)
+    assert res.status_code == 400
+
+def test_admin_required_uses_role_claims_and_sees_demotion(client, auth_headers):
+    from app import db
+    from app.models.user import User
+
+    boss = User(name="Claims Admin", email="claims-admin@example.com", password_hash="x", role="admin")
+    deputy = User(name="Claims Deputy", email="claims-deputy@example.com", password_hash="x", role="admin")
+    db.session.add_all([boss, deputy])
+    db.session.commit()
+
+    boss_headers, deputy_headers = auth_headers(boss), auth_headers(deputy)
+    assert client.get("/admin/users", headers=deputy_headers).status_code == 200
+
+    res = client.post("/admin/assign-role", json={"user_id": deputy.id, "role": "user"}, headers=boss_headers)
+    assert res.status_code == 200
+
+    # The deputy's token still claims admin, but the demotion is visible at once.
+    assert client.get("/admin/users", headers=deputy_headers).status_code == 403
+    assert client.get("/admin/users", headers=auth_headers(deputy)).status_code == 403
+
+def test_bulk_update_uses_constant_round_trips(client, auth_headers):
+    from sqlalchemy import event
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+    from app.models.user import User
+    from app.utils.reference_cache import reference_cache
+
+    admin = User(name="Bulk Admin", email="bulk-admin@example.com", password_hash="x", role="admin")
+    hub = Location(city="Thika", address="Garissa Road")
+    sorting = Location(city="Machakos", address="Mwatu wa Ngoma Road")
+    transit = Status(name="In Transit")
+    db.session.add_all([admin, hub, sorting, transit])
+    db.session.commit()
+    parcels = [
+        Parcel(description=f"Bulk {i}", user_id=admin.id, origin_id=hub.id, destination_id=hub.id,
+               present_location_id=hub.id, status_id=transit.id)
+        for i in range(400)
+    ]
+    db.session.add_all(parcels)
+    db.session.commit()
+    ids = [parcel.id for parcel in parcels]
+
+    headers = auth_headers(admin)
+
+    def run(entries):
+        db.session.expire_all()
+        reference_cache.warm()
+        statements = []
+        record = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            res = client.patch("/admin/parcels/bulk-update", json=entries, headers=headers)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        return res, len(statements)
+
+    entry = lambda parcel_id: {"parcel_id": parcel_id, "status": "In Transit", "current_location": "Machakos"}
+    small, small_count = run([entry(i) for i in ids[:20]])
+    large, large_count = run([entry(i) for i in ids[20:]] + [entry(-1)])
+
+    assert small.status_code == large.status_code == 200
+    assert small_count == large_count
+    results = large.get_json()["results"]
+    assert len(results) == 381
+    assert results[-1] == {"parcel_id": -1, "status": "failed", "message": "Parcel not found."}
+    db.session.expire_all()
+    assert {p.present_location_id for p in Parcel.query.filter(Parcel.id.in_(ids))} == {sorting.id}
+
+def test_stats_counters_follow_parcel_writes_and_reconcile(client, pending_status):
+    from sqlalchemy import func, select, update
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.parcel_counter import ParcelCounter
+    from app.models.status import Status
+    from app.models.user import User
+    from app.utils.parcel_counters import reconcile_parcel_counters
+
+    headers = {"Authorization": f"Bearer {make_admin_token('stats-admin@example.com')}"}
+    owner = User(name="Stats Owner", email="stats-owner@example.com", password_hash="x")
+    nyeri = Location(city="Nyeri", address="Kimathi Way")
+    isiolo = Location(city="Isiolo", address="Hospital Road")
+    cancelled = Status.query.filter_by(name="Cancelled").first() or Status(name="Cancelled")
+    db.session.add_all([owner, nyeri, isiolo, cancelled])
+    db.session.commit()
+    reconcile_parcel_counters()
+
+    parcels = [
+        Parcel(description=f"Stats {i}", user_id=owner.id, origin_id=nyeri.id, destination_id=isiolo.id,
+               present_location_id=nyeri.id, status_id=pending_status.id)
+        for i in range(6)
+    ]
+    db.session.add_all(parcels)
+    db.session.commit()
+    parcels[0].status_id = cancelled.id
+    parcels[1].is_deleted = True
+    db.session.delete(parcels[2])
+    db.session.commit()
+    res = client.patch("/admin/parcels/bulk-update", headers=headers, json=[
+        {"parcel_id": parcels[3].id, "current_location": "Isiolo"},
+        {"parcel_id": parcels[4].id, "status": "Cancelled", "current_location": "Isiolo"},
+    ])
+    assert res.status_code == 200
+
+    stats = client.get("/admin/stats", headers=headers).get_json()
+    by_location = {row["location"]: row["count"] for row in stats["by_location"]}
+    assert (by_location["Nyeri"], by_location["Isiolo"]) == (2, 2)
+    live = Parcel.is_deleted == False  # noqa: E712
+    exact_by_status = dict(db.session.execute(
+        select(Parcel.status_id, func.count()).where(live).group_by(Parcel.status_id)).all())
+    assert {row["status_id"]: row["count"] for row in stats["by_status"]} == exact_by_status
+    assert stats["total"] == sum(exact_by_status.values())
+    assert reconcile_parcel_counters() == {}
+
+    db.session.execute(update(ParcelCounter).where(
+        ParcelCounter.dimension == "location", ParcelCounter.bucket == str(nyeri.id)).values(count=99))
+    db.session.commit()
+    assert reconcile_parcel_counters() == {("location", str(nyeri.id)): (99, 2)}
+
+def test_soft_deleted_rows_are_hidden_and_purged(client, pending_status):
+    from datetime import datetime, timedelta
+    from sqlalchemy import update
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.parcel_event import ParcelEvent
+    from app.models.user import User
+    from app.utils.parcel_counters import reconcile_parcel_counters
+    from app.utils.soft_delete import include_deleted, purge_soft_deleted
+
+    headers = {"Authorization": f"Bearer {make_admin_token('purge-admin@example.com')}"}
+    owner = User(name="Purge Owner", email="purge-owner@example.com", password_hash="x")
+    leaver = User(name="Purge Leaver", email="purge-leaver@example.com", password_hash="x")
+    kericho = Location(city="Kericho", address="Moi Highway")
+    kisii = Location(city="Kisii", address="Hospital Road")
+    db.session.add_all([owner, leaver, kericho, kisii])
+    db.session.commit()
+    kept, dropped = [
+        Parcel(description=f"Purge {i}", user_id=owner.id, origin_id=kericho.id, destination_id=kisii.id,
+               present_location_id=kericho.id, status_id=pending_status.id)
+        for i in range(2)
+    ]
+    db.session.add_all([kept, dropped])
+    db.session.commit()
+
+    dropped.is_deleted = owner.is_deleted = leaver.is_deleted = True
+    db.session.commit()
+    assert dropped.deleted_at is not None
+    kept_id, dropped_id, owner_id, leaver_id = kept.id, dropped.id, owner.id, leaver.id
+    db.session.expunge_all()
+
+    # Deleted rows are left out of every query unless asked for
+    assert [p.id for p in Parcel.query.filter_by(user_id=owner_id)] == [kept_id]
+    assert {p.id for p in include_deleted(Parcel.query.filter_by(user_id=owner_id))} == {kept_id, dropped_id}
+    assert client.get(f"/parcels/{dropped_id}", headers=headers).status_code == 404
+    listed = client.get("/admin/parcels?include_deleted=true&limit=100", headers=headers).get_json()["parcels"]
+    assert dropped_id in {p["id"] for p in listed}
+    emails = {u["email"] for u in client.get("/admin/users", headers=headers).get_json()}
+    assert "purge-leaver@example.com" not in emails
+    emails = {u["email"] for u in client.get("/admin/users?include_deleted=true", headers=headers).get_json()}
+    assert "purge-leaver@example.com" in emails
+
+    # Only rows dead for longer than the retention period go
+    assert purge_soft_deleted(older_than_days=30) == {"parcels": 0, "users": 0}
+    long_ago = datetime.utcnow() - timedelta(days=31)
+    for model in (Parcel, User):
+        db.session.execute(include_deleted(
+            update(model).where(model.is_deleted.is_(True)).values(deleted_at=long_ago)
+        ))
+    db.session.commit()
+    purged = purge_soft_deleted(older_than_days=30, batch_size=1)
+    assert purged["parcels"] >= 1 and purged["users"] >= 1
+
+    assert include_deleted(Parcel.query).get(dropped_id) is None
+    assert ParcelEvent.query.filter_by(parcel_id=dropped_id).count() == 0
+    assert include_deleted(User.query).get(leaver_id) is None
+    # Still owns a live parcel, so only hidden
+    assert include_deleted(User.query).get(owner_id) is not None
+    assert reconcile_parcel_counters() == {}
+
+def test_admin_search_ranks_live_matches_per_type(client, pending_status):
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.user import User
+
+    headers = {"Authorization": f"Bearer {make_admin_token('search-admin@example.com')}"}
+    owner = User(name="Wanjiru Search", email="wanjiru.search@example.com", password_hash="x")
+    kakamega = Location(city="Kakamega", address="Canon Awori Street")
+    db.session.add_all([owner, kakamega])
+    db.session.commit()
+    teapot, mugs, hidden = [
+        Parcel(description=description, user_id=owner.id, origin_id=kakamega.id, destination_id=kakamega.id,
+               present_location_id=kakamega.id, status_id=pending_status.id)
+        for description in ("Ceramic teapot", "Enamel mugs", "Teapot spare lid")
+    ]
+    db.session.add_all([teapot, mugs, hidden])
+    db.session.commit()
+    hidden.is_deleted = True
+    mugs.description = "Enamel mugs and a teapot"
+    db.session.commit()
+
+    res = client.get("/admin/search?q=teapot", headers=headers)
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+    assert {item["id"] for item in results["parcels"]["items"]} == {teapot.id, mugs.id}
+    assert all(item["description"] and "score" in item for item in results["parcels"]["items"])
+
+    res = client.get("/admin/search?q=wanjiru&type=users", headers=headers)
+    assert list(res.get_json()["results"]) == ["users"]
+    assert [item["email"] for item in res.get_json()["results"]["users"]["items"]] == ["wanjiru.search@example.com"]
+
+    res = client.get("/admin/search?q=awori&type=locations&limit=1", headers=headers)
+    assert [item["city"] for item in res.get_json()["results"]["locations"]["items"]] == ["Kakamega"]
+
+    page = client.get("/admin/search?q=teapot&type=parcels&limit=1", headers=headers).get_json()
+    assert len(page["results"]["parcels"]["items"]) == 1 and page["results"]["parcels"]["has_more"]
+
+    assert client.get("/admin/search?q=te", headers=headers).status_code == 400
+    assert client.get("/admin/search?q=teapot&type=statuses", headers=headers).status_code == 400
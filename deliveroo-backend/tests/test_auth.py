@@ -27,3 +27,95 @@ def test_login_user(client):
     assert response.status_code == 200
     data = response.get_json()
     assert "access_token" in data
+
+def test_login_upgrades_hash_made_with_old_parameters(client, app):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models.user import User
+
+    user = User(
+        name="Legacy Hash",
+        email="legacy@example.com",
+        password_hash=generate_password_hash("password123", method="pbkdf2:sha256:1000"),
+    )
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.post("/auth/login", json={
+        "email": "legacy@example.com",
+        "password": "password123"
+    })
+    assert response.status_code == 200
+
+    db.session.refresh(user)
+    assert user.password_hash.startswith(app.config["PASSWORD_HASH_METHOD"] + "$")
+    assert user.check_password("password123")
+
+    # A method given without its parameters matches the hashes werkzeug writes for it
+    from app.utils.password_hashing import needs_rehash
+    method = app.config["PASSWORD_HASH_METHOD"]
+    try:
+        for short in ("scrypt", "pbkdf2:sha256"):
+            app.config["PASSWORD_HASH_METHOD"] = short
+            assert not needs_rehash(generate_password_hash("password123", method=short))
+        assert needs_rehash(generate_password_hash("password123", method="pbkdf2:sha256:1000"))
+    finally:
+        app.config["PASSWORD_HASH_METHOD"] = method
+
+def test_login_is_rate_limited_per_account_and_ip(app, client, auth_headers):
+    from app import db
+    from app.models.user import User
+    from app.utils.rate_limit import get_store
+
+    limits = app.config["RATE_LIMITS"]
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMITS={
+        "auth_bp": ["ip 5/minute", "account 2/minute"],
+        "parcel_bp": ["account 2/minute"],
+    })
+    get_store().clear()
+    try:
+        def login(email):
+            return client.post("/auth/login", json={"email": email, "password": "wrong"})
+
+        assert [login("stuffed@example.com").status_code for _ in range(3)] == [401, 401, 429]
+        limited = login("stuffed@example.com")
+        assert limited.status_code == 429
+        assert 1 <= int(limited.headers["Retry-After"]) <= 30
+
+        # Other accounts from the same address run into the per-IP bucket
+        assert [login(f"other{n}@example.com").status_code for n in range(2)] == [401, 429]
+        # Reads are not limited
+        assert client.get("/auth/profile").status_code != 429
+
+        # Outside login/register the account is the token's user, whatever email the body names
+        sender = User(name="Limited Sender", email="limited-sender@example.com", password_hash="x")
+        db.session.add(sender)
+        db.session.commit()
+        statuses = [
+            client.post("/parcels", json={"email": f"fresh{n}@example.com"}, headers=auth_headers(sender)).status_code
+            for n in range(3)
+        ]
+        assert 429 not in statuses[:2] and statuses[2] == 429
+    finally:
+        app.config.update(RATE_LIMIT_ENABLED=False, RATE_LIMITS=limits)
+        get_store().clear()
+
+def test_proxy_fix_gives_each_forwarded_client_its_own_address():
+    from flask import request
+    from app import create_app
+    from app.config import Config
+
+    def remote_addrs(proxies):
+        class ProxyConfig(Config):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+            PROXY_FIX_X_FOR = proxies
+
+        app = create_app(ProxyConfig)
+        app.add_url_rule("/whoami", "whoami", lambda: request.remote_addr)
+        client = app.test_client()
+        return [client.get("/whoami", headers={"X-Forwarded-For": ip}).get_data(as_text=True)
+                for ip in ("203.0.113.7", "198.51.100.9")]
+
+    assert remote_addrs(1) == ["203.0.113.7", "198.51.100.9"]
+    # Unless told to trust a proxy, the header is ignored
+    assert remote_addrs(0) == ["127.0.0.1", "127.0.0.1"]
@@ -0,0 +1,86 @@
+import json
+
+def test_send_route_only_queues(client):
+    from app.models.email_outbox import EmailOutbox
+
+    res = client.post("/email/send", json={
+        "to_email": "customer@example.com",
+        "subject": "Parcel update",
+        "content": "Your parcel is in transit."
+    })
+    assert res.status_code == 202
+    email = EmailOutbox.query.get(res.get_json()["id"])
+    assert email.status == "pending"
+    assert email.attempts == 0
+
+def test_outbox_worker_sends_batch_and_backs_off(app, tmp_path):
+    from datetime import datetime
+    from app import db
+    from app.models.email_outbox import EmailOutbox
+    from app.utils.email_outbox import process_outbox_batch
+    from app.utils.email_utils import FileBackend, queue_email
+
+    EmailOutbox.query.delete()
+    db.session.commit()
+    for i in range(3):
+        queue_email(f"user{i}@example.com", "Delivered", f"Parcel {i} delivered.")
+
+    outbox_file = tmp_path / "sent.jsonl"
+    assert process_outbox_batch(backend=FileBackend(str(outbox_file))) == 3
+    sent = [json.loads(line) for line in outbox_file.read_text().splitlines()]
+    assert [m["to_email"] for m in sent] == ["user0@example.com", "user1@example.com", "user2@example.com"]
+    assert {e.status for e in EmailOutbox.query.all()} == {"sent"}
+
+    class BrokenBackend:
+        def send(self, to_email, subject, content):
+            raise RuntimeError("provider down")
+
+    failing = queue_email("late@example.com", "Delayed", "Sorry.")
+    assert process_outbox_batch(backend=BrokenBackend()) == 1
+    db.session.refresh(failing)
+    assert failing.status == "pending"
+    assert failing.attempts == 1
+    assert failing.last_error == "provider down"
+    assert failing.next_attempt_at > datetime.utcnow()
+
+    # Not due yet, so nothing is claimed until the backoff has passed
+    assert process_outbox_batch(backend=BrokenBackend()) == 0
+
+def test_outbox_claims_count_as_attempts_and_stale_results_are_dropped(app):
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models.email_outbox import EmailOutbox
+    from app.utils.email_outbox import claim_batch, process_outbox_batch
+    from app.utils.email_utils import queue_email
+
+    EmailOutbox.query.delete()
+    db.session.commit()
+    crashing = queue_email("crash@example.com", "Crash", "Takes the worker down.")
+
+    def expire_lease():
+        EmailOutbox.query.filter_by(id=crashing.id).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+
+    # Each claim by a worker that then dies uses up an attempt
+    for attempt in range(1, 3):
+        token, batch = claim_batch(10, 300, max_attempts=2)
+        assert [email["attempts"] for email in batch] == [attempt]
+        expire_lease()
+    assert claim_batch(10, 300, max_attempts=2)[1] == []
+    db.session.refresh(crashing)
+    assert (crashing.status, crashing.attempts) == ("failed", 2)
+
+    # A worker slower than its lease loses the row to another and must not record over it
+    slow = queue_email("slow@example.com", "Slow", "Sent late.")
+    takeovers = []
+
+    class SlowBackend:
+        def send(self, to_email, subject, content):
+            EmailOutbox.query.filter_by(id=slow.id).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+            takeovers.append(claim_batch(10, 300, max_attempts=5)[0])
+
+    assert process_outbox_batch(backend=SlowBackend()) == 1
+    db.session.refresh(slow)
+    assert (slow.status, slow.attempts, slow.sent_at) == ("sending", 2, None)
+    assert slow.claim_token == takeovers[0]
@@ -37,3 +37,446 @@ def test_create_parcel(client):
     assert response.status_code == 201
     data = response.get_json()
     assert data["description"] == "Books"
+
+def count_listing_statements(user_id):
+    from sqlalchemy import event
+    from app import db
+    from app.queries.parcel_queries import parcel_listing_query
+    from app.utils.reference_cache import reference_cache
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expire_all()
+    reference_cache.warm()
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        parcels = parcel_listing_query(user_id=user_id).all()
+        [parcel.to_dict() for parcel in parcels]
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return len(parcels), len(statements)
+
+def test_parcel_listing_statement_count_is_constant(app):
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+    from app.models.user import User
+
+    small = User(name="Small Sender", email="small@example.com", password_hash="x")
+    large = User(name="Large Sender", email="large@example.com", password_hash="x")
+    locations = [Location(city=f"City {i}", address=f"Street {i}") for i in range(6)]
+    status = Status(name="Listing Pending")
+    db.session.add_all([small, large, status, *locations])
+    db.session.commit()
+
+    def make_parcels(user, count):
+        return [
+            Parcel(
+                description=f"Parcel {i}",
+                user_id=user.id,
+                origin_id=locations[i % 6].id,
+                destination_id=locations[(i + 1) % 6].id,
+                present_location_id=locations[(i + 2) % 6].id,
+                status_id=status.id,
+            )
+            for i in range(count)
+        ]
+
+    db.session.add_all(make_parcels(small, 2) + make_parcels(large, 60))
+    db.session.commit()
+
+    small_rows, small_statements = count_listing_statements(small.id)
+    large_rows, large_statements = count_listing_statements(large.id)
+
+    assert (small_rows, large_rows) == (2, 60)
+    assert small_statements == large_statements == 1
+
+def test_keyset_pagination_walks_every_parcel_once(app):
+    import pytest
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+    from app.models.user import User
+    from app.queries.parcel_queries import parcel_listing_query
+    from app.utils.pagination import keyset_paginate, InvalidCursor
+
+    user = User(name="Paging Sender", email="paging@example.com", password_hash="x")
+    location = Location(city="Nakuru", address="Kenyatta Lane")
+    status = Status(name="Paging Pending")
+    db.session.add_all([user, location, status])
+    db.session.commit()
+
+    # Several parcels share a created_at so the id tie-breaker is exercised.
+    start = datetime(2024, 1, 1)
+    db.session.add_all([
+        Parcel(
+            description=f"Paged {i}",
+            user_id=user.id,
+            origin_id=location.id,
+            destination_id=location.id,
+            present_location_id=location.id,
+            status_id=status.id,
+            created_at=start + timedelta(minutes=i // 3),
+        )
+        for i in range(25)
+    ])
+    db.session.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        items, cursor = keyset_paginate(parcel_listing_query(user_id=user.id), Parcel, cursor=cursor, limit=10)
+        seen.extend(parcel.id for parcel in items)
+        pages += 1
+        if cursor is None:
+            break
+
+    expected = [p.id for p in Parcel.query.filter_by(user_id=user.id)
+                .order_by(Parcel.created_at.desc(), Parcel.id.desc())]
+    assert pages == 3
+    assert seen == expected
+
+    with pytest.raises(InvalidCursor):
+        keyset_paginate(parcel_listing_query(user_id=user.id), Parcel, cursor="not-a-cursor")
+
+def test_reference_cache_reloads_after_location_write(app):
+    from app import db
+    from app.models.location import Location
+    from app.utils.reference_cache import reference_cache
+
+    reference_cache.warm()
+    version = reference_cache.version
+
+    garissa = Location(city="Garissa", address="Kismayu Road")
+    db.session.add(garissa)
+    db.session.commit()
+
+    assert reference_cache.location(garissa.id)["city"] == "Garissa"
+    assert reference_cache.locations_by_city("Garissa")[0]["id"] == garissa.id
+    assert reference_cache.version == version + 1
+
+def test_parcel_events_record_every_move(client, auth_headers):
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+    from app.models.user import User
+
+    admin = User(name="Timeline Admin", email="timeline-admin@example.com", password_hash="x", role="admin")
+    owner = User(name="Timeline Owner", email="timeline-owner@example.com", password_hash="x")
+    nakuru = Location(city="Nakuru", address="Kenyatta Lane")
+    naivasha = Location(city="Naivasha", address="Moi South Lake Road")
+    booked = Status(name="Timeline Booked")
+    arrived = Status.query.filter_by(name="Delivered").first() or Status(name="Delivered")
+    db.session.add_all([admin, owner, nakuru, naivasha, booked, arrived])
+    db.session.commit()
+    parcel = Parcel(description="Timeline", user_id=owner.id, origin_id=nakuru.id, destination_id=naivasha.id,
+                    present_location_id=nakuru.id, status_id=booked.id)
+    db.session.add(parcel)
+    db.session.commit()
+
+    admin_headers, owner_headers = auth_headers(admin), auth_headers(owner)
+
+    res = client.patch(f"/admin/parcels/{parcel.id}", json={"present_location": naivasha.id}, headers=admin_headers)
+    assert res.status_code == 200
+    res = client.patch("/admin/parcels/bulk-update", json=[{"parcel_id": parcel.id, "status": "Delivered"}],
+                       headers=admin_headers)
+    assert res.status_code == 200
+
+    res = client.get(f"/parcels/{parcel.id}/events", headers=owner_headers)
+    assert res.status_code == 200
+    data = res.get_json()
+    assert [(e["status"], e["location"], e["actor_id"]) for e in data["events"]] == [
+        ("Timeline Booked", "Nakuru", None),
+        (None, "Naivasha", admin.id),
+        ("Delivered", None, admin.id),
+    ]
+    assert data["parcel"]["status"] == "Delivered"
+    assert data["parcel"]["present_location"] == "Naivasha"
+
+def test_parcel_stream_pushes_committed_changes(app, client, auth_headers):
+    import json
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+    from app.models.user import User
+    from app.utils.pubsub import get_broker
+
+    owner = User(name="Stream Owner", email="stream-owner@example.com", password_hash="x")
+    kitale = Location(city="Kitale", address="Kenyatta Street")
+    eldoret = Location(city="Eldoret", address="Uganda Road")
+    booked = Status(name="Stream Booked")
+    db.session.add_all([owner, kitale, eldoret, booked])
+    db.session.commit()
+    parcel = Parcel(description="Streamed", user_id=owner.id, origin_id=kitale.id, destination_id=eldoret.id,
+                    present_location_id=kitale.id, status_id=booked.id)
+    db.session.add(parcel)
+    db.session.commit()
+    # EventSource can't send headers, so a short-lived stream token travels in the query string
+    access_token = auth_headers(owner)["Authorization"].split(" ", 1)[1]
+    assert client.get(f"/parcels/{parcel.id}/stream?jwt={access_token}").status_code == 401
+    issued = client.post("/parcels/stream-token", headers=auth_headers(owner))
+    assert issued.status_code == 200
+    token = issued.get_json()["stream_token"]
+    # ...which opens streams and nothing else
+    assert client.get(f"/parcels/{parcel.id}", headers={"Authorization": f"Bearer {token}"}).status_code == 400
+
+    app.config["SSE_HEARTBEAT_SECONDS"] = 1
+    try:
+        res = client.get(f"/parcels/{parcel.id}/stream?jwt={token}", buffered=False)
+        assert res.status_code == 200
+        assert res.mimetype == "text/event-stream"
+        chunks = iter(res.response)
+        assert next(chunks).startswith(b"retry:")
+        assert b"event: snapshot" in next(chunks)
+
+        parcel.present_location_id = eldoret.id
+        db.session.commit()
+        pushed = next(chunks).decode()
+        assert pushed.startswith("event: parcel\nid: ")
+        message = json.loads(pushed.split("data: ", 1)[1])
+        assert (message["parcel_id"], message["location"], message["status"]) == (parcel.id, "Eldoret", None)
+
+        res.close()
+        assert get_broker().subscription_count() == 0
+    finally:
+        app.config["SSE_HEARTBEAT_SECONDS"] = 15
+
+def test_conditional_get_answers_304_until_the_parcel_changes(client, auth_headers):
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.status import Status
+    from app.models.user import User
+
+    owner = User(name="Etag Owner", email="etag-owner@example.com", password_hash="x")
+    meru = Location(city="Meru", address="Njuri Ncheke Street")
+    embu = Location(city="Embu", address="Kenyatta Highway")
+    booked = Status(name="Etag Booked")
+    db.session.add_all([owner, meru, embu, booked])
+    db.session.commit()
+    parcel = Parcel(description="Etag", user_id=owner.id, origin_id=meru.id, destination_id=embu.id,
+                    present_location_id=meru.id, status_id=booked.id)
+    db.session.add(parcel)
+    db.session.commit()
+    headers = auth_headers(owner)
+
+    for url in (f"/parcels/{parcel.id}", "/parcels"):
+        first = client.get(url, headers=headers)
+        assert first.status_code == 200
+        assert first.headers["ETag"] and first.headers["Last-Modified"]
+
+        cached = client.get(url, headers={**headers, "If-None-Match": first.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.data == b""
+        assert cached.headers["ETag"] == first.headers["ETag"]
+
+    etags = {url: client.get(url, headers=headers).headers["ETag"] for url in (f"/parcels/{parcel.id}", "/parcels")}
+    parcel.present_location_id = embu.id
+    db.session.commit()
+    for url, etag in etags.items():
+        res = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
+
+def test_projection_matches_to_dict_and_orjson_matches_stdlib(app):
+    from datetime import datetime
+    from flask.json.provider import DefaultJSONProvider
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel, parcel_projection
+    from app.models.status import Status
+    from app.models.user import User, user_projection
+
+    owner = User(name="Projected Owner", email="projected@example.com", password_hash="x")
+    lamu = Location(city="Lamu", address="Harambee Avenue")
+    booked = Status(name="Projected Booked")
+    db.session.add_all([owner, lamu, booked])
+    db.session.commit()
+    parcel = Parcel(description="Projected", user_id=owner.id, origin_id=lamu.id, destination_id=lamu.id,
+                    present_location_id=lamu.id, status_id=booked.id)
+    db.session.add(parcel)
+    db.session.commit()
+
+    row = db.session.execute(db.select(*parcel_projection.columns).where(Parcel.id == parcel.id)).one()
+    assert parcel_projection.to_dict(row) == parcel.to_dict()
+    row = db.session.execute(db.select(*user_projection.columns).where(User.id == owner.id)).one()
+    assert user_projection.to_dict(row) == owner.to_dict()
+
+    payload = {"parcels": [parcel.to_dict()], "when": datetime(2026, 1, 2, 3, 4, 5), "count": 1}
+    stdlib = DefaultJSONProvider(app)
+    assert app.json.loads(app.json.dumps(payload)) == stdlib.loads(stdlib.dumps(payload))
+    assert app.json.dumps(payload, separators=(",", ":")) == stdlib.dumps(payload, separators=(",", ":"))
+
+def test_sql_profiler_reports_queries_and_flags_lazy_loads(app, client, query_budget, auth_headers):
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.parcel_event import ParcelEvent
+    from app.models.status import Status
+    from app.models.user import User
+    from app.utils.sql_profiler import capture_queries
+
+    owner = User(name="Profiled Owner", email="profiled@example.com", password_hash="x")
+    admin = User(name="Profiled Admin", email="profiled-admin@example.com", password_hash="x", role="admin")
+    voi = Location(city="Voi", address="Mombasa Road")
+    booked = Status(name="Profiled Booked")
+    db.session.add_all([owner, admin, voi, booked])
+    db.session.commit()
+    db.session.add_all([
+        Parcel(description=f"Profiled {n}", user_id=owner.id, origin_id=voi.id, destination_id=voi.id,
+               present_location_id=voi.id, status_id=booked.id)
+        for n in range(6)
+    ])
+    db.session.commit()
+
+    app.config["SQL_PROFILER_ENABLED"] = True
+    try:
+        with query_budget(4):
+            res = client.get("/parcels?limit=20&jwt=not-for-the-log", headers=auth_headers(owner))
+        assert res.status_code == 200
+        assert 0 < int(res.headers["X-DB-Query-Count"]) <= 4
+        assert res.headers["X-DB-Repeated-Queries"] == "0"
+
+        recent = client.get("/debug/queries", headers=auth_headers(admin)).get_json()["requests"]
+        assert recent[0]["path"] == "/parcels"
+        assert recent[0]["count"] == int(res.headers["X-DB-Query-Count"])
+    finally:
+        app.config["SQL_PROFILER_ENABLED"] = False
+    assert client.get("/debug/queries", headers=auth_headers(admin)).status_code == 404
+
+    # One relationship lazy load per row is reported as a single repeated shape
+    parcel_ids = [parcel.id for parcel in Parcel.query.filter_by(user_id=owner.id)]
+    db.session.expunge_all()
+    with capture_queries(repeat_threshold=5) as profile:
+        for event in ParcelEvent.query.filter(ParcelEvent.parcel_id.in_(parcel_ids)).all():
+            event.parcel.description
+    assert [entry["count"] for entry in profile.repeated] == [6]
+
+def test_parcel_import_streams_rows_and_reports_errors(app, client, auth_headers, pending_status):
+    import io
+    import json
+    from app import db
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.parcel_event import ParcelEvent
+    from app.models.user import User
+    from app.utils.parcel_counters import parcel_counts
+    from app.utils.reference_cache import reference_cache
+
+    merchant = User(name="Import Merchant", email="import-merchant@example.com", password_hash="x")
+    kapenguria = Location(city="Kapenguria", address="Makutano Road")
+    lodwar = Location(city="Lodwar", address="Kakuma Road")
+    db.session.add_all([merchant, kapenguria, lodwar])
+    db.session.commit()
+    headers = auth_headers(merchant)
+    before = parcel_counts()["location"].get(kapenguria.id, 0)
+
+    app.config["PARCEL_IMPORT_CHUNK_SIZE"] = 2
+    try:
+        upload = (
+            "description,origin,destination_id,status,reference\n"
+            f"Shoes,Kapenguria,{lodwar.id},,A1\n"
+            f"Books,Nowhere,{lodwar.id},,A2\n"
+            f",Kapenguria,{lodwar.id},,A3\n"
+            f"Lamp,Kapenguria,{lodwar.id},Pending,A4\n"
+        )
+        res = client.post("/parcels/import", headers=headers, content_type="multipart/form-data",
+                          data={"file": (io.BytesIO(upload.encode()), "parcels.csv")})
+        assert res.status_code == 200
+        report = res.get_json()
+        assert (report["imported"], report["failed"]) == (2, 2)
+        assert [error["line"] for error in report["errors"]] == [3, 4]
+        assert "origin_id" in report["errors"][0]["errors"]
+        assert "description" in report["errors"][1]["errors"]
+
+        lines = [json.dumps({"description": "Radio", "origin_id": kapenguria.id, "destination": "Lodwar"}), "", "{oops"]
+        res = client.post("/parcels/import?format=ndjson", headers=headers, data="\n".join(lines))
+        assert res.get_json()["imported"] == 1
+        assert res.get_json()["errors"] == [{"line": 3, "errors": {"_row": ["Invalid JSON."]}}]
+    finally:
+        app.config["PARCEL_IMPORT_CHUNK_SIZE"] = 5000
+
+    parcels = Parcel.query.filter_by(user_id=merchant.id).order_by(Parcel.id).all()
+    assert [parcel.description for parcel in parcels] == ["Shoes", "Lamp", "Radio"]
+    pending_id = reference_cache.status_by_name("Pending")["id"]
+    assert all(parcel.present_location_id == kapenguria.id and parcel.status_id == pending_id for parcel in parcels)
+    assert ParcelEvent.query.filter(ParcelEvent.parcel_id.in_([p.id for p in parcels])).count() == 3
+    assert parcel_counts()["location"][kapenguria.id] == before + 3
+    assert client.post("/parcels/import", headers=headers, data="x").status_code == 400
+
+def test_idempotency_key_replays_parcel_creation(app, client, auth_headers, pending_status):
+    import hashlib
+    import json
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models.idempotency_key import IdempotencyKey
+    from app.models.location import Location
+    from app.models.parcel import Parcel
+    from app.models.user import User
+    from app.utils.idempotency import response_cache
+
+    sender = User(name="Retrying Sender", email="retrying@example.com", password_hash="x")
+    kitui = Location(city="Kitui", address="Kitui Road")
+    db.session.add_all([sender, kitui])
+    db.session.commit()
+    headers = auth_headers(sender)
+
+    def post(key, description):
+        body = json.dumps({"description": description, "origin_id": kitui.id, "destination_id": kitui.id})
+        return client.post("/parcels", data=body, content_type="application/json",
+                           headers={**headers, "Idempotency-Key": key})
+
+    first = post("retry-1", "Umbrella")
+    assert first.status_code == 201
+    replayed = post("retry-1", "Umbrella")
+    assert replayed.status_code == 201
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.get_json() == first.get_json()
+    response_cache.clear()  # the stored row answers too
+    assert post("retry-1", "Umbrella").get_json() == first.get_json()
+    assert post("retry-1", "Raincoat").status_code == 422
+    assert Parcel.query.filter_by(user_id=sender.id).count() == 1
+
+    # A claim held by a request still running elsewhere holds duplicates back...
+    body = json.dumps({"description": "Kettle", "origin_id": kitui.id, "destination_id": kitui.id})
+    now = datetime.utcnow()
+    db.session.add(IdempotencyKey(
+        user_id=sender.id, key="retry-2", fingerprint=hashlib.sha256(f"POST /parcels?\n{body}".encode()).hexdigest(),
+        locked_until=now + timedelta(minutes=1), expires_at=now + timedelta(days=1),
+    ))
+    db.session.commit()
+    app.config["IDEMPOTENCY_WAIT_SECONDS"] = 0.1
+    try:
+        busy = post("retry-2", "Kettle")
+    finally:
+        app.config["IDEMPOTENCY_WAIT_SECONDS"] = 5
+    assert busy.status_code == 409 and busy.headers["Retry-After"]
+
+    # ...until its lock lapses, when a retry takes the key over
+    IdempotencyKey.query.filter_by(key="retry-2").update({"locked_until": now - timedelta(seconds=1)})
+    db.session.commit()
+    assert post("retry-2", "Kettle").status_code == 201
+    assert Parcel.query.filter_by(user_id=sender.id).count() == 2
+
+    # A handler that outlived its claim cannot complete or release its successor's
+    from flask import Response
+    from app.utils.idempotency import claim_key, complete_key, release_key
+
+    stale, _ = claim_key(sender.id, "retry-3", "f" * 64)
+    IdempotencyKey.query.filter_by(key="retry-3").update({"locked_until": now - timedelta(seconds=1)})
+    db.session.commit()
+    current, _ = claim_key(sender.id, "retry-3", "f" * 64)
+    assert current not in (None, stale)
+    assert complete_key(sender.id, "retry-3", stale, Response("late", status=201)) is None
+    release_key(sender.id, "retry-3", stale)
+    db.session.expire_all()
+    row = IdempotencyKey.query.filter_by(key="retry-3").one()
+    assert (row.claim_token, row.status_code) == (current, None)
+    assert complete_key(sender.id, "retry-3", current, Response("done", status=201)).status_code == 201
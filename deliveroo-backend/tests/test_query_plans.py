@@ -0,0 +1,12 @@
+def test_hot_queries_avoid_sequential_scans(app):
+    from app.utils.query_plan import check_hot_queries
+
+    assert check_hot_queries() == {}
+
+def test_sequential_scan_is_reported(app):
+    from app.models.parcel import Parcel
+    from app.utils.query_plan import sequential_scans
+    from app.utils.soft_delete import include_deleted
+
+    # description has no index, so with deleted rows included this has to read the whole table
+    assert sequential_scans(include_deleted(Parcel.query.filter(Parcel.description == "Books"))) == ["parcels"]
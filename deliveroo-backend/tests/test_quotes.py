@@ -0,0 +1,65 @@
+def test_batch_quotes_match_frontend_tariff(client):
+    rows = [
+        {"weight": 0.5, "origin_id": 1, "destination_id": 2, "urgency": "standard", "distance_km": 10},
+        {"weight": 3, "origin_id": 1, "destination_id": 2, "urgency": "express", "distance_km": 10},
+        {"weight": 20, "origin_id": 2, "destination_id": 3, "urgency": "urgent", "distance_km": 4},
+        {"weight": 0.5, "origin_id": 1, "destination_id": 2, "urgency": "standard", "distance_km": 10},
+        {"weight": -1, "origin_id": 1, "destination_id": 2},
+    ]
+    res = client.post("/quotes", json={"quotes": rows})
+    assert res.status_code == 200
+    data = res.get_json()
+
+    # (base + km * 0.5) * urgency multiplier
+    assert [q["price"] for q in data["quotes"]] == [10.0, 22.5, 74.0, 10.0]
+    assert [q["weight_category"] for q in data["quotes"]] == ["light", "medium", "extra-heavy", "light"]
+    assert [e["index"] for e in data["errors"]] == [4]
+
+def test_quote_cache_prices_repeated_combinations_once(app):
+    from unittest import mock
+    from app.utils import pricing
+
+    pricing.quote_cache.clear()
+    args = ([1] * 500, [2] * 500, [2.0] * 500, [0] * 500, [12.0] * 500)
+    with mock.patch.object(pricing, "compute_prices", wraps=pricing.compute_prices) as compute:
+        first, _ = pricing.price_quotes(*args)
+        second, _ = pricing.price_quotes(*args)
+
+    assert compute.call_count == 1
+    assert len(compute.call_args[0][0]) == 1
+    assert set(first.tolist()) == set(second.tolist()) == {16.0}
+
+def test_distance_matrix_grows_in_place_and_prices_routes(app, client):
+    import os
+    from app import db
+    from app.models import Location
+    from app.utils.map_utils import distance_matrix, haversine_km, MATRIX_FILE
+
+    nairobi = Location(city="Nairobi", address="CBD", latitude=-1.2864, longitude=36.8172)
+    mombasa = Location(city="Mombasa", address="Nyali", latitude=-4.0435, longitude=39.6682)
+    db.session.add_all([nairobi, mombasa])
+    db.session.commit()
+
+    matrix_path = os.path.join(app.config["DISTANCE_MATRIX_DIR"], MATRIX_FILE)
+    inode = os.stat(matrix_path).st_ino
+
+    # A new location fills its own row and column; the file is not rebuilt
+    kisumu = Location(city="Kisumu", address="Milimani", latitude=-0.0917, longitude=34.7680)
+    db.session.add(kisumu)
+    db.session.commit()
+    assert os.stat(matrix_path).st_ino == inode
+
+    expected = haversine_km(nairobi.latitude, nairobi.longitude, kisumu.latitude, kisumu.longitude)
+    assert abs(distance_matrix.distance_km(kisumu.id, nairobi.id) - expected) < 0.01
+    assert 430 < distance_matrix.distance_km(nairobi.id, mombasa.id) < 450
+
+    # The server's distance wins over a client's; unknown routes still need distance_km
+    res = client.post("/quotes", json=[
+        {"weight": 3, "origin_id": nairobi.id, "destination_id": mombasa.id, "distance_km": 1},
+        {"weight": 3, "origin_id": nairobi.id, "destination_id": 999},
+    ])
+    data = res.get_json()
+    route_km = round(distance_matrix.distance_km(nairobi.id, mombasa.id), 2)
+    assert data["quotes"][0]["distance_km"] == route_km
+    assert data["quotes"][0]["price"] == round(10 + route_km * 0.5, 2)
+    assert [e["index"] for e in data["errors"]] == [1]
@@ -0,0 +1,69 @@
+def test_two_opt_never_lengthens_the_nearest_neighbour_tour():
+    import time
+    import numpy as np
+    from app.utils.map_utils import haversine_km
+    from app.utils.routing import nearest_neighbour_tour, two_opt, tour_length, sweep_clusters
+
+    rng = np.random.default_rng(7)
+    depot = (-1.2864, 36.8172)
+    points = np.column_stack([depot[0] + rng.uniform(-0.2, 0.2, 200), depot[1] + rng.uniform(-0.2, 0.2, 200)])
+
+    clusters = sweep_clusters(depot, points, np.ones(200, dtype=np.int64), 4)
+    assert len(clusters) == 4
+    assert sorted(np.concatenate(clusters).tolist()) == list(range(200))
+
+    nodes = np.vstack([depot, points])
+    distances = haversine_km(nodes[:, 0, None], nodes[:, 1, None], nodes[None, :, 0], nodes[None, :, 1])
+    start = nearest_neighbour_tour(distances)
+    improved = two_opt(start, distances, time.monotonic() + 5)
+
+    assert improved[0] == improved[-1] == 0
+    assert sorted(improved[1:-1].tolist()) == list(range(1, 201))
+    assert tour_length(improved, distances) < tour_length(start, distances)
+
+def test_plan_routes_assigns_pending_parcels_to_couriers(client, pending_status):
+    from app import db
+    from app.models import Location, Parcel, User
+    from tests.test_admin import make_admin_token
+
+    token = make_admin_token("routes_admin@example.com")
+    hub = Location(city="Nairobi", address="Routing Hub", latitude=-1.2864, longitude=36.8172)
+    drops = [
+        Location(city="Nairobi", address=f"Drop {n}", latitude=-1.2864 + 0.01 * n, longitude=36.8172 - 0.01 * n)
+        for n in range(1, 6)
+    ]
+    couriers = [
+        User(name=f"Courier {n}", email=f"route_courier{n}@example.com", password_hash="x", role="courier")
+        for n in range(2)
+    ]
+    sender = User(name="Route Sender", email="route_sender@example.com", password_hash="x")
+    db.session.add_all([hub, *drops, *couriers, sender])
+    db.session.commit()
+
+    parcels = [
+        Parcel(description=f"Box {n}", user_id=sender.id, origin_id=hub.id, destination_id=drops[n % 5].id,
+               present_location_id=hub.id, status_id=pending_status.id)
+        for n in range(10)
+    ]
+    db.session.add_all(parcels)
+    db.session.commit()
+
+    res = client.post(
+        "/admin/routes",
+        json={"location_id": hub.id, "courier_ids": [c.id for c in couriers], "max_parcels": 4, "assign": True},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 200
+    data = res.get_json()
+
+    routed = [pid for route in data["routes"] for stop in route["stops"] for pid in stop["parcel_ids"]]
+    assert sorted(routed) == sorted(p.id for p in parcels)
+    assert {route["courier_id"] for route in data["routes"]} == {c.id for c in couriers}
+    assert all(route["parcel_count"] <= 4 for route in data["routes"])
+
+    # Committed locations are in the distance matrix, so routes were measured on it
+    from app.utils.map_utils import distance_matrix
+    assert distance_matrix.submatrix([hub.id, *(drop.id for drop in drops)]).shape == (6, 6)
+
+    db.session.expire_all()
+    assert all(p.courier_id in {c.id for c in couriers} for p in Parcel.query.filter(Parcel.id.in_(routed)))
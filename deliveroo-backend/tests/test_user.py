@@ -19,3 +19,59 @@ def test_get_profile(client):
     })
     assert res.status_code == 200
     assert "email" in res.get_json()
+
+def test_user_listing_supports_if_none_match(client, auth_headers):
+    from app import db
+    from app.models.user import User
+
+    admin = User(name="Listing Admin", email="listing-admin@example.com", password_hash="x", role="admin")
+    db.session.add(admin)
+    db.session.commit()
+    headers = auth_headers(admin)
+
+    first = client.get("/users?limit=5", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert client.get("/users?limit=5", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    db.session.add(User(name="Newest User", email="newest-user@example.com", password_hash="x"))
+    db.session.commit()
+    res = client.get("/users?limit=5", headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.get_json()["users"][0]["email"] == "newest-user@example.com"
+
+def test_soft_deleting_a_user_revokes_their_tokens(client, query_budget, auth_headers):
+    from app import db
+    from app.models.user import User
+
+    admin = User(name="Revoking Admin", email="revoking-admin@example.com", password_hash="x", role="admin")
+    member = User(name="Revoked Member", email="revoked-member@example.com", password_hash="x")
+    db.session.add_all([admin, member])
+    db.session.commit()
+
+    admin_headers, member_headers = auth_headers(admin), auth_headers(member)
+    client.get("/auth/profile", headers=member_headers)
+    # Tokens the filter has never seen are accepted without touching the database
+    with query_budget(0):
+        assert client.get("/auth/profile", headers=member_headers).status_code == 200
+
+    assert client.delete(f"/users/{member.id}", headers=admin_headers).status_code == 200
+    revoked = client.get("/auth/profile", headers=member_headers)
+    assert revoked.status_code == 401
+    assert client.get("/auth/profile", headers=admin_headers).status_code == 200
+
+    # Logging out revokes just that token
+    assert client.post("/auth/logout", headers=admin_headers).status_code == 200
+    assert client.get("/auth/profile", headers=admin_headers).status_code == 401
+    assert client.get("/auth/profile", headers=auth_headers(admin)).status_code == 200
+
+def test_bloom_filter_counts_each_revocation_once():
+    from app.utils.revocation import BloomFilter
+
+    bloom = BloomFilter(1000, 0.001)
+    # Each pull re-reads the sync overlap, so the same revocations come in again and again
+    for _ in range(30):
+        for n in range(50):
+            bloom.add(f"jti:{n}")
+    assert bloom.count == 50
+    assert all(f"jti:{n}" in bloom for n in range(50))